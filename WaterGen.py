@@ -1,20 +1,39 @@
+import sys
+
+# Startdiagnose vor allen weiteren Importen aktivieren, damit deren Importzeiten erfasst werden
+from watergen_startup import STARTDIAGNOSE_FLAG, diagnose, import_zeiten_aufzeichnen, startphase
+if STARTDIAGNOSE_FLAG in sys.argv:
+    import_zeiten_aufzeichnen()
+
 import tkinter as tk
 from tkinter import ttk
 from tkcalendar import DateEntry
 from datetime import datetime, timedelta
-import pandas as pd
-import csv
 import threading
+import multiprocessing
 import math
-import random
 import ctypes
-import matplotlib
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
 import os
 from PIL import Image, ImageTk, ImageDraw, ImageFont
-import tksvg
+# matplotlib wird erst beim ersten Öffnen des Formel-Untermenüs geladen,
+# pandas erst beim ersten Excel-Export im pandas-Modus (siehe watergen_engine)
+
+from watergen_engine import (
+    CPROFILE_FILE,
+    FormelParameter,
+    JobControl,
+    ProgressChannel,
+    calculate_gw_preview,
+    create_csv_files,
+    job_preview_key,
+    model_length,
+    model_step_days,
+    parse_flexible_date,
+    prepare_job,
+    preview_cache_info,
+    progress_text,
+    validiere_messstellen,
+)
 
 # Verbesserte Farbpalette für konsistenten Darkmode
 DISCORD_BG = "#36393F"
@@ -27,6 +46,15 @@ DISCORD_INPUT_BG = "#40444B"
 BUTTON_COLOR = "#4ee56e"
 BUTTON_HOVER = "#3ac558"
 
+# Abfrageintervall der Oberfläche für den Fortschritt (ms), unabhängig von der Zeilenrate
+PROGRESS_POLL_MS = 100
+
+# Mindestabstand zwischen zwei Neuzeichnungen der Formel-Vorschau (ms, etwa 60 Bilder/s)
+PREVIEW_FRAME_MS = 16
+
+# Mit "WaterGen.py --cprofile" wird jeder Generierungslauf zusätzlich mit cProfile mitgeschnitten
+CPROFILE_FLAG = "--cprofile"
+
 # Angepasste DateEntry-Klasse für Darkmode
 class DarkDateEntry(DateEntry):
     """
@@ -239,252 +267,14 @@ def create_rounded_rect(canvas, x1, y1, x2, y2, radius=15, **kwargs):
     return canvas.create_polygon(points, **kwargs, smooth=True)
 
 
-# Die Formel-Parameter-Klasse (nur mit Grundwasser-Parametern)
-class FormelParameter:
-    def __init__(self):
-        # Bestehende Parameter beibehalten
-        self.GW0 = 10.0  # Grundniveau in Meter unter GOK
-        self.A = 0.5     # Saisonale Amplitude
-        self.T = 365     # Periodendauer in Tagen
-        self.freq = 1.0  # Sinusfrequenz pro Periodendauer
-        self.Da = 45     # Anstiegsdauer in Tagen
-        self.Dd = 120    # Abklingdauer in Tagen
-        self.R_scale = 0.05  # Skalierung für zufällige Schwankungen
-        self.phase = 60      # Phasenverschiebung in Tagen
-        self.trend = 0.0     # Langzeittrend pro Jahr in Meter
-        
-        # Neue Parameter für die gewünschten Funktionen
-        self.curve_randomness = 0.2  # Variabilität der Wellenform (0-1)
-        self.secondary_freq = 3.0    # Frequenz der überlagerten kleineren Wellen
-
-
-    def generiere_formel(self):
-        return (f"\n            Ganglinien Layout bearbeiten:\n")
-
-
-
-
-# Funktion zur Berechnung der Grundwasserganglinie
-def calculate_gw_series(t_array, GW0, A, T, freq, Da, Dd, R_scale, phase=60, trend=0.0, curve_randomness=0.2, secondary_freq=3.0):
-    # Seed setzen für reproduzierbare Ergebnisse
-    np.random.seed(42)
-    
-    # R_base analog zur Vorschau erstellen
-    R_base = np.random.normal(0, 1, size=len(t_array))
-    
-    # Stellen Sie sicher, dass T nicht Null ist, um Division durch Null zu vermeiden
-    if T == 0: T = 365 # Fallback-Wert
-    
-    # Amplitudenvariationen für jeden Wellenzyklus
-    if curve_randomness > 0:
-        amplitude_variation = 1.0 + curve_randomness * np.random.normal(0, 1, size=len(t_array))
-        seasonal = A * np.sin(2 * np.pi * freq * (t_array - phase) / T) * amplitude_variation
-    else:
-        seasonal = A * np.sin(2 * np.pi * freq * (t_array - phase) / T)
-    
-    # Sekundäre kleinere Wellen hinzufügen
-    if secondary_freq > 0:
-        small_waves = A * 0.3 * np.sin(2 * np.pi * secondary_freq * freq * t_array / T)
-        seasonal += small_waves
-    
-    # Trend-Komponente hinzufügen
-    trend_component = trend * t_array / 365
-    base_level = GW0 + seasonal + trend_component
-    
-    # Grundwasserstand initialisieren
-    GW = np.zeros_like(t_array, dtype=float)
-    if len(t_array) > 0:
-        GW[0] = GW0 + seasonal[0]
-        
-        for i in range(1, len(t_array)):
-            disturbance = R_scale * R_base[i]
-            diff_from_GW0 = GW[i-1] - GW0
-            daily_change = 0
-            
-            if disturbance > 0 and Da > 0:
-                daily_change = (disturbance - diff_from_GW0) / Da
-            elif Dd > 0:
-                daily_change = -diff_from_GW0 / Dd
-                
-            GW[i] = GW[i-1] + daily_change
-            GW[i] += seasonal[i] - seasonal[i-1]
-    
-    return GW
-
-
-def create_csv_files(root, start_date, end_date, messstellen_ids, interval_hours, formel_params, progress, progress_info):
-    hourly_interval = timedelta(hours=interval_hours)
-    delta = end_date - start_date
-    total_days = delta.days + 1
-    # Die Anzahl der Stunden in der Zeitspanne
-    total_hours = total_days * 24
-    # Die Anzahl der Messwerte pro Messstelle basierend auf dem Intervall
-    if interval_hours == 0: interval_hours = 1 # Fallback-Wert
-    total_measurements_per_station = int(total_hours / interval_hours)
-    total_values = total_measurements_per_station * len(messstellen_ids)
-
-    # Zeit-Array für die Grundwasserberechnung (Tages-basiert)
-    t_days_array = np.arange(0, total_days, 1)
-
-    # Grundwasserganglinie basierend auf den Parametern berechnen
-    try:
-
-        grundwasser_series_daily = calculate_gw_series(
-            t_days_array,
-            formel_params.GW0,
-            formel_params.A,
-            formel_params.T,
-            formel_params.freq,
-            formel_params.Da,
-            formel_params.Dd,
-            formel_params.R_scale,
-            formel_params.phase,
-            formel_params.trend,
-            formel_params.curve_randomness,
-            formel_params.secondary_freq
-        )
-
-
-
-
-    except Exception as e:
-        print(f"Fehler bei Grundwasserreihen-Berechnung: {e}")
-        grundwasser_series_daily = np.full(total_days, formel_params.GW0)
-
-    values_created = 0
-
-    if hasattr(root, 'output_format') and root.output_format == "excel":
-        all_data = {}
-
-        for idx, messstelle_id in enumerate(messstellen_ids):
-            data = []
-            current_time = start_date
-
-            while current_time <= end_date:
-                # Berechnen Sie den Tag-Index basierend auf dem aktuellen Zeitpunkt
-                days_since_start = (current_time.date() - start_date.date()).days
-                tage_index = days_since_start
-
-                # Der Hauptwert ist der Grundwasserstand für diesen Tag aus der berechneten Serie
-                # Stellen Sie sicher, dass der Index gültig ist
-                if 0 <= tage_index < len(grundwasser_series_daily):
-                    basis_value = grundwasser_series_daily[tage_index]
-                else:
-                    # Fallback: Verwenden Sie das Grundniveau, wenn der Index ungültig ist (sollte nicht passieren)
-                    basis_value = formel_params.GW0
-
-
-                # Individualisierung pro Messstelle (Offset)
-                messstellen_offset = (idx - len(messstellen_ids) / 2) * 1.02
-                messwert = basis_value + messstellen_offset
-
-                # Optional: Fügen Sie hier sehr kleine, stündliche Zufallsschwankungen hinzu,
-                # die nicht Teil des täglichen GW-Modells sind, aber realistisches Rauschen simulieren.
-                messwert += random.uniform(-formel_params.R_scale * 1.02, formel_params.R_scale * 1.02) # Beispiel
-
-
-                # Datum als datetime-Objekt beibehalten für Excel
-                data.append([messstelle_id, current_time, float(f'{messwert:.2f}')])
-
-                current_time += hourly_interval
-                values_created += 1
-
-                # Fortschrittsbalken aktualisieren
-                if values_created % 100 == 0:
-                    progress['value'] = int((values_created / total_values) * 100)
-                    progress_info.config(text=f"{values_created:,}/{total_values:,} Werte generiert ({progress['value']}%)".replace(',', '.'))
-                    root.update_idletasks()
-
-            # Speichern in Dictionary für Excel-Export
-            all_data[messstelle_id] = data
-
-        try:
-            # Excel-Datei erstellen
-            with pd.ExcelWriter('wasserstände_alle_messstellen.xlsx',
-                            engine='xlsxwriter',
-                            datetime_format='DD/MM/YYYY HH:MM') as writer:
-
-                for messstelle_id, data in all_data.items():
-                    # DataFrame erstellen
-                    df = pd.DataFrame(data, columns=['GWMST Name', 'Datum/Uhrzeit', 'Messwert'])
-                    # In Excel schreiben
-                    # Beschränken Sie den Sheetnamen auf 31 Zeichen, da Excel-Limits gelten.
-                    sheet_name = messstelle_id[:31] if len(messstelle_id) > 31 else messstelle_id
-                    # Entfernen Sie ungültige Zeichen für Sheetnamen, falls vorhanden (Excel-Limitierungen beachten)
-                    sheet_name = "".join([c for c in sheet_name if c.isalnum() or c in (' ', '_', '-')])
-                     # Stellen Sie sicher, dass der Name nicht leer ist oder mit bestimmten Zeichen beginnt/endet
-                    if not sheet_name or sheet_name[0] in ("'", "=") or any(char in sheet_name for char in ':\\/?*[]'):
-                         sheet_name = f"Messstelle_{idx+1}" # Fallback Name
-
-
-                    df.to_excel(writer, sheet_name=sheet_name, index=False, header=False)
-
-                    # Formatierung anpassen
-                    workbook = writer.book
-                    worksheet = writer.sheets[sheet_name]
-
-                    # Spaltenbreiten anpassen
-                    worksheet.set_column(1, 1, 20)  # Datum/Uhrzeit-Spalte
-                    worksheet.set_column(2, 2, 12)  # Messwert-Spalte
-
-            progress['value'] = 100
-            progress_info.config(text=f"{total_values:,}/{total_values:,} Werte generiert (100%)".replace(',', '.'))
-            root.update_idletasks()
-        except Exception as e:
-            progress_info.config(text=f"Fehler beim Excel-Export: {str(e)}")
-            print(f"Excel Export Error: {e}") # Zusätzliche Debug-Ausgabe
-    else:
-        # CSV-Export
-        for idx, messstelle_id in enumerate(messstellen_ids):
-            filename = f'wasserstände_{messstelle_id.replace(" ", "_")}.csv'
-
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                csvwriter = csv.writer(csvfile, delimiter=';')
-                csvwriter.writerow(['GWMST Name', 'Datum/Zeit', 'Messwert'])
-
-                current_time = start_date
-
-                while current_time <= end_date:
-                    formatted_date = current_time.strftime("%d.%m.%Y %H:%M:%S")
-
-                    days_since_start = (current_time.date() - start_date.date()).days
-                    tage_index = days_since_start
-
-                    # Der Hauptwert ist der Grundwasserstand für diesen Tag aus der berechneten Serie
-                    # Stellen Sie sicher, dass der Index gültig ist
-                    if 0 <= tage_index < len(grundwasser_series_daily):
-                        basis_value = grundwasser_series_daily[tage_index]
-                    else:
-                        # Fallback: Verwenden Sie das Grundniveau, wenn der Index ungültig ist
-                        basis_value = formel_params.GW0
-
-                    # Individualisierung pro Messstelle (Offset)
-                    messstellen_offset = (idx - len(messstellen_ids) / 2) * 0.02
-                    messwert = basis_value + messstellen_offset
-
-                    # Optional: Fügen Sie hier sehr kleine, stündliche Zufallsschwankungen hinzu
-                    messwert += random.uniform(-formel_params.R_scale * 0.02, formel_params.R_scale * 0.02) # Beispiel
-
-
-                    csvwriter.writerow([messstelle_id, formatted_date, f'{messwert:.2f}'.replace('.', ',')])
-
-                    current_time += hourly_interval
-
-                    values_created += 1
-                    if values_created % 100 == 0:
-                        progress['value'] = int((values_created / total_values) * 100)
-                        progress_info.config(text=f"{values_created:,}/{total_values:,} Werte generiert ({progress['value']}%)".replace(',', '.'))
-                        root.update_idletasks()
-
-        progress['value'] = 100
-        progress_info.config(text=f"{total_values:,}/{total_values:,} Werte generiert (100%)".replace(',', '.'))
-        root.update_idletasks()
-
-
 # Ladescreen-Funktion
-def show_loading_screen():
+def show_loading_screen(root):
+    """
+    Zeigt den Ladescreen über dem noch verborgenen Hauptfenster an.
+    Gibt eine Funktion zum Schließen zurück, die aufgerufen wird, sobald das Hauptfenster bereit ist.
+    """
     global logo_img_global
-    loading_window = tk.Tk()
+    loading_window = tk.Toplevel(root)
     loading_window.overrideredirect(True)
     window_width = 400
     window_height = 300
@@ -522,12 +312,15 @@ def show_loading_screen():
     progress.pack(pady=20)
     progress.start(15)
 
+    # Ladescreen sofort zeichnen, das Hauptfenster wird danach im selben Tk-Interpreter aufgebaut
+    loading_window.update()
+    startphase("Ladescreen sichtbar")
+
     def close_loading():
         progress.stop()
         loading_window.destroy()
 
-    loading_window.after(2000, close_loading)
-    loading_window.mainloop()
+    return close_loading
 
 def resource_path(relative_path):
     """Ermittelt den korrekten Pfad zu Ressourcen für PyInstaller und normale Python-Ausführung"""
@@ -543,19 +336,20 @@ def resource_path(relative_path):
 
 # GUI erstellen
 def create_gui():
-    show_loading_screen()
     root = tk.Tk()
+    # Hauptfenster erst anzeigen, wenn es vollständig aufgebaut ist
+    root.withdraw()
+    close_loading = show_loading_screen(root)
     root.title("WaterGen")
     logo_path = resource_path("icon.ico")
     root.iconbitmap(logo_path)
     window_width = 620
-    window_height = 700
+    window_height = 740
     screen_width = root.winfo_screenwidth()
     screen_height = root.winfo_screenheight()
     x_pos = int((screen_width/2) - (window_width/2))
     y_pos = int((screen_height/2) - (window_height/2))
     root.geometry(f"{window_width}x{window_height}+{x_pos}+{y_pos}")
-    set_dark_title_bar(root)
     root.configure(bg=DISCORD_BG)
 
    # Icon für Fenster und Taskleiste setzen
@@ -592,7 +386,7 @@ def create_gui():
 
     formel_params = FormelParameter() # Instanz der FormelParameter-Klasse
 
-    root.minsize(620, 720)
+    root.minsize(620, 740)
     root.grid_rowconfigure(0, weight=1)
     root.grid_columnconfigure(0, weight=1)
 
@@ -728,18 +522,16 @@ def create_gui():
     intervall_entry.insert(0, "1")
     zeitspan_canvas.create_window(200, 70, window=intervall_entry)
 
+    # Option: Modell direkt im Messintervall statt tageweise berechnen
+    intervall_modell_var = tk.BooleanVar(value=False)
+    intervall_modell_check = tk.Checkbutton(zeitspan_canvas, text="Modell im Intervall berechnen",
+                                            variable=intervall_modell_var,
+                                            bg=DISCORD_DARK, fg=DISCORD_TEXT,
+                                            activebackground=DISCORD_DARK, activeforeground=DISCORD_TEXT,
+                                            selectcolor=DISCORD_INPUT_BG, font=('Arial', 10),
+                                            bd=0, highlightthickness=0)
+    zeitspan_canvas.create_window(400, 70, window=intervall_modell_check)
 
-    def parse_flexible_date(date_string):
-        """Parst deutsches Datum flexibel mit 2- oder 4-stelligem Jahr"""
-        try:
-            # Erst mit 2-stelligem Jahr versuchen
-            return datetime.strptime(date_string, '%d.%m.%y')
-        except ValueError:
-            try:
-                # Dann mit 4-stelligem Jahr versuchen
-                return datetime.strptime(date_string, '%d.%m.%Y')
-            except ValueError:
-                raise ValueError("Ungültiges Datumsformat. Bitte TT.MM.JJ oder TT.MM.JJJJ verwenden.")
 
     def berechne_zeitspanne():
         try:
@@ -851,29 +643,6 @@ def create_gui():
     # Event für Texteingabe
     messstellen_text.bind("<FocusOut>", lambda e: berechne_werte_anzahl())
 
-    def validiere_messstellen(messstellen_text):
-        """Prüft, ob doppelte Messstellennamen vorhanden sind"""
-        if not messstellen_text.strip():
-            return False, "Keine Messstellen angegeben"
-
-        messstellen = [m.strip() for m in messstellen_text.split(';') if m.strip()]
-        if not messstellen:
-            return False, "Keine gültigen Messstellen angegeben"
-
-        # Duplikate prüfen
-        duplicates = set()
-        seen = set()
-        for m in messstellen:
-            if m in seen:
-                duplicates.add(m)
-            else:
-                seen.add(m)
-
-        if duplicates:
-            return False, f"Doppelte Messstellennamen gefunden: {', '.join(duplicates)}"
-
-        return True, messstellen
-
     # 3. Formel (anzeige der verwendeten Parameter)
     formel_frame = tk.Frame(main_frame, bg=DISCORD_BG)
     formel_frame.pack(fill=tk.X, pady=(0, 10))
@@ -922,54 +691,36 @@ def create_gui():
                             bg=DISCORD_BG, fg=DISCORD_TEXT, font=('Arial', 16, 'bold'))
         title_label.grid(row=0, column=0, columnspan=3, pady=(0, 20), sticky="w")
 
-        # Parameter für Grundwasserganglinie für die Plot-Vorschau
-        # t und R_base für die Plot-Vorschau im Submenü
-        np.random.seed(42) # Konsistenter Seed für die Submenü-Vorschau
-        t_preview = np.arange(0, 365, 1) # Vorschau für 365 Tage
-        R_base_preview = np.random.normal(0, 1, size=len(t_preview))
-
-
-        # Funktion zur Berechnung der Grundwasserganglinie für die Plot-Vorschau
-        def calculate_gw_preview(t_array, GW0, A, T, freq, Da, Dd, R_scale, curve_randomness=0.2, secondary_freq=3.0):
-             # np.random.seed(42) # Seed wird einmal am Anfang des Submenüs gesetzt
-             # R_base wird außerhalb dieser Funktion im Submenü-Scope erzeugt
-             # Stellen Sie sicher, dass T nicht Null ist, um Division durch Null zu vermeiden.
-             if T == 0: T = 365 # Fallback-Wert
-
-             # Amplitudenvariationen für jeden Wellenzyklus
-             if curve_randomness > 0:
-                 amplitude_variation = 1.0 + curve_randomness * np.random.normal(0, 1, size=len(t_array))
-                 seasonal = A * np.sin(2 * np.pi * freq * t_array / T) * amplitude_variation
-             else:
-                 seasonal = A * np.sin(2 * np.pi * freq * t_array / T)
-            
-             # Sekundäre kleinere Wellen hinzufügen
-             if secondary_freq > 0:
-                 small_waves = A * 0.3 * np.sin(2 * np.pi * secondary_freq * freq * t_array / T)
-                 seasonal += small_waves
-
-
-             GW = np.zeros_like(t_array, dtype=float)
-
-             if len(t_array) > 0:
-                 GW[0] = GW0 + seasonal[0]
-
-             for i in range(1, len(t_array)):
-                 disturbance = R_scale * R_base_preview[i] # Nutze R_base_preview
-
-                 diff_from_GW0 = GW[i-1] - GW0
+        # Vorschau über den im Hauptfenster eingestellten Zeitraum und das Intervall;
+        # ist dort nichts Gültiges eingetragen, ein Jahr ab heute im Tagesraster
+        try:
+            vorschau_start = parse_flexible_date(startdatum.get())
+            vorschau_ende = parse_flexible_date(enddatum.get())
+            vorschau_intervall = float(intervall_entry.get())
+            if vorschau_start > vorschau_ende or vorschau_intervall <= 0:
+                raise ValueError("Ungültiger Zeitraum")
+        except ValueError:
+            vorschau_start = datetime.combine(datetime.now().date(), datetime.min.time())
+            vorschau_ende = vorschau_start + timedelta(days=364)
+            vorschau_intervall = 24
+        vorschau_axis = "interval" if intervall_modell_var.get() else "daily"
 
-                 daily_change = 0
-                 if disturbance > 0 and Da > 0:
-                     daily_change = (disturbance - diff_from_GW0) / Da
-                 elif Dd > 0:
-                     daily_change = -diff_from_GW0 / Dd
+        # Eigene Parameterkopie für die Vorschau (gleicher Job-Seed wie bei der Generierung),
+        # formel_params wird erst beim Übernehmen geändert
+        vorschau_params = FormelParameter()
+        vars(vorschau_params).update(vars(formel_params))
+        vorschau_job = prepare_job(vorschau_start, vorschau_ende, vorschau_intervall, vorschau_params, vorschau_axis)
+        schritt_tage = model_step_days(vorschau_job)
+        anzahl_schritte = model_length(vorschau_job)
 
-                 GW[i] = GW[i-1] + daily_change
-                 GW[i] += seasonal[i] - seasonal[i-1]
 
-             return GW
+        # matplotlib erst hier laden; beim zweiten Öffnen liegen die Module bereits in sys.modules
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        import matplotlib.dates as mdates
 
+        # Modellschritt -> Matplotlib-Datumszahl
+        x_start = mdates.date2num(vorschau_start)
 
         # Erstelle die Figure für den Plot
         fig = Figure(figsize=(5, 4), dpi=100, facecolor=DISCORD_DARKER)
@@ -983,69 +734,160 @@ def create_gui():
         ax.yaxis.label.set_color(DISCORD_TEXT)
         ax.xaxis.label.set_color(DISCORD_TEXT)
         ax.title.set_color(DISCORD_TEXT)
-        ax.set_xlabel('Zeit (Tage)', color=DISCORD_TEXT)
+        ax.set_xlabel('Datum', color=DISCORD_TEXT)
         ax.set_ylabel('Grundwasserstand [m]', color=DISCORD_TEXT)
         ax.set_title('Grundwasserganglinie (Vorschau)', color=DISCORD_TEXT)
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        ax.xaxis.get_offset_text().set_color(DISCORD_TEXT)
+        # Styling und Gitter nur einmal setzen, beim Aktualisieren ändert sich nur die Linie
+        ax.grid(True, color=DISCORD_GRAY_TEXT, alpha=0.3, linestyle='--')
 
-
+        # Persistente Linie; animated=True hält sie aus dem gecachten Hintergrund heraus
+        (linie,) = ax.plot([], [], color=DISCORD_GREEN, linewidth=1.5, animated=True)
 
 
         # Erstelle die Plot-Canvas
         canvas = FigureCanvasTkAgg(fig, master=graph_frame)
-        canvas.draw()
         canvas.get_tk_widget().pack()
 
+        zoom_hinweis = tk.Label(graph_frame, text="Mausrad: Zoom – Doppelklick: Gesamter Zeitraum",
+                                bg=DISCORD_BG, fg=DISCORD_GRAY_TEXT, font=('Arial', 9))
+        zoom_hinweis.pack(pady=(5, 0))
 
-        # Funktion zur Aktualisierung des Plots im Submenü
-        def update_graph():
-            ax.clear()
-            ax.set_facecolor(DISCORD_DARKER)
-            ax.spines['bottom'].set_color(DISCORD_TEXT)
-            ax.spines['top'].set_color(DISCORD_TEXT)
-            ax.spines['left'].set_color(DISCORD_TEXT)
-            ax.spines['right'].set_color(DISCORD_TEXT)
-            ax.tick_params(axis='both', colors=DISCORD_TEXT)
-            ax.yaxis.label.set_color(DISCORD_TEXT)
-            ax.xaxis.label.set_color(DISCORD_TEXT)
-            ax.title.set_color(DISCORD_TEXT)
-            ax.set_xlabel('Zeit (Tage)', color=DISCORD_TEXT)
-            ax.set_ylabel('Grundwasserstand [m]', color=DISCORD_TEXT)
-            ax.set_title('Grundwasserganglinie (Vorschau)', color=DISCORD_TEXT)
+        # Zustand der Vorschau: gecachter Hintergrund (Achsen, Gitter, Beschriftung ohne Linie),
+        # die höchstens eine vorgemerkte Neuzeichnung und der sichtbare Bereich in Modellschritten,
+        # dazu der Hintergrund-Thread der Berechnung und sein letztes Ergebnis (Anfrage, Reihe)
+        vorschau = {'hintergrund': None, 'geplant': None,
+                    'bereich': (0, anzahl_schritte), 'x_geaendert': True,
+                    'rechnung': None, 'ergebnis': None}
 
+        def on_draw(event):
+            # Nach jedem vollständigen Zeichnen (auch bei Größenänderung) den Hintergrund neu cachen
+            vorschau['hintergrund'] = canvas.copy_from_bbox(fig.bbox)
+            ax.draw_artist(linie)
 
-            # Grundwasserganglinie für die Vorschau berechnen
-            # Verwende die aktuellen Werte der Slider-Variablen
-            GW0 = var_GW0.get()
-            A = var_A.get()
-            T = var_T.get()
-            freq = var_freq.get()
-            Da = var_Da.get()
-            Dd = var_Dd.get()
-            R_scale = var_R.get()
-            curve_randomness = var_randomness.get()
-            secondary_freq = var_secondary.get()
-
-            # Nutze die calculate_gw_preview Funktion mit t_preview und R_base_preview
-            GW_preview = calculate_gw_preview(t_preview, GW0, A, T, freq, Da, Dd, R_scale, 
-                                    curve_randomness, secondary_freq)
-
-            # Plotten
-            ax.plot(t_preview, GW_preview, color=DISCORD_GREEN, linewidth=1.5)
-            ax.grid(True, color=DISCORD_GRAY_TEXT, alpha=0.3, linestyle='--')
-
-
-            # Y-Achsen-Limits anpassen, aber nicht zu stark einschränken
-            GW_min, GW_max = GW_preview.min(), GW_preview.max()
+        canvas.mpl_connect('draw_event', on_draw)
+
+
+        # Y-Achsen-Limits mit 10% Puffer, aber nicht zu stark einschränken
+        def y_limits(GW_min, GW_max):
             margin = (GW_max - GW_min) * 0.1 # 10% Puffer
             if margin == 0 and GW_min == GW_max:
                  margin = 0.5 # Mindest-Puffer falls alle Werte gleich sind
             elif margin == 0:
                  margin = 0.1 * abs(GW_min) # Puffer basierend auf dem Wert selbst
+            return GW_min - margin, GW_max + margin
 
-            ax.set_ylim(GW_min - margin, GW_max + margin)
 
+        # Funktion zur Aktualisierung des Plots im Submenü
+        def update_graph():
+            vorschau['geplant'] = None
 
-            canvas.draw()
+            # Grundwasserganglinie für die Vorschau berechnen
+            # Verwende die aktuellen Werte der Slider-Variablen
+            vorschau_params.GW0 = var_GW0.get()
+            vorschau_params.A = var_A.get()
+            vorschau_params.T = var_T.get()
+            vorschau_params.freq = var_freq.get()
+            vorschau_params.Da = var_Da.get()
+            vorschau_params.Dd = var_Dd.get()
+            vorschau_params.R_scale = var_R.get()
+            vorschau_params.curve_randomness = var_randomness.get()
+            vorschau_params.secondary_freq = var_secondary.get()
+
+            # Sichtbaren Bereich auf eine Min/Max-Spalte je Bildpunkt verdichten: die Linie hat
+            # unabhängig von der Länge der Reihe höchstens doppelt so viele Punkte wie die Achse breit ist.
+            # Bereits gesehene Parametersätze kommen aus dem Cache der Engine.
+            von, bis = vorschau['bereich']
+            anfrage = (job_preview_key(vorschau_job), von, bis, int(ax.bbox.width))
+            ergebnis = vorschau['ergebnis']
+            if ergebnis is None or ergebnis[0] != anfrage:
+                # Berechnung im Hintergrund: ein neuer Parametersatz rechnet die ganze Reihe einmal durch,
+                # das Fenster bleibt bedienbar. Läuft noch eine Berechnung, wird danach mit den dann
+                # aktuellen Werten neu gerechnet; veraltete Ergebnisse werden nie gezeichnet.
+                if vorschau['rechnung'] is None or not vorschau['rechnung'].is_alive():
+                    params = FormelParameter()
+                    vars(params).update(vars(vorschau_params))
+                    job = dict(vorschau_job, formel_params=params)
+
+                    def rechnen():
+                        try:
+                            vorschau['ergebnis'] = (anfrage, calculate_gw_preview(job, anfrage[3], von, bis))
+                        except Exception as e:
+                            print(f"Fehler bei der Vorschau-Berechnung: {e}")
+                            vorschau['ergebnis'] = (anfrage, None)
+
+                    vorschau['rechnung'] = threading.Thread(target=rechnen, daemon=True)
+                    vorschau['rechnung'].start()
+                vorschau['geplant'] = submenu.after(PREVIEW_FRAME_MS, update_graph)
+                return
+            if ergebnis[1] is None:
+                return
+            schritte, GW_preview = ergebnis[1]
+            linie.set_data(x_start + schritte * schritt_tage, GW_preview)
+
+            # Achsen nur neu skalieren, wenn sich der Zeitbereich geändert hat oder die Kurve den
+            # sichtbaren Bereich verlässt bzw. kaum noch nutzt; dann vollständig zeichnen
+            GW_min, GW_max = GW_preview.min(), GW_preview.max()
+            y_unten, y_oben = ax.get_ylim()
+            neu_skalieren = (vorschau['hintergrund'] is None or GW_min < y_unten or GW_max > y_oben
+                             or (GW_max - GW_min) * 1.2 < 0.5 * (y_oben - y_unten))
+            if neu_skalieren or vorschau['x_geaendert']:
+                if vorschau['x_geaendert']:
+                    ax.set_xlim(x_start + von * schritt_tage, x_start + max(bis - 1, von + 1) * schritt_tage)
+                    vorschau['x_geaendert'] = False
+                ax.set_ylim(*y_limits(GW_min, GW_max))
+                canvas.draw() # löst on_draw aus: Hintergrund cachen und Linie zeichnen
+                return
+
+            # Sonst nur die Linie über den gecachten Hintergrund blitten
+            canvas.restore_region(vorschau['hintergrund'])
+            ax.draw_artist(linie)
+            canvas.blit(ax.bbox)
+
+        def schedule_update_graph():
+            # Slider-Ereignisse zusammenfassen: höchstens eine Neuzeichnung pro Frame vormerken
+            if vorschau['geplant'] is None:
+                vorschau['geplant'] = submenu.after(PREVIEW_FRAME_MS, update_graph)
+
+        def on_scroll(event):
+            # Mausrad zoomt um die Mausposition; der neue Bereich wird neu verdichtet (mehr Details)
+            if event.inaxes is not ax or event.xdata is None:
+                return
+            faktor = 0.8 if event.button == 'up' else 1.25
+            von, bis = vorschau['bereich']
+            mitte = (event.xdata - x_start) / schritt_tage
+            neu_von = max(0, int(math.floor(mitte - (mitte - von) * faktor)))
+            neu_bis = min(anzahl_schritte, int(math.ceil(mitte + (bis - mitte) * faktor)))
+            if neu_bis - neu_von < 10 or (neu_von, neu_bis) == (von, bis):
+                return
+            vorschau['bereich'] = (neu_von, neu_bis)
+            vorschau['x_geaendert'] = True
+            schedule_update_graph()
+
+        def on_double_click(event):
+            # Doppelklick zeigt wieder den gesamten Zeitraum
+            if event.dblclick and vorschau['bereich'] != (0, anzahl_schritte):
+                vorschau['bereich'] = (0, anzahl_schritte)
+                vorschau['x_geaendert'] = True
+                schedule_update_graph()
+
+        canvas.mpl_connect('scroll_event', on_scroll)
+        canvas.mpl_connect('button_press_event', on_double_click)
+
+        def vorschau_cache_melden():
+            # Treffer/Fehlzugriffe des Vorschau-Caches (nur bei aktiver Startdiagnose)
+            info = preview_cache_info()
+            diagnose(f"Vorschau-Cache: {info.hits} Treffer, {info.misses} Berechnungen, "
+                     f"{info.currsize}/{info.maxsize} Einträge")
+
+        def cancel_update_graph():
+            # Vorgemerkte Neuzeichnung verwerfen, bevor das Fenster zerstört wird
+            if vorschau['geplant'] is not None:
+                submenu.after_cancel(vorschau['geplant'])
+                vorschau['geplant'] = None
 
         # Slider erstellen mit angepasstem Stil
         style = ttk.Style(submenu)
@@ -1065,7 +907,7 @@ def create_gui():
             def on_slider_change(event):
                 # Aktualisiere die Anzeige des Werts neben dem Slider
                 value_label.config(text=f"{value_var.get():.{precision}f}")
-                update_graph() # Aktualisiere den Plot
+                schedule_update_graph() # Plot-Aktualisierung für den nächsten Frame vormerken
 
             # Slider erstellen
             slider = ttk.Scale(frame, from_=from_, to=to_, variable=value_var, # Nutze die Tkinter Variable
@@ -1131,8 +973,11 @@ def create_gui():
                 except Exception as e:
                     print(f"Fehler beim Übernehmen der Parameter: {e}")
 
+            vorschau_cache_melden()
+
             # Sicherstellen, dass das Submenü geschlossen wird
             try:
+                cancel_update_graph()
                 submenu.destroy()
             except:
                 pass # Schon geschlossen
@@ -1142,6 +987,8 @@ def create_gui():
 
         def on_submenu_close():
             root.submenu_open = False
+            vorschau_cache_melden()
+            cancel_update_graph()
             submenu.destroy()
 
         # Initialen Plot erstellen
@@ -1202,19 +1049,87 @@ def create_gui():
     progress_frame = tk.Frame(main_frame, bg=DISCORD_BG)
     progress_frame.pack(fill=tk.X, pady=(0, 10))
 
-    progress_canvas = tk.Canvas(progress_frame, bg=DISCORD_BG, height=80,
+    progress_canvas = tk.Canvas(progress_frame, bg=DISCORD_BG, height=100,
                              highlightthickness=0, width=580)
     progress_canvas.pack(fill=tk.X)
 
-    create_rounded_rect(progress_canvas, 0, 0, 580, 80, radius=15,
+    create_rounded_rect(progress_canvas, 0, 0, 580, 100, radius=15,
                        fill=DISCORD_DARK, outline="")
 
-    progress = ttk.Progressbar(progress_canvas, orient="horizontal", length=540,
+    progress = ttk.Progressbar(progress_canvas, orient="horizontal", length=400,
                              mode="determinate", style="TProgressbar")
-    progress_canvas.create_window(290, 30, window=progress)
+    progress_canvas.create_window(220, 30, window=progress)
+
+    # Job-Steuerung neben dem Fortschrittsbalken
+    job_button_style = {"bg": DISCORD_INPUT_BG, "fg": DISCORD_TEXT,
+                        "activebackground": DISCORD_DARKER, "activeforeground": DISCORD_TEXT,
+                        "disabledforeground": DISCORD_GRAY_TEXT, "relief": "flat",
+                        "font": ('Arial', 9), "padx": 6, "pady": 2, "state": tk.DISABLED}
+    pause_btn = tk.Button(progress_canvas, text="Pause", width=6, **job_button_style)
+    progress_canvas.create_window(465, 30, window=pause_btn)
+    cancel_job_btn = tk.Button(progress_canvas, text="Abbrechen", width=8, **job_button_style)
+    progress_canvas.create_window(535, 30, window=cancel_job_btn)
+
+    # Steuerung des laufenden Jobs (None, wenn kein Job läuft)
+    aktueller_job = {'control': None}
+
+    def toggle_pause():
+        control = aktueller_job['control']
+        if control is None:
+            return
+        if control.paused:
+            control.resume()
+            pause_btn.config(text="Pause")
+        else:
+            control.pause()
+            pause_btn.config(text="Weiter")
+
+    def cancel_job():
+        control = aktueller_job['control']
+        if control is not None:
+            control.cancel()
+            progress_info.config(text="Wird abgebrochen...")
+            pause_btn.config(state=tk.DISABLED)
+            cancel_job_btn.config(state=tk.DISABLED)
+
+    pause_btn.config(command=toggle_pause)
+    cancel_job_btn.config(command=cancel_job)
+
+    def set_job_running(control):
+        aktueller_job['control'] = control
+        zustand = tk.NORMAL if control is not None else tk.DISABLED
+        pause_btn.config(text="Pause", state=zustand)
+        cancel_job_btn.config(state=zustand)
 
     progress_info = tk.Label(progress_canvas, text="0/0 Werte generiert (0%)", **label_style)
-    progress_canvas.create_window(290, 60, window=progress_info)
+    # Zweizeilig: Abschlussmeldung und darunter die Phasenanteile des Laufs
+    progress_canvas.create_window(290, 70, window=progress_info)
+
+    # Fortschritt des Generator-Threads im festen Takt aus dem Kanal übernehmen
+    def poll_progress(channel):
+        values_created, total_values, message, finished = channel.snapshot()
+        progress['value'] = int((values_created / total_values) * 100) if total_values else 0
+        control = aktueller_job['control']
+        if message:
+            progress_info.config(text=message)
+        elif control is not None and control.cancelled:
+            progress_info.config(text="Wird abgebrochen...")
+        elif control is not None and control.paused:
+            progress_info.config(text=f"Pausiert – {progress_text(values_created, total_values)}")
+        elif total_values:
+            progress_info.config(text=progress_text(values_created, total_values))
+        if finished:
+            set_job_running(None)
+        else:
+            root.after(PROGRESS_POLL_MS, poll_progress, channel)
+
+    def run_generation(channel, *args, **kwargs):
+        # Unerwartete Fehler melden, damit die Abfrage der Oberfläche endet
+        try:
+            create_csv_files(*args, **kwargs)
+        except Exception as e:
+            channel.finish(f"Fehler: {str(e)}", failed=True)
+            print(f"Generation Error: {e}")
 
     # 5. Start Button
     button_frame = tk.Frame(main_frame, bg=DISCORD_BG)
@@ -1242,8 +1157,49 @@ def create_gui():
                         bg=DISCORD_DARK, fg=DISCORD_TEXT, font=('Arial', 11))
     button_canvas.create_window(290, 80, window=werte_info)
 
-
-    # 6. Toggle Switch für CSV und Excel
+    # Anzahl paralleler Prozesse für den CSV-Export
+    prozesse_label = tk.Label(button_canvas, text="Prozesse", bg=DISCORD_DARK, fg=DISCORD_TEXT, font=('Arial', 10))
+    button_canvas.create_window(60, 40, window=prozesse_label, anchor="e")
+    prozesse_var = tk.IntVar(value=1)
+    prozesse_spinbox = tk.Spinbox(button_canvas, from_=1, to=os.cpu_count() or 1, width=3,
+                                  textvariable=prozesse_var, bg=DISCORD_INPUT_BG, fg=DISCORD_TEXT,
+                                  buttonbackground=DISCORD_INPUT_BG, insertbackground=DISCORD_TEXT,
+                                  font=('Arial', 11), bd=0, relief="flat")
+    button_canvas.create_window(70, 40, window=prozesse_spinbox, anchor="w")
+
+    # Kompression der CSV-Ausgabe (gzip/zstd) mit Kompressionsstufe
+    kompression_label = tk.Label(button_canvas, text="Kompr.", bg=DISCORD_DARK, fg=DISCORD_TEXT, font=('Arial', 10))
+    button_canvas.create_window(60, 75, window=kompression_label, anchor="e")
+    kompression_var = tk.StringVar(value="keine")
+    kompression_spinbox = tk.Spinbox(button_canvas, values=("keine", "gzip", "zstd"), width=5,
+                                     textvariable=kompression_var, state="readonly",
+                                     readonlybackground=DISCORD_INPUT_BG, fg=DISCORD_TEXT,
+                                     buttonbackground=DISCORD_INPUT_BG,
+                                     font=('Arial', 11), bd=0, relief="flat")
+    button_canvas.create_window(70, 75, window=kompression_spinbox, anchor="w")
+    kompression_stufe_var = tk.IntVar(value=6)
+    kompression_stufe_spinbox = tk.Spinbox(button_canvas, from_=1, to=19, width=2,
+                                           textvariable=kompression_stufe_var, bg=DISCORD_INPUT_BG, fg=DISCORD_TEXT,
+                                           buttonbackground=DISCORD_INPUT_BG, insertbackground=DISCORD_TEXT,
+                                           font=('Arial', 11), bd=0, relief="flat")
+    button_canvas.create_window(145, 75, window=kompression_stufe_spinbox, anchor="w")
+
+    # Aufbau der CSV-Ausgabe: Datei je Messstelle oder eine Datei im Langformat
+    csv_aufbau_optionen = {
+        "Je Messstelle": "per_station",
+        "Eine Datei (Messstelle)": "long_by_station",
+        "Eine Datei (Zeit)": "long_by_time",
+    }
+    csv_aufbau_var = tk.StringVar(value="Je Messstelle")
+    csv_aufbau_spinbox = tk.Spinbox(button_canvas, values=tuple(csv_aufbau_optionen), width=18,
+                                    textvariable=csv_aufbau_var, state="readonly",
+                                    readonlybackground=DISCORD_INPUT_BG, fg=DISCORD_TEXT,
+                                    buttonbackground=DISCORD_INPUT_BG,
+                                    font=('Arial', 10), bd=0, relief="flat")
+    button_canvas.create_window(575, 75, window=csv_aufbau_spinbox, anchor="e")
+
+
+    # 6. Toggle Switch für CSV, Excel und Parquet
 
     # Format-Switch neben Start-Button hinzufügen
     format_switch_canvas = tk.Canvas(button_canvas, width=100, height=30,
@@ -1266,7 +1222,7 @@ def create_gui():
     switch_text = format_switch_canvas.create_text(50, 15, text="CSV",
                                             fill="white", font=("Arial", 10, "bold"))
 
-    # Funktion zum Umschalten des Formats
+    # Funktion zum Umschalten des Formats (CSV -> Excel -> Parquet -> CSV)
     def toggle_format(event=None):
         if root.output_format == "csv":
             # Zu Excel wechseln
@@ -1274,6 +1230,12 @@ def create_gui():
             format_switch_canvas.itemconfig(switch_bg, fill=DISCORD_GREEN)
             format_switch_canvas.coords(switch_button, 75, 5, 75 + button_size, 5 + button_size)
             format_switch_canvas.itemconfig(switch_text, text="Excel")
+        elif root.output_format == "excel":
+            # Zu Parquet wechseln (typisierte Spalten für Analysewerkzeuge)
+            root.output_format = "parquet"
+            format_switch_canvas.itemconfig(switch_bg, fill="#5865F2")
+            format_switch_canvas.coords(switch_button, 75, 5, 75 + button_size, 5 + button_size)
+            format_switch_canvas.itemconfig(switch_text, text="Parquet")
         else:
             # Zu CSV wechseln
             root.output_format = "csv"
@@ -1287,6 +1249,10 @@ def create_gui():
 
     # Start-Button Funktion
     def start_process(event=None):
+        # Nur ein Job gleichzeitig
+        if aktueller_job['control'] is not None:
+            return
+
         # Hervorhebung des Buttons während Verarbeitung
         start_button_canvas.itemconfig(start_button_bg, fill=BUTTON_HOVER)
         root.update_idletasks()
@@ -1325,15 +1291,48 @@ def create_gui():
                 raise ValueError(result)
 
             messstellen_ids = result # Ergebnis der Validierung verwenden
+            time_axis = "interval" if intervall_modell_var.get() else "daily"
+
+            try:
+                 workers = max(1, int(prozesse_var.get()))
+            except (ValueError, tk.TclError):
+                 raise ValueError("Anzahl Prozesse muss eine ganze Zahl sein.")
+
+            compression = None if kompression_var.get() == "keine" else kompression_var.get()
+            try:
+                 compression_level = int(kompression_stufe_var.get())
+            except (ValueError, tk.TclError):
+                 raise ValueError("Kompressionsstufe muss eine ganze Zahl sein.")
+            if compression == "gzip":
+                 # gzip kennt nur die Stufen 1-9
+                 compression_level = min(compression_level, 9)
+            if root.output_format != "csv":
+                 # Kompressionsauswahl gilt nur für CSV, Parquet nutzt seinen Standard
+                 compression, compression_level = None, None
+            csv_layout = csv_aufbau_optionen[csv_aufbau_var.get()]
 
 
             # Thread starten, um GUI nicht zu blockieren
             # Übergebe formel_params direkt an die Thread-Funktion
-            thread = threading.Thread(target=create_csv_files,
-                                        args=(root, start_date, end_date, messstellen_ids,
-                                            interval_hours, formel_params, progress, progress_info))
+            channel = ProgressChannel()
+            control = JobControl()
+            thread = threading.Thread(target=run_generation,
+                                        args=(channel, root.output_format, start_date, end_date, messstellen_ids,
+                                            interval_hours, formel_params, channel,
+                                            time_axis, workers),
+                                        kwargs={'control': control, 'compression': compression,
+                                                'compression_level': compression_level,
+                                                # Bei einer Datei nach Messstelle immer den Offset-Index mitschreiben
+                                                'csv_layout': csv_layout,
+                                                'csv_index': csv_layout == "long_by_station",
+                                                # Ohne Fortsetzen in der Oberfläche keine Checkpoints: ein Abbruch
+                                                # entfernt unvollständige Dateien
+                                                'checkpoint_interval': 0,
+                                                'profile_dump': CPROFILE_FILE if CPROFILE_FLAG in sys.argv else None})
             thread.daemon = True
             thread.start()
+            set_job_running(control)
+            poll_progress(channel)
 
         except Exception as e:
             progress_info.config(text=f"Fehler: {str(e)}")
@@ -1374,10 +1373,17 @@ def create_gui():
     # Berechne die Zeitspanne und Werteanzahl initial
     berechne_zeitspanne()
 
+    # Ladescreen schließen, sobald das Hauptfenster bereit ist (statt fester Wartezeit)
+    root.deiconify()
+    set_dark_title_bar(root)
+    close_loading()
+    startphase("Hauptfenster bereit")
 
     return root
 
 # Hauptfunktion
 if __name__ == "__main__":
+    # Notwendig für den Prozesspool in der PyInstaller-Exe unter Windows
+    multiprocessing.freeze_support()
     app = create_gui()
     app.mainloop()
\ No newline at end of file
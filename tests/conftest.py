@@ -0,0 +1,52 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# Module liegen im Wurzelverzeichnis des Projekts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from watergen_engine import FormelParameter, JobControl, ProgressChannel, create_csv_files  # noqa: E402
+
+START = datetime(2020, 1, 1)
+ENDE = datetime(2020, 6, 30)
+MESSSTELLEN = ['GWM1', 'GWM2', 'GWM3']
+
+
+class AbbruchNach(JobControl):
+    """Bricht beim n-ten Prüfen an einer Blockgrenze ab"""
+    def __init__(self, n):
+        super().__init__()
+        self.n = n
+
+    def checkpoint(self):
+        self.n -= 1
+        if self.n == 0:
+            self.cancel()
+        super().checkpoint()
+
+
+@pytest.fixture
+def erzeugen(monkeypatch):
+    """
+    Ausgabe in einem Verzeichnis erzeugen (Standard: CSV, 3 Messstellen, stündlich über ein halbes Jahr);
+    liefert ({Dateiname: Inhalt} aller Dateien außer Zustands- und Checkpoint-Datei, ProgressChannel)
+    """
+    def erzeugen(verzeichnis, output_format="csv", end_date=ENDE, interval_hours=1, messstellen=MESSSTELLEN,
+                 **kwargs):
+        verzeichnis.mkdir(exist_ok=True)
+        monkeypatch.chdir(verzeichnis)
+        kwargs.setdefault('profile_log', None)
+        channel = ProgressChannel()
+        create_csv_files(output_format, START, end_date, messstellen, interval_hours, FormelParameter(), channel,
+                         **kwargs)
+        dateien = {f.name: f.read_bytes() for f in sorted(verzeichnis.iterdir())
+                   if f.is_file() and f.suffix != ".json"}
+        return dateien, channel
+    return erzeugen
+
+
+@pytest.fixture
+def abbruch_nach():
+    return AbbruchNach
@@ -0,0 +1,36 @@
+import pytest
+
+import watergen_engine as engine
+
+
+@pytest.mark.parametrize("abgebrochen_nach", [5, 17])
+def test_fortsetzen_nach_abbruch(tmp_path, erzeugen, abbruch_nach, abgebrochen_nach):
+    voll, _ = erzeugen(tmp_path / "voll")
+    teil = tmp_path / "teil"
+    control = abbruch_nach(abgebrochen_nach)
+    abgebrochen, channel = erzeugen(teil, control=control, chunk_rows=500, checkpoint_interval=1e-9)
+    assert control.cancelled and abgebrochen != voll
+    assert (teil / engine.CHECKPOINT_FILE).exists()
+    assert "auf den letzten Checkpoint gekürzt" in channel.snapshot()[2]
+    # Wie nach einem harten Abbruch: Daten hinter dem letzten Checkpoint
+    for datei in teil.glob("*.csv"):
+        with open(datei, "ab") as f:
+            f.write(b"01.01.2099 00:00;kaputt\n")
+    assert erzeugen(teil, resume=True, chunk_rows=500, checkpoint_interval=1e-9)[0] == voll
+    assert not (teil / engine.CHECKPOINT_FILE).exists()
+
+
+@pytest.mark.parametrize("kwargs", [{}, {'checkpoint_interval': 3600}])
+def test_abbruch_ohne_checkpoint_entfernt_dateien(tmp_path, erzeugen, abbruch_nach, kwargs):
+    # Ohne Angabe keine Checkpoints, vor dem ersten Intervall ebenfalls noch keiner:
+    # die fertige Datei bleibt, die laufende wird entfernt
+    dateien, channel = erzeugen(tmp_path, control=abbruch_nach(12), chunk_rows=500, **kwargs)
+    meldung = channel.snapshot()[2]
+    assert "unvollständige Dateien entfernt" in meldung and "Checkpoint" not in meldung
+    assert set(dateien) == {"wasserstände_GWM1.csv"}
+    assert not (tmp_path / engine.CHECKPOINT_FILE).exists()
+
+
+def test_kurzer_lauf_ohne_checkpoint(tmp_path, erzeugen):
+    erzeugen(tmp_path, checkpoint_interval=3600)
+    assert not (tmp_path / engine.CHECKPOINT_FILE).exists()
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import watergen_engine as engine
+from conftest import MESSSTELLEN
+
+pa = pytest.importorskip("pyarrow")
+
+
+def lese_csv(dateien):
+    """(Messstelle, Zeitpunkt, Messwert) aller Zeilen der CSV-Dateien je Messstelle"""
+    zeilen = []
+    for messstelle_id in MESSSTELLEN:
+        for zeile in dateien[f"wasserstände_{messstelle_id}.csv"].decode().splitlines()[1:]:
+            name, zeit, wert = zeile.split(';')
+            zeilen.append((name, zeit, float(wert.replace(',', '.'))))
+    return zeilen
+
+
+@pytest.mark.parametrize("output_format, compression", [("parquet", None), ("parquet", "zstd"),
+                                                        ("arrow", None), ("arrow", "lz4")])
+def test_spalten_entsprechen_csv(tmp_path, erzeugen, output_format, compression):
+    csv_dateien, _ = erzeugen(tmp_path / "csv")
+    dateien, channel = erzeugen(tmp_path / output_format, output_format, compression=compression, chunk_rows=1000)
+    assert not channel.failed
+    filename = engine.columnar_filename(output_format)
+    assert set(dateien) == {filename}
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+        tabelle = pq.read_table(tmp_path / output_format / filename)
+        assert pq.ParquetFile(tmp_path / output_format / filename).metadata.num_row_groups > len(MESSSTELLEN)
+    else:
+        with pa.memory_map(str(tmp_path / output_format / filename)) as quelle:
+            tabelle = pa.ipc.open_file(quelle).read_all()
+
+    assert tabelle.column_names == ['GWMST Name', 'Datum/Zeit', 'Messwert']
+    assert pa.types.is_dictionary(tabelle.schema.field('GWMST Name').type)
+    assert pa.types.is_timestamp(tabelle.schema.field('Datum/Zeit').type)
+    assert tabelle.schema.field('Messwert').type == pa.float64()
+
+    erwartet = lese_csv(csv_dateien)
+    zeiten = tabelle.column('Datum/Zeit').to_numpy().astype('datetime64[s]').astype(object)
+    assert tabelle.column('GWMST Name').to_pylist() == [z[0] for z in erwartet]
+    assert [t.strftime('%d.%m.%Y %H:%M:%S') for t in zeiten] == [z[1] for z in erwartet]
+    np.testing.assert_array_equal(tabelle.column('Messwert').to_numpy(), [z[2] for z in erwartet])
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+def test_fehler_entfernt_unvollstaendige_datei(tmp_path, erzeugen, monkeypatch, output_format):
+    bloecke = engine.iter_value_blocks
+
+    def nach_einem_block(*args, **kwargs):
+        for n, block in enumerate(bloecke(*args, **kwargs)):
+            if n == 1:
+                raise OSError("Kein Platz auf dem Gerät")
+            yield block
+
+    monkeypatch.setattr(engine, "iter_value_blocks", nach_einem_block)
+    dateien, channel = erzeugen(tmp_path, output_format, chunk_rows=1000)
+    assert channel.failed and "Kein Platz" in channel.snapshot()[2]
+    assert dateien == {}
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+def test_abbruch_entfernt_unvollstaendige_datei(tmp_path, erzeugen, abbruch_nach, output_format):
+    dateien, channel = erzeugen(tmp_path, output_format, chunk_rows=1000, control=abbruch_nach(3))
+    assert "Abgebrochen" in channel.snapshot()[2]
+    assert dateien == {}
@@ -0,0 +1,52 @@
+import gzip
+import io
+from datetime import datetime
+
+import pytest
+
+import watergen_engine as engine
+
+
+def entpacken(name, inhalt):
+    if name.endswith(".gz"):
+        return name[:-3], gzip.decompress(inhalt)
+    if name.endswith(".zst"):
+        zstandard = pytest.importorskip("zstandard")
+        # Eine verlängerte Datei besteht aus mehreren Frames
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(inhalt), read_across_frames=True) as reader:
+            return name[:-4], reader.read()
+    return name, inhalt
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+@pytest.mark.parametrize("kwargs", [{}, {'csv_layout': "long_by_time"}, {'workers': 2}])
+def test_kompression_entspricht_csv(tmp_path, erzeugen, compression, kwargs):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    roh, _ = erzeugen(tmp_path / "roh", **kwargs)
+    gepackt, channel = erzeugen(tmp_path / compression, compression=compression, compression_level=1, **kwargs)
+    endung = engine.CSV_COMPRESSION[compression][0]
+    assert all(name.endswith(endung) for name in gepackt)
+    assert dict(entpacken(name, inhalt) for name, inhalt in gepackt.items()) == roh
+    assert f"({compression}, Verhältnis" in channel.snapshot()[2]
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_verlaengern_komprimiert(tmp_path, erzeugen, compression):
+    # Die Verlängerung hängt einen weiteren gzip-Member bzw. zstd-Frame an
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    roh, _ = erzeugen(tmp_path / "roh")
+    erzeugen(tmp_path / "teil", end_date=datetime(2020, 3, 17), compression=compression, extendable=True)
+    verlaengert, _ = erzeugen(tmp_path / "teil", compression=compression, extend=True)
+    assert dict(entpacken(name, inhalt) for name, inhalt in verlaengert.items()) == roh
+
+
+def test_gzip_reproduzierbar(tmp_path, erzeugen):
+    # mtime=0 im gzip-Kopf: gleiche Werte ergeben dieselben Dateien
+    assert erzeugen(tmp_path / "a", compression="gzip")[0] == erzeugen(tmp_path / "b", compression="gzip")[0]
+
+
+def test_unbekannte_kompression(tmp_path):
+    with pytest.raises(ValueError):
+        engine.open_csv_output(str(tmp_path / "x.csv"), "bz2")
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import watergen_engine as engine
+from conftest import MESSSTELLEN
+
+KOPF = b'GWMST Name;Datum/Zeit;Messwert\r\n'
+
+
+def test_distance_correlation():
+    punkte = np.array([[0.0, 0.0], [3.0, 4.0], [6.0, 8.0], [1e4, 0.0]])
+    korrelation = engine.distance_correlation(punkte, 5.0)
+    abstand = np.linalg.norm(punkte[:, None] - punkte[None, :], axis=-1)
+    np.testing.assert_allclose(korrelation, np.exp(-abstand / 5.0), rtol=1e-12, atol=1e-12)
+    np.testing.assert_array_equal(np.diag(korrelation), 1.0)
+    with pytest.raises(ValueError):
+        engine.distance_correlation(punkte, 0)
+    with pytest.raises(ValueError):
+        engine.distance_correlation([1.0, 2.0], 5.0)
+
+
+def test_correlation_factor():
+    korrelation = engine.distance_correlation(np.random.default_rng(3).uniform(0, 100, (200, 2)), 30.0)
+    faktor = engine.correlation_factor(korrelation)
+    np.testing.assert_allclose(faktor @ faktor.T, korrelation, rtol=0, atol=1e-10)
+    assert np.all(np.triu(faktor, 1) == 0)
+    # Vollständig korrelierte Messstellen: nur positiv semidefinit, Zerlegung mit Zuschlag
+    faktor = engine.correlation_factor(np.ones((4, 4)))
+    np.testing.assert_allclose(faktor @ faktor.T, np.ones((4, 4)), rtol=0, atol=1e-5)
+
+
+@pytest.mark.parametrize("korrelation", [
+    np.ones((2, 3)),                                  # nicht quadratisch
+    np.array([[1.0, 0.5], [0.2, 1.0]]),               # nicht symmetrisch
+    np.array([[2.0, 0.5], [0.5, 1.0]]),               # Diagonale nicht 1
+    np.array([[1.0, 0.9, -0.9], [0.9, 1.0, 0.9], [-0.9, 0.9, 1.0]]),  # nicht positiv semidefinit
+])
+def test_correlation_factor_fehler(korrelation):
+    with pytest.raises(ValueError):
+        engine.correlation_factor(korrelation)
+
+
+def test_reihen_folgen_der_korrelation():
+    t = np.arange(3000.0)
+    parameter = (10.0, 1.0, 365, 1.0, 3.0, 12.0, 0.4)
+
+    def streuung(korrelation):
+        reihen = engine.calculate_gw_series(t, *parameter, rng=engine.model_rng(1), correlation=korrelation,
+                                            field_rng=engine.field_rng(1))
+        assert reihen.shape == (3, len(t))
+        # Gemeinsame saisonale Kurve fällt heraus, es bleiben die Unterschiede der Störungen
+        return np.std(reihen - reihen.mean(axis=0))
+
+    stark = np.full((3, 3), 0.9) + 0.1 * np.eye(3)
+    assert streuung(np.ones((3, 3))) < 1e-3
+    assert streuung(stark) < 0.5 * streuung(np.eye(3))
+
+
+def test_korrelierte_ausgabe_je_messstelle_wie_im_zeittakt(tmp_path, erzeugen):
+    # Je Messstelle über den temporären Basisspeicher, long_by_time direkt im Zeittakt
+    korrelation = engine.distance_correlation([[0, 0], [50, 0], [0, 500]], 100.0)
+    temp = tmp_path / "temp"
+    je_messstelle, _ = erzeugen(tmp_path / "einzeln", correlation=korrelation, workers=2, temp_dir=str(temp))
+    assert not any(temp.iterdir())
+    zeittakt, _ = erzeugen(tmp_path / "zeittakt", correlation=korrelation, csv_layout="long_by_time")
+    zeilen = zeittakt['wasserstände_alle_messstellen.csv'][len(KOPF):].split(b'\r\n')[:-1]
+    erwartet = zip(*(je_messstelle[f"wasserstände_{m}.csv"][len(KOPF):].split(b'\r\n')[:-1] for m in MESSSTELLEN))
+    assert zeilen == [zeile for zeitpunkt in erwartet for zeile in zeitpunkt]
+    assert je_messstelle != erzeugen(tmp_path / "ohne")[0]
+
+
+def test_korrelationsmatrix_passend_zu_messstellen(tmp_path, erzeugen):
+    with pytest.raises(ValueError):
+        erzeugen(tmp_path, correlation=np.eye(2))
@@ -0,0 +1,37 @@
+import csv
+import io
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import watergen_engine as engine
+from conftest import ENDE, START
+
+
+def test_zeitstempel_wie_strftime():
+    zeitpunkte = engine.build_time_axis(START, ENDE, 0.25, 0, 20000)
+    erwartet = [t.strftime("%d.%m.%Y %H:%M:%S") for t in zeitpunkte.astype('datetime64[s]').astype(datetime)]
+    assert engine.format_timestamps(zeitpunkte) == erwartet
+    assert engine.format_timestamps(np.array([], dtype='datetime64[s]')) == []
+
+
+def test_messwerte_wie_fstring():
+    werte = np.concatenate([np.random.default_rng(4).normal(100, 50, 5000),
+                            [0.0, -0.0, -0.004, 0.005, 0.015, 1e6, -123.455]])
+    assert engine.format_messwerte(werte) == [f'{w:.2f}'.replace('.', ',') for w in werte]
+
+
+@pytest.mark.parametrize("messstelle", ["GWM1", 'GWM;2 "Süd" 100%'])
+def test_csv_wie_csv_writer(tmp_path, monkeypatch, messstelle):
+    # Referenz: der frühere Weg mit csv.writer, strftime und replace je Zeile
+    monkeypatch.chdir(tmp_path)
+    job = engine.prepare_job(START, ENDE, 1, engine.FormelParameter(), "daily", None)
+    engine.export_station_csv(job, 0, messstelle, chunk_rows=1000)
+    referenz = io.StringIO(newline='')
+    writer = csv.writer(referenz, delimiter=';')
+    writer.writerow(['GWMST Name', 'Datum/Zeit', 'Messwert'])
+    for _, zeitpunkte, messwerte in engine.iter_station_blocks(job, 0, messstelle, engine.CSV_OFFSET_FAKTOR):
+        for zeitpunkt, messwert in zip(zeitpunkte.astype('datetime64[s]').astype(datetime), messwerte):
+            writer.writerow([messstelle, zeitpunkt.strftime("%d.%m.%Y %H:%M:%S"), f'{messwert:.2f}'.replace('.', ',')])
+    assert (tmp_path / engine.csv_filename(messstelle)).read_bytes() == referenz.getvalue().encode('utf-8')
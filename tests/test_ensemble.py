@@ -0,0 +1,80 @@
+import copy
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import watergen_engine as engine
+from conftest import START
+
+
+def einzellauf(job, mitglieder, k):
+    # Job eines Mitglieds mit den Parametern als gewöhnliche Skalare
+    einzeln = dict(job, formel_params=copy.copy(job['formel_params']))
+    for name, werte in mitglieder.items():
+        setattr(einzeln['formel_params'], name, werte[k].item())
+    return engine.job_model_stream(einzeln).values(0, engine.model_length(einzeln))
+
+
+def test_grid_ist_kartesisches_produkt():
+    mitglieder = engine.sweep_members(engine.FormelParameter(), {
+        'modus': "grid", 'parameter': {'A': [0.3, 0.5], 'Dd': {'von': 60, 'bis': 180, 'anzahl': 3}}})
+    assert list(zip(mitglieder['A'], mitglieder['Dd'])) == [
+        (0.3, 60), (0.3, 120), (0.3, 180), (0.5, 60), (0.5, 120), (0.5, 180)]
+
+
+def test_random_reproduzierbar():
+    spezifikation = {'modus': "random", 'anzahl': 50, 'parameter': {
+        'A': {'verteilung': "uniform", 'min': 0.2, 'max': 0.8}, 'seed': [1, 2, 3]}}
+    mitglieder = engine.sweep_members(engine.FormelParameter(), spezifikation)
+    assert mitglieder['seed'].dtype == np.int64 and set(mitglieder['seed']) <= {1, 2, 3}
+    assert np.all((mitglieder['A'] >= 0.2) & (mitglieder['A'] < 0.8))
+    wiederholt = engine.sweep_members(engine.FormelParameter(), spezifikation)
+    assert all(np.array_equal(mitglieder[name], wiederholt[name]) for name in mitglieder)
+
+
+@pytest.mark.parametrize("spezifikation", [
+    {'modus': "lhs", 'parameter': {'A': [1]}},
+    {'parameter': {}},
+    {'parameter': {'gibt_es_nicht': [1]}},
+    {'modus': "grid", 'parameter': {'A': {'verteilung': "uniform", 'min': 0, 'max': 1}}},
+    {'modus': "random", 'parameter': {'A': {'verteilung': "gamma"}}},
+])
+def test_ungueltiger_sweep(spezifikation):
+    with pytest.raises(ValueError):
+        engine.sweep_members(engine.FormelParameter(), spezifikation)
+
+
+@pytest.mark.parametrize("anzahl, toleranz", [(64, 0), (100, 1e-12)])
+def test_mitglied_entspricht_einzellauf(anzahl, toleranz):
+    # Über mehrere Modellblöcke; bis 64 Mitglieder bitgleich, darüber kürzere Blöcke (siehe export_ensemble)
+    job = engine.prepare_job(START, datetime(2022, 1, 1), 0.25, engine.FormelParameter(), "interval")
+    rng = np.random.default_rng(5)
+    mitglieder = {'A': rng.uniform(0.2, 2.0, anzahl), 'Dd': rng.uniform(5, 30, anzahl),
+                  'trend': rng.uniform(-0.5, 0.5, anzahl), 'seed': rng.integers(1, 4, anzahl)}
+    matrix = engine.job_model_stream(job, mitglieder).values(0, engine.model_length(job))
+    assert matrix.shape == (engine.model_length(job), anzahl)
+    for k in (0, 1, anzahl - 1):
+        np.testing.assert_allclose(matrix[:, k], einzellauf(job, mitglieder, k), rtol=0, atol=toleranz)
+
+
+def test_ensemble_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sweep = {'modus': "grid", 'parameter': {'A': [0.5, 1.0, 1.5], 'seed': [1, 2]}}
+    channel = engine.ProgressChannel()
+    engine.create_ensemble_files("csv", START, datetime(2020, 6, 30), 1, engine.FormelParameter(), sweep, channel,
+                                 chunk_rows=100, profile_log=None)
+    assert channel.snapshot()[3] and not channel.failed
+    dateien = engine.ensemble_filenames(engine.ENSEMBLE_BASENAME, "csv")
+    assert (tmp_path / dateien['mitglieder']).read_text(encoding='utf-8').splitlines() == [
+        "Mitglied;A;seed", "M1;0,5;1", "M2;0,5;2", "M3;1,0;1", "M4;1,0;2", "M5;1,5;1", "M6;1,5;2"]
+    werte = (tmp_path / dateien['werte']).read_text(encoding='utf-8').splitlines()
+    baender = (tmp_path / dateien['baender']).read_text(encoding='utf-8').splitlines()
+    assert werte[0] == "Datum/Zeit;M1;M2;M3;M4;M5;M6"
+    assert baender[0] == "Datum/Zeit;P5;P25;P50;P75;P95;Mittelwert"
+    job = engine.prepare_job(START, datetime(2020, 6, 30), 1, engine.FormelParameter(), "daily")
+    mitglieder = engine.sweep_members(engine.FormelParameter(), sweep)
+    m4 = einzellauf(job, mitglieder, 3)
+    assert [zeile.split(';')[4] for zeile in werte[1:]] == engine.format_messwerte(m4)
+    matrix = np.array([einzellauf(job, mitglieder, k) for k in range(6)]).T
+    assert [zeile.split(';')[3] for zeile in baender[1:]] == engine.format_messwerte(np.median(matrix, axis=1))
@@ -0,0 +1,77 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import pytest
+
+import watergen_engine as engine
+
+pytest.importorskip("xlsxwriter")
+
+EXCEL_DATEI = 'wasserstände_alle_messstellen.xlsx'
+NS = {'x': "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+# Gleichnamig nach dem Bereinigen, zu lang, nur Sonderzeichen
+MESSSTELLEN = ['GWM/1', 'GWM1', 'Grundwassermessstelle Nord am Bahndamm', '[*]']
+
+
+def lesen(datei):
+    """Arbeitsmappe ohne Excel-Bibliothek lesen: {Sheetname: (Spaltenbreiten, Zeilen)}"""
+    with zipfile.ZipFile(datei) as z:
+        texte = []
+        if 'xl/sharedStrings.xml' in z.namelist():
+            texte = [si.findtext('.//x:t', namespaces=NS) for si in ET.fromstring(z.read('xl/sharedStrings.xml'))]
+        namen = [s.get('name') for s in ET.fromstring(z.read('xl/workbook.xml')).iter(f"{{{NS['x']}}}sheet")]
+        mappe = {}
+        for nummer, name in enumerate(namen, 1):
+            sheet = ET.fromstring(z.read(f'xl/worksheets/sheet{nummer}.xml'))
+            breiten = [(c.get('min'), c.get('width')) for c in sheet.iter(f"{{{NS['x']}}}col")]
+            zeilen = []
+            for row in sheet.iter(f"{{{NS['x']}}}row"):
+                zeile = []
+                for c in row:
+                    if c.get('t') == 's':
+                        zeile.append(texte[int(c.findtext('x:v', namespaces=NS))])
+                    elif c.get('t') == 'inlineStr':
+                        zeile.append(c.findtext('.//x:t', namespaces=NS))
+                    else:
+                        zeile.append((c.get('s'), float(c.findtext('x:v', namespaces=NS))))
+                zeilen.append(zeile)
+            mappe[name] = (breiten, zeilen)
+    return mappe
+
+
+def test_constant_memory_wie_pandas(tmp_path, erzeugen):
+    pytest.importorskip("pandas")
+    erzeugen(tmp_path / "pandas", "excel", end_date=datetime(2020, 1, 20), messstellen=MESSSTELLEN,
+             excel_mode="pandas")
+    erzeugen(tmp_path / "direkt", "excel", end_date=datetime(2020, 1, 20), messstellen=MESSSTELLEN, chunk_rows=100)
+    direkt = lesen(tmp_path / "direkt" / EXCEL_DATEI)
+    assert list(direkt) == ['GWM1', 'GWM1_2', 'Grundwassermessstelle Nord am B', 'Messstelle_4']
+    assert direkt == lesen(tmp_path / "pandas" / EXCEL_DATEI)
+    breiten, zeilen = direkt['GWM1']
+    assert [b for b, _ in breiten] == ['2', '3'] and len(zeilen) == 19 * 24 + 1
+    assert zeilen[0][:2] == ['GWM/1', ('1', 43831.0)]
+
+
+def test_fehler_entfernt_arbeitsmappe(tmp_path, erzeugen, monkeypatch):
+    aufrufe = []
+    excel_serial = engine.excel_serial
+
+    def fehler_im_zweiten_block(zeitpunkte):
+        aufrufe.append(1)
+        if len(aufrufe) == 2:
+            raise OSError("Platte voll")
+        return excel_serial(zeitpunkte)
+
+    monkeypatch.setattr(engine, "excel_serial", fehler_im_zweiten_block)
+    dateien, channel = erzeugen(tmp_path, "excel", chunk_rows=500)
+    assert dateien == {} and channel.failed
+    assert "Platte voll" in channel.snapshot()[2]
+
+
+def test_abbruch_entfernt_arbeitsmappe(tmp_path, erzeugen, abbruch_nach):
+    control = abbruch_nach(5)
+    dateien, _ = erzeugen(tmp_path, "excel", chunk_rows=500, control=control)
+    assert control.cancelled and dateien == {}
+    assert not [f for f in tmp_path.iterdir() if re.search(r'\.(tmp|xlsx)$', f.name)]
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+import watergen_engine as engine
+from conftest import MESSSTELLEN
+
+
+def test_pause_haelt_an_blockgrenze_an():
+    control = engine.JobControl()
+    control.pause()
+    erreicht = threading.Event()
+    thread = threading.Thread(target=lambda: (control.checkpoint(), erreicht.set()))
+    thread.start()
+    assert not erreicht.wait(0.2) and control.paused
+    control.resume()
+    assert erreicht.wait(5)
+    thread.join()
+
+
+def test_abbruch_weckt_pausierten_job():
+    control = engine.JobControl()
+    control.pause()
+    fehler = []
+
+    def pruefen():
+        try:
+            control.checkpoint()
+        except engine.JobCancelled as e:
+            fehler.append(e)
+
+    thread = threading.Thread(target=pruefen)
+    thread.start()
+    time.sleep(0.05)
+    control.cancel()
+    thread.join(5)
+    assert not thread.is_alive() and len(fehler) == 1
+
+
+def test_spiegeln_an_worker():
+    control = engine.JobControl()
+    worker_control = engine.ProcessJobControl()
+    control.pause()
+    worker_control.spiegeln(control)
+    assert worker_control.paused
+    control.resume()
+    worker_control.spiegeln(control)
+    assert not worker_control.paused
+    control.cancel()
+    worker_control.spiegeln(control)
+    with pytest.raises(engine.JobCancelled):
+        worker_control.checkpoint()
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet"])
+def test_abbruch_entfernt_unvollstaendige_dateien(tmp_path, erzeugen, abbruch_nach, output_format):
+    if output_format == "parquet":
+        pytest.importorskip("pyarrow")
+    control = abbruch_nach(3)
+    dateien, channel = erzeugen(tmp_path, output_format, chunk_rows=500, control=control)
+    assert control.cancelled and channel.snapshot()[2].startswith("Abgebrochen")
+    assert not dateien
+
+
+def test_abbruch_mit_workern(tmp_path, erzeugen, abbruch_nach):
+    # Abbruch, wenn der Hauptprozess die zweite Messstelle an den Prozesspool geben will (die erste
+    # Prüfung gehört zur Basisberechnung). Ob die erste Messstelle dann schon fertig ist, hängt vom
+    # Worker ab: übrig bleiben dürfen nur vollständige Dateien
+    voll, _ = erzeugen(tmp_path / "voll", interval_hours=0.25)
+    control = abbruch_nach(3)
+    dateien, channel = erzeugen(tmp_path / "abbruch", interval_hours=0.25, chunk_rows=500, workers=2,
+                                control=control)
+    assert control.cancelled and channel.snapshot()[2].startswith("Abgebrochen")
+    assert set(dateien) <= {f"wasserstände_{MESSSTELLEN[0]}.csv"}
+    assert all(inhalt == voll[name] for name, inhalt in dateien.items())
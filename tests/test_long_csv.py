@@ -0,0 +1,51 @@
+import gzip
+import json
+
+import pytest
+
+import watergen_engine as engine
+from conftest import ENDE, MESSSTELLEN, START
+
+KOPF = b'GWMST Name;Datum/Zeit;Messwert\r\n'
+LANG = 'wasserstände_alle_messstellen.csv'
+
+
+@pytest.fixture
+def je_messstelle(tmp_path, erzeugen):
+    dateien, _ = erzeugen(tmp_path / "einzeln")
+    return [dateien[f"wasserstände_{m}.csv"][len(KOPF):] for m in MESSSTELLEN]
+
+
+def test_long_by_station_mit_index(tmp_path, erzeugen, je_messstelle):
+    dateien, _ = erzeugen(tmp_path / "lang", csv_layout="long_by_station", csv_index=True, chunk_rows=700)
+    inhalt = dateien[LANG]
+    assert inhalt == KOPF + b''.join(je_messstelle)
+    index = json.loads((tmp_path / "lang" / engine.long_csv_index_filename(LANG)).read_text(encoding='utf-8'))
+    assert index['kopfzeile_bytes'] == len(KOPF) and list(index['messstellen']) == MESSSTELLEN
+    for messstelle, teil in zip(MESSSTELLEN, je_messstelle):
+        eintrag = index['messstellen'][messstelle]
+        assert inhalt[eintrag['offset']:eintrag['offset'] + eintrag['bytes']] == teil
+        assert eintrag['zeilen'] == teil.count(b'\r\n')
+
+
+def test_long_by_time_verschraenkt(tmp_path, erzeugen, je_messstelle):
+    dateien, _ = erzeugen(tmp_path / "lang", csv_layout="long_by_time", chunk_rows=700)
+    zeilen = dateien[LANG][len(KOPF):].split(b'\r\n')[:-1]
+    # Je Zeitpunkt alle Messstellen in der Reihenfolge der Eingabe
+    erwartet = zip(*(teil.split(b'\r\n')[:-1] for teil in je_messstelle))
+    assert zeilen == [zeile for zeitpunkt in erwartet for zeile in zeitpunkt]
+
+
+def test_index_bezieht_sich_auf_entpackten_inhalt(tmp_path, erzeugen, je_messstelle):
+    dateien, _ = erzeugen(tmp_path, csv_layout="long_by_station", csv_index=True, compression="gzip")
+    inhalt = gzip.decompress(dateien[LANG + '.gz'])
+    index = json.loads((tmp_path / engine.long_csv_index_filename(LANG + '.gz')).read_text(encoding='utf-8'))
+    assert index['kompression'] == "gzip"
+    eintrag = index['messstellen'][MESSSTELLEN[1]]
+    assert inhalt[eintrag['offset']:eintrag['offset'] + eintrag['bytes']] == je_messstelle[1]
+
+
+def test_index_nur_nach_messstelle(tmp_path):
+    job = engine.prepare_job(START, ENDE, 1, engine.FormelParameter(), "daily", None)
+    with pytest.raises(ValueError):
+        engine.export_long_csv(job, MESSSTELLEN, str(tmp_path / LANG), order="time", write_index=True)
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import watergen_engine as engine
+from watergen_engine import FormelParameter, prepare_job
+
+
+def vorschau_job(ende=datetime(2004, 12, 31), interval_hours=0.25):
+    return prepare_job(datetime(2000, 1, 1), ende, interval_hours, FormelParameter(), "interval")
+
+
+def index_von(job):
+    return engine._preview_index(engine.job_preview_key(job), job['start_date'], job['end_date'],
+                                 job['interval_hours'], job['time_axis'])
+
+
+def spalten_minmax(werte, von, bis, n_buckets):
+    """Minimum/Maximum je Bildpunkt-Spalte direkt aus der vollständigen Reihe"""
+    spalte = (np.arange(von, bis) - von) * n_buckets // (bis - von)
+    return np.array([[werte[von:bis][spalte == k].min(), werte[von:bis][spalte == k].max()]
+                     for k in range(n_buckets)]).ravel()
+
+
+@pytest.fixture(scope="module")
+def reihe():
+    job = vorschau_job()
+    return job, engine.job_model_stream(job).values(0, engine.model_length(job))
+
+
+@pytest.mark.parametrize("von, bis, n_buckets", [(0, None, 50), (1000, 1500, 300), (70000, 71000, 40)])
+def test_minmax_je_spalte(reihe, von, bis, n_buckets):
+    job, werte = reihe
+    bis = len(werte) if bis is None else bis
+    schritte, GW = engine.decimate_model_minmax(job, n_buckets, von, bis)
+    if bis - von <= 2 * n_buckets:
+        np.testing.assert_array_equal(schritte, np.arange(von, bis))
+        np.testing.assert_array_equal(GW, werte[von:bis])
+    else:
+        assert len(GW) == 2 * n_buckets
+        np.testing.assert_array_equal(GW, spalten_minmax(werte, von, bis, n_buckets))
+
+
+@pytest.mark.parametrize("von, bis, n_buckets", [
+    (0, None, 40),           # weite Ansicht aus Blättern, Spaltengrenzen in Blättern
+    (12345, 170001, 37),     # angeschnittene Ränder in verschiedenen Blöcken
+    (140000, 140900, 800),   # alle Punkte ab dem Blockzustand
+    (66000, 131000, 800),    # ab dem Blockzustand über eine Blockgrenze
+])
+def test_index_entspricht_vollstaendiger_rechnung(reihe, von, bis, n_buckets):
+    job, werte = reihe
+    bis = len(werte) if bis is None else bis
+    schritte, GW = engine.decimate_model_minmax(job, n_buckets, von, bis, index_von(job))
+    ohne_index = engine.decimate_model_minmax(job, n_buckets, von, bis)
+    np.testing.assert_array_equal(schritte, ohne_index[0])
+    if bis - von >= 4 * engine.PREVIEW_LEAF * n_buckets:
+        # Blätter über Spaltengrenzen werden ab ihrem Blattzustand neu berechnet
+        np.testing.assert_allclose(GW, ohne_index[1], rtol=0, atol=1e-9)
+    else:
+        np.testing.assert_array_equal(GW, ohne_index[1])
+
+
+def test_index_mit_trend():
+    job = vorschau_job(datetime(2001, 12, 31))
+    job['formel_params'].trend = 0.3
+    werte = engine.job_model_stream(job).values(0, engine.model_length(job))
+    _, GW = engine.decimate_model_minmax(job, 11, 0, None, index_von(job))
+    np.testing.assert_allclose(GW, spalten_minmax(werte, 0, len(werte), 11), rtol=0, atol=1e-9)
+
+
+def test_preview_key_quantisiert():
+    basis = dict(GW0=100.0, A=1.5, T=365, freq=1.0, Da=3.0, Dd=12.0, R_scale=0.4, curve_randomness=0.1,
+                 secondary_freq=2.0, seed=1)
+    assert engine.preview_key(**basis) == engine.preview_key(**dict(basis, GW0=100.0004, A=1.4996))
+    assert engine.preview_key(**basis) != engine.preview_key(**dict(basis, GW0=100.001))
+    assert engine.preview_key(**basis) != engine.preview_key(**dict(basis, seed=2))
+
+
+def test_vorschau_aus_cache():
+    job = vorschau_job(datetime(2000, 3, 31), interval_hours=1)
+    werte = engine.job_model_stream(job).values(0, engine.model_length(job))
+    engine._preview_series.cache_clear()
+    schritte, GW = engine.calculate_gw_preview(job, 100)
+    assert engine.preview_cache_info().misses == 1
+    # Gleicher Parametersatz (bis auf die Rundung des Schlüssels) und gleiche Ansicht: Treffer
+    job['formel_params'].GW0 += 1e-5
+    assert engine.calculate_gw_preview(job, 100)[1] is GW
+    assert engine.preview_cache_info().hits == 1
+    assert not schritte.flags.writeable and not GW.flags.writeable
+    with pytest.raises(ValueError):
+        GW[0] = 0
+    # Ein Ausschnitt derselben Reihe nutzt die vorhandene Übersicht und rechnet nur den Bereich
+    schritte, GW = engine.calculate_gw_preview(job, 400, 100, 300)
+    np.testing.assert_array_equal(schritte, np.arange(100, 300))
+    np.testing.assert_array_equal(GW, werte[100:300])
@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+import watergen_engine as engine
+from conftest import ENDE, MESSSTELLEN, START
+
+
+def test_kanal_zaehlt_aus_mehreren_threads():
+    channel = engine.ProgressChannel()
+    channel.start(8 * 10_000)
+    threads = [threading.Thread(target=lambda: [channel.add(1) for _ in range(10_000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert channel.snapshot() == (80_000, 80_000, None, False)
+
+
+def test_progress_text():
+    assert engine.progress_text(1234, 5000) == "1.234/5.000 Werte generiert (24%)"
+    assert engine.progress_text(0, 0) == "0/0 Werte generiert (100%)"
+
+
+@pytest.mark.parametrize("output_format, kwargs", [("csv", {}), ("csv", {'workers': 2}),
+                                                   ("csv", {'csv_layout': "long_by_time"}), ("excel", {})])
+def test_fortschritt_erreicht_gesamtzahl(tmp_path, monkeypatch, output_format, kwargs):
+    if output_format == "excel":
+        pytest.importorskip("xlsxwriter")
+    meldungen = []
+
+    class Kanal(engine.ProgressChannel):
+        def add(self, zeilen):
+            meldungen.append(zeilen)
+            super().add(zeilen)
+
+    monkeypatch.chdir(tmp_path)
+    channel = Kanal()
+    engine.create_csv_files(output_format, START, ENDE, MESSSTELLEN, 1, engine.FormelParameter(), channel,
+                            chunk_rows=500, profile_log=None, **kwargs)
+    erzeugt, gesamt, meldung, fertig = channel.snapshot()
+    assert fertig and not channel.failed
+    assert erzeugt == gesamt == len(MESSSTELLEN) * 4345
+    assert meldung.startswith(engine.progress_text(gesamt, gesamt))
+    # Gemeldet wird je Block bzw. je fertiger Messstelle, nicht je Zeile
+    assert len(meldungen) <= gesamt / 500 + len(MESSSTELLEN)
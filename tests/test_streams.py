@@ -0,0 +1,47 @@
+import numpy as np
+
+import watergen_engine as engine
+from conftest import MESSSTELLEN
+
+
+def test_messstelle_allein_wie_im_stapel(tmp_path, erzeugen):
+    stapel, _ = erzeugen(tmp_path / "stapel")
+    allein, _ = erzeugen(tmp_path / "allein", messstellen=['GWM2'])
+    umgekehrt, _ = erzeugen(tmp_path / "umgekehrt", messstellen=MESSSTELLEN[::-1] + ['GWM9'], workers=2)
+    assert allein == {'wasserstände_GWM2.csv': stapel['wasserstände_GWM2.csv']}
+    assert {name: umgekehrt[name] for name in stapel} == stapel
+
+
+def test_gleicher_seed_reproduzierbar(tmp_path, erzeugen):
+    erster, _ = erzeugen(tmp_path / "a")
+    assert erzeugen(tmp_path / "b")[0] == erster
+
+
+def test_stroeme_je_messstelle_und_seed_verschieden():
+    werte = {(seed, name): engine.station_rng(seed, name).random(4)
+             for seed in (1, 2) for name in ('GWM1', 'GWM2')}
+    alle = np.array(list(werte.values()))
+    assert len(np.unique(alle, axis=0)) == len(alle)
+    np.testing.assert_array_equal(engine.station_rng(1, 'GWM1').random(4), werte[(1, 'GWM1')])
+
+
+def test_offset_haengt_nur_von_name_und_seed_ab():
+    offset = engine.station_offset(1, 'GWM1', 0.02)
+    assert abs(offset) <= engine.STATION_OFFSET_SPAN / 2 * 0.02
+    assert engine.station_offset(1, 'GWM1', 0.02) == offset
+    assert engine.station_offset(2, 'GWM1', 0.02) != offset
+    assert engine.station_offset(1, 'GWM2', 0.02) != offset
+
+
+def test_globaler_zufallszustand_unveraendert(tmp_path, erzeugen):
+    np.random.seed(123)
+    vorher = np.random.get_state()[1].copy()
+    erzeugen(tmp_path)
+    np.testing.assert_array_equal(np.random.get_state()[1], vorher)
+
+
+def test_zeittakt_wie_je_messstelle(tmp_path, erzeugen):
+    je_messstelle, _ = erzeugen(tmp_path / "je", messstellen=['GWM2'])
+    lang, _ = erzeugen(tmp_path / "lang", csv_layout="long_by_time", messstellen=['GWM3', 'GWM2'])
+    zeilen = [z for z in next(iter(lang.values())).split(b'\r\n')[1:] if z.startswith(b'GWM2;')]
+    assert zeilen == je_messstelle['wasserstände_GWM2.csv'].split(b'\r\n')[1:-1]
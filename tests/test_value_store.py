@@ -0,0 +1,69 @@
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+import watergen_engine as engine
+from conftest import MESSSTELLEN
+
+
+def inhalt(output_format, dateien):
+    """Vergleichbarer Inhalt: Parquet als Tabelle (Row Groups folgen chunk_rows), Excel ohne Erstellungszeit"""
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+        return {name: pq.read_table(io.BytesIO(daten)).to_pydict() for name, daten in dateien.items()}
+    if output_format == "excel":
+        mappen = {}
+        for name, daten in dateien.items():
+            with zipfile.ZipFile(io.BytesIO(daten)) as z:
+                mappen[name] = {teil: z.read(teil) for teil in z.namelist() if teil != 'docProps/core.xml'}
+        return mappen
+    return dateien
+
+
+@pytest.mark.parametrize("output_format, kwargs", [
+    ("csv", {}), ("csv", {'workers': 2}), ("csv", {'csv_layout': "long_by_time"}),
+    ("excel", {}), ("parquet", {}), ("csv", {'correlation': np.full((3, 3), 0.5) + 0.5 * np.eye(3)}),
+])
+def test_wertespeicher_wie_im_speicher(tmp_path, erzeugen, output_format, kwargs):
+    pytest.importorskip({"excel": "xlsxwriter", "parquet": "pyarrow"}.get(output_format, "numpy"))
+    direkt, _ = erzeugen(tmp_path / "direkt", output_format, **kwargs)
+    speicher = str(tmp_path / "speicher")
+    aus_speicher, _ = erzeugen(tmp_path / "speicher_aus", output_format, value_store=speicher, chunk_rows=700,
+                               **kwargs)
+    assert inhalt(output_format, aus_speicher) == inhalt(output_format, direkt)
+    store = engine.ValueStore(speicher)
+    assert store.meta['basis_fertig'] and list(store.fertig) == [store.meta['anzahl']] * len(MESSSTELLEN)
+
+
+def test_anderes_format_liest_nur(tmp_path, erzeugen, monkeypatch):
+    speicher = str(tmp_path / "speicher")
+    erzeugen(tmp_path / "csv", value_store=speicher)
+    # Basis und Zufallszahlen liegen vollständig vor: kein Modelldurchlauf mehr
+    monkeypatch.setattr(engine, "job_model_stream", None)
+    dateien, channel = erzeugen(tmp_path / "lang", csv_layout="long_by_station", value_store=speicher)
+    assert "Wertespeicher: 13.035 Werte wiederverwendet" in channel.snapshot()[2]
+    monkeypatch.undo()
+    assert dateien == erzeugen(tmp_path / "lang_direkt", csv_layout="long_by_station")[0]
+
+
+def test_abgebrochener_lauf_setzt_fort(tmp_path, erzeugen, abbruch_nach):
+    voll, _ = erzeugen(tmp_path / "voll")
+    speicher = str(tmp_path / "speicher")
+    control = abbruch_nach(12)
+    erzeugen(tmp_path / "teil", value_store=speicher, chunk_rows=500, control=control)
+    assert control.cancelled
+    gespeichert = engine.ValueStore(speicher).stored_values()
+    assert 0 < gespeichert < len(MESSSTELLEN) * 4345
+    dateien, channel = erzeugen(tmp_path / "teil", value_store=speicher, chunk_rows=500)
+    assert dateien == voll
+    assert f"{gespeichert:,} Werte wiederverwendet".replace(',', '.') in channel.snapshot()[2]
+
+
+def test_anderer_job_legt_speicher_neu_an(tmp_path, erzeugen):
+    speicher = str(tmp_path / "speicher")
+    erzeugen(tmp_path / "a", value_store=speicher)
+    dateien, channel = erzeugen(tmp_path / "b", value_store=speicher, interval_hours=2)
+    assert "wiederverwendet" not in channel.snapshot()[2]
+    assert dateien == erzeugen(tmp_path / "c", interval_hours=2)[0]
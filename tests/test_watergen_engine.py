@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import watergen_engine as engine
+from conftest import MESSSTELLEN
+
+
+@pytest.mark.parametrize("prev", [None, (101.5, 0.3)])
+def test_scan_entspricht_schleife(prev):
+    rng = np.random.default_rng(7)
+    seasonal = rng.normal(0, 0.5, 5000)
+    R_base = rng.normal(0, 1, 5000)
+    scan = engine._gw_recurrence(seasonal, R_base, 100.0, 3.0, 12.0, 0.4, "scan", prev)
+    loop = engine._gw_recurrence(seasonal, R_base, 100.0, 3.0, 12.0, 0.4, "loop", prev)
+    np.testing.assert_allclose(scan, loop, rtol=0, atol=1e-9)
+
+
+def test_scan_entspricht_schleife_ueber_bloecke():
+    t = np.arange(0, 2 * engine.MODEL_BLOCK + 100) / 24
+    werte = {}
+    for methode in ("scan", "loop"):
+        werte[methode] = engine.calculate_gw_series(t, 100.0, 1.5, 365, 1.0, 3.0, 12.0, 0.4, engine=methode,
+                                                    dt=1 / 24, rng=engine.model_rng(1))
+    np.testing.assert_allclose(werte["scan"], werte["loop"], rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("kwargs", [{'chunk_rows': 777}, {'workers': 2}, {'time_axis': "interval", 'chunk_rows': 333}])
+def test_csv_unabhaengig_von_blockgroesse_und_workern(tmp_path, erzeugen, kwargs):
+    referenz, _ = erzeugen(tmp_path / "referenz", time_axis=kwargs.get('time_axis', "daily"))
+    assert set(referenz) == {f"wasserstände_{m}.csv" for m in MESSSTELLEN}
+    assert erzeugen(tmp_path / "variante", **kwargs)[0] == referenz
+
+
+@pytest.mark.parametrize("kwargs", [{}, {'time_axis': "interval", 'interval_hours': 0.25},
+                                    {'csv_layout': "long_by_time", 'time_axis': "interval"}])
+def test_verlaengern_entspricht_vollem_lauf(tmp_path, erzeugen, kwargs):
+    voll, _ = erzeugen(tmp_path / "voll", **kwargs)
+    erzeugen(tmp_path / "teil", end_date=datetime(2020, 3, 17), extendable=True, **kwargs)
+    assert erzeugen(tmp_path / "teil", extend=True, **kwargs)[0] == voll
+
+
+def test_verlaengern_ohne_zustandsdatei(tmp_path, erzeugen):
+    erzeugen(tmp_path, end_date=datetime(2020, 3, 17))
+    with pytest.raises(ValueError):
+        erzeugen(tmp_path, extend=True)
+
+
+@pytest.mark.parametrize("csv_layout", ["per_station", "long_by_station"])
+def test_basis_einmal_fuer_alle_messstellen(tmp_path, erzeugen, monkeypatch, csv_layout):
+    einzeln = {}
+    for messstelle in MESSSTELLEN:
+        einzeln.update(erzeugen(tmp_path / messstelle, messstellen=[messstelle])[0])
+    aufrufe = []
+    job_model_stream = engine.job_model_stream
+    monkeypatch.setattr(engine, "job_model_stream", lambda job: aufrufe.append(job) or job_model_stream(job))
+    dateien, _ = erzeugen(tmp_path / "alle", csv_layout=csv_layout, temp_dir=str(tmp_path / "temp"))
+    assert len(aufrufe) == 1
+    assert not any((tmp_path / "temp").iterdir())
+    if csv_layout == "per_station":
+        assert dateien == einzeln
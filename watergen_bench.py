@@ -0,0 +1,285 @@
+# Benchmarks für die Generator-Engine und die Exporter von WaterGen.
+# Misst Modellberechnung, Export (CSV/Excel), Vorschau-Aktualisierung und Spitzenspeicher
+# und schreibt die Ergebnisse als JSON, damit Läufe miteinander verglichen werden können.
+#
+# Beispiele:
+#   python watergen_bench.py --output bench_vorher.json
+#   python watergen_bench.py --quick --output bench_nachher.json --vergleich bench_vorher.json
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from watergen_engine import (
+    FormelParameter,
+    ProgressChannel,
+    calculate_gw_series,
+    calculate_gw_preview,
+    create_csv_files,
+    model_length,
+    model_rng,
+    model_step_days,
+    prepare_job,
+    _preview_series,
+)
+
+MODEL_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+# Die Referenzschleife nur für kleine Reihen messen
+LOOP_MAX_DAYS = 10_000
+
+EXPORT_FORMATS = ["csv", "excel"]
+EXPORT_STATIONS = [1, 10, 50]
+EXPORT_INTERVALS = [24, 1, 0.25]
+EXPORT_DAYS = 365
+# Exporte schreiben große Dateien und laufen lange genug für eine einzelne Messung
+EXPORT_REPEATS = 1
+
+# Vorschau: Zeitraum (Jahre), Intervall (Stunden), Modell im Intervall
+PREVIEW_JOBS = [(1, 24, "daily"), (20, 0.25, "daily"), (20, 0.25, "interval")]
+PREVIEW_WIDTH_PX = 390
+
+REPEATS = 3
+
+
+def messen(funktion, repeats=REPEATS):
+    """Beste Laufzeit (s) aus mehreren Wiederholungen, wie timeit"""
+    zeiten = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        funktion()
+        zeiten.append(time.perf_counter() - start)
+    return min(zeiten)
+
+
+def bench_model(sizes, repeats):
+    params = FormelParameter()
+    ergebnisse = []
+    for n in sizes:
+        t_array = np.arange(n)
+        for engine in ("scan", "loop"):
+            if engine == "loop" and n > LOOP_MAX_DAYS:
+                continue
+            sekunden = messen(lambda: calculate_gw_series(
+                t_array, params.GW0, params.A, params.T, params.freq, params.Da, params.Dd, params.R_scale,
+                params.phase, params.trend, params.curve_randomness, params.secondary_freq,
+                engine=engine, rng=model_rng(params.seed)), repeats)
+            ergebnisse.append({'bench': 'model', 'engine': engine, 'tage': n,
+                               'sekunden': sekunden, 'tage_pro_s': n / sekunden})
+            print(f"Modell {engine:4} {n:>9,} Tage: {sekunden * 1000:9.1f} ms", file=sys.stderr)
+    return ergebnisse
+
+
+def verzeichnis_bytes(pfad):
+    return sum(os.path.getsize(os.path.join(pfad, name)) for name in os.listdir(pfad))
+
+
+def bench_export(formats, stations, intervals, tage, repeats):
+    params = FormelParameter()
+    start_date = datetime(2020, 1, 1)
+    end_date = start_date + timedelta(days=tage - 1)
+    ergebnisse = []
+    arbeitsverzeichnis = os.getcwd()
+    for output_format in formats:
+        for anzahl in stations:
+            messstellen_ids = [f"GWM{i + 1}" for i in range(anzahl)]
+            for interval_hours in intervals:
+                with tempfile.TemporaryDirectory() as verzeichnis:
+                    os.chdir(verzeichnis)
+                    try:
+                        channel = ProgressChannel()
+                        # Ohne Profil-Log und Checkpoints: im Verzeichnis liegen danach nur die Datendateien
+                        sekunden = messen(lambda: create_csv_files(output_format, start_date, end_date, messstellen_ids,
+                                                                   interval_hours, params, channel, profile_log=None,
+                                                                   checkpoint_interval=0), repeats)
+                        werte = channel.snapshot()[1]
+                        datei_bytes = verzeichnis_bytes(verzeichnis)
+                    finally:
+                        os.chdir(arbeitsverzeichnis)
+                if channel.failed:
+                    raise RuntimeError(channel.message)
+                ergebnisse.append({'bench': 'export', 'format': output_format, 'messstellen': anzahl,
+                                   'intervall_h': interval_hours, 'tage': tage, 'werte': werte,
+                                   'sekunden': sekunden, 'werte_pro_s': werte / sekunden, 'bytes': datei_bytes})
+                print(f"Export {output_format:5} {anzahl:>3} Messstellen, {interval_hours:>5} h: "
+                      f"{sekunden:7.2f} s, {werte / sekunden:>12,.0f} Werte/s", file=sys.stderr)
+    return ergebnisse
+
+
+def bench_preview(jobs, repeats):
+    """
+    Latenz einer Vorschau-Aktualisierung wie update_graph im Formel-Untermenü:
+    Berechnung (ohne Cache), Blit der Linie und vollständiges Neuzeichnen (Agg, ohne Tk).
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+    except ImportError:
+        print("Vorschau: matplotlib nicht installiert, übersprungen", file=sys.stderr)
+        return []
+
+    ergebnisse = []
+    for jahre, interval_hours, time_axis in jobs:
+        params = FormelParameter()
+        start_date = datetime(2020, 1, 1)
+        job = prepare_job(start_date, start_date + timedelta(days=365 * jahre - 1), interval_hours, params, time_axis)
+
+        fig = Figure(figsize=(5, 4), dpi=100)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        (linie,) = ax.plot([], [], animated=True)
+        schritte, werte = calculate_gw_preview(job, PREVIEW_WIDTH_PX)
+        linie.set_data(schritte * model_step_days(job), werte)
+        ax.set_xlim(0, model_length(job) * model_step_days(job))
+        ax.set_ylim(werte.min() - 1, werte.max() + 1)
+        canvas.draw()
+        hintergrund = canvas.copy_from_bbox(fig.bbox)
+
+        def berechnen():
+            # Ohne Cache: jeder Schritt ein neuer Parametersatz
+            _preview_series.cache_clear()
+            params.GW0 += 0.001
+            return calculate_gw_preview(job, PREVIEW_WIDTH_PX)
+
+        def blit():
+            schritte, werte = berechnen()
+            linie.set_data(schritte * model_step_days(job), werte)
+            canvas.restore_region(hintergrund)
+            ax.draw_artist(linie)
+            canvas.blit(ax.bbox)
+
+        def voll():
+            schritte, werte = berechnen()
+            linie.set_data(schritte * model_step_days(job), werte)
+            canvas.draw()
+
+        def cache_treffer():
+            calculate_gw_preview(job, PREVIEW_WIDTH_PX)
+
+        cache_treffer()
+        for art, funktion in (("berechnung", berechnen), ("blit", blit), ("voll", voll), ("cache", cache_treffer)):
+            zeiten = []
+            for _ in range(max(repeats, 5)):
+                start = time.perf_counter()
+                funktion()
+                zeiten.append(time.perf_counter() - start)
+            ergebnisse.append({'bench': 'preview', 'art': art, 'jahre': jahre, 'intervall_h': interval_hours,
+                               'time_axis': time_axis, 'schritte': model_length(job),
+                               'ms_median': statistics.median(zeiten) * 1000, 'ms_min': min(zeiten) * 1000})
+            print(f"Vorschau {jahre:>2} Jahre, {interval_hours:>5} h, {time_axis:8} {art:10}: "
+                  f"{statistics.median(zeiten) * 1000:8.2f} ms", file=sys.stderr)
+    return ergebnisse
+
+
+def bench_memory(model_days, export_stations, export_interval, export_tage):
+    """Spitzenspeicher (tracemalloc, inkl. NumPy-Arrays) für Modell und Export"""
+    params = FormelParameter()
+    ergebnisse = []
+
+    tracemalloc.start()
+    calculate_gw_series(np.arange(model_days), params.GW0, params.A, params.T, params.freq, params.Da, params.Dd,
+                        params.R_scale, params.phase, params.trend, params.curve_randomness, params.secondary_freq,
+                        rng=model_rng(params.seed))
+    _, spitze = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ergebnisse.append({'bench': 'memory', 'art': 'model', 'tage': model_days, 'spitze_bytes': spitze})
+    print(f"Speicher Modell {model_days:,} Tage: {spitze / 1e6:.1f} MB", file=sys.stderr)
+
+    start_date = datetime(2020, 1, 1)
+    end_date = start_date + timedelta(days=export_tage - 1)
+    messstellen_ids = [f"GWM{i + 1}" for i in range(export_stations)]
+    arbeitsverzeichnis = os.getcwd()
+    for output_format in EXPORT_FORMATS:
+        with tempfile.TemporaryDirectory() as verzeichnis:
+            os.chdir(verzeichnis)
+            try:
+                tracemalloc.start()
+                create_csv_files(output_format, start_date, end_date, messstellen_ids, export_interval,
+                                 params, ProgressChannel())
+                _, spitze = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            finally:
+                os.chdir(arbeitsverzeichnis)
+        ergebnisse.append({'bench': 'memory', 'art': 'export', 'format': output_format,
+                           'messstellen': export_stations, 'intervall_h': export_interval, 'tage': export_tage,
+                           'spitze_bytes': spitze})
+        print(f"Speicher Export {output_format}: {spitze / 1e6:.1f} MB", file=sys.stderr)
+    return ergebnisse
+
+
+# Schlüssel, über den Ergebnisse zweier Läufe einander zugeordnet werden
+def ergebnis_schluessel(ergebnis):
+    return tuple((k, v) for k, v in sorted(ergebnis.items())
+                 if k in ('bench', 'engine', 'art', 'format', 'messstellen', 'intervall_h', 'tage', 'jahre', 'time_axis'))
+
+
+def vergleiche(alt, neu):
+    """Laufzeitverhältnis alt/neu je Benchmark ausgeben (> 1 = schneller geworden)"""
+    messgroessen = {'model': 'sekunden', 'export': 'sekunden', 'preview': 'ms_median', 'memory': 'spitze_bytes'}
+    alte = {ergebnis_schluessel(e): e for e in alt['ergebnisse']}
+    for ergebnis in neu['ergebnisse']:
+        vorher = alte.get(ergebnis_schluessel(ergebnis))
+        if vorher is None:
+            continue
+        groesse = messgroessen[ergebnis['bench']]
+        if ergebnis[groesse]:
+            beschreibung = ", ".join(f"{k}={v}" for k, v in ergebnis_schluessel(ergebnis))
+            print(f"{vorher[groesse] / ergebnis[groesse]:6.2f}x  {beschreibung}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="watergen-bench", description="Benchmarks für WaterGen")
+    parser.add_argument('--output', default="watergen_bench.json", help="Ergebnisdatei (JSON)")
+    parser.add_argument('--quick', action='store_true', help="Kleinere Größen für einen schnellen Lauf")
+    parser.add_argument('--only', nargs='+', choices=["model", "export", "preview", "memory"],
+                        help="Nur diese Benchmarks ausführen")
+    parser.add_argument('--repeats', type=int, default=REPEATS, help=f"Wiederholungen (Standard: {REPEATS})")
+    parser.add_argument('--vergleich', help="Früheres Ergebnis (JSON), mit dem verglichen wird")
+    args = parser.parse_args(argv)
+
+    teile = args.only or ["model", "export", "preview", "memory"]
+    ergebnisse = []
+    if "model" in teile:
+        ergebnisse += bench_model(MODEL_SIZES[:3] if args.quick else MODEL_SIZES, args.repeats)
+    if "export" in teile:
+        ergebnisse += bench_export(EXPORT_FORMATS, EXPORT_STATIONS[:2] if args.quick else EXPORT_STATIONS,
+                                   EXPORT_INTERVALS[:2] if args.quick else EXPORT_INTERVALS,
+                                   EXPORT_DAYS, EXPORT_REPEATS)
+    if "preview" in teile:
+        ergebnisse += bench_preview(PREVIEW_JOBS[:2] if args.quick else PREVIEW_JOBS, args.repeats)
+    if "memory" in teile:
+        ergebnisse += bench_memory(100_000 if args.quick else 1_000_000, 10, 0.25 if not args.quick else 1,
+                                   EXPORT_DAYS)
+
+    lauf = {
+        'meta': {
+            'zeitpunkt': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'plattform': platform.platform(),
+            'prozessoren': os.cpu_count(),
+            'quick': args.quick,
+        },
+        'ergebnisse': ergebnisse,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(lauf, f, ensure_ascii=False, indent=1)
+    print(f"Ergebnisse geschrieben: {args.output}", file=sys.stderr)
+
+    if args.vergleich:
+        with open(args.vergleich, 'r', encoding='utf-8') as f:
+            vergleiche(json.load(f), lauf)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+# Kommandozeilen-Einstieg für WaterGen: Messdaten ohne Oberfläche erzeugen.
+# Importiert nur die Engine (kein tkinter, matplotlib oder tkcalendar) und eignet sich
+# daher für Server, geplante Jobs und Benchmarks.
+#
+# Beispiele:
+#   python watergen_cli.py --start 01.01.2020 --end 31.12.2024 --intervall 0.25 --messstellen "GWM1;GWM2"
+#   python watergen_cli.py --job job.toml --workers 4
+#   python watergen_cli.py --job job.toml --verlaengerbar
+#   python watergen_cli.py --job job.toml --end 31.12.2025 --erweitern
+#   python watergen_cli.py --job job.toml --checkpoint-intervall 30
+#   python watergen_cli.py --job job.toml --fortsetzen
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from watergen_engine import (
+    CHECKPOINT_FILE,
+    CHECKPOINT_INTERVAL_S,
+    CHUNK_ROWS,
+    CPROFILE_FILE,
+    OUTPUT_STATE_FILE,
+    PROFILE_LOG,
+    FormelParameter,
+    JobControl,
+    ProgressChannel,
+    create_csv_files,
+    create_ensemble_files,
+    distance_correlation,
+    parse_flexible_date,
+    progress_text,
+    sweep_members,
+    validiere_messstellen,
+)
+
+# Aktualisierungsintervall der Fortschrittsanzeige auf stderr (s)
+PROGRESS_INTERVAL_S = 1.0
+
+
+def formel_felder():
+    """Name und Standardwert aller Felder von FormelParameter"""
+    return vars(FormelParameter())
+
+
+def lade_jobdatei(pfad):
+    """Jobdatei als JSON oder TOML lesen (anhand der Dateiendung)"""
+    if pfad.lower().endswith('.toml'):
+        import tomllib
+        with open(pfad, 'rb') as f:
+            return tomllib.load(f)
+    with open(pfad, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _zahlen_zeile(zeile):
+    # Semikolon-getrennte Zahlen, Dezimalkomma oder -punkt
+    return [float(feld.strip().replace(',', '.')) for feld in zeile.split(';')]
+
+
+def lade_korrelation(einstellungen, messstellen_ids):
+    """
+    Korrelationsmatrix für räumlich korrelierte Messstellen oder None.
+    Entweder direkt als Matrix (Jobdatei-Liste, .npy oder CSV mit Semikolon, Reihenfolge wie die
+    Messstellen) oder aus Koordinaten (Jobdatei {Name: [x, y]} oder CSV Name;x;y) und Korrelationslänge.
+    """
+    import numpy as np
+
+    matrix = einstellungen['korrelation']
+    if isinstance(matrix, str):
+        if matrix.lower().endswith('.npy'):
+            matrix = np.load(matrix)
+        else:
+            with open(matrix, 'r', encoding='utf-8') as f:
+                matrix = [_zahlen_zeile(zeile) for zeile in f if zeile.strip()]
+    if matrix is not None:
+        return np.asarray(matrix, dtype=float)
+
+    koordinaten = einstellungen['koordinaten']
+    if koordinaten is None:
+        return None
+    if isinstance(koordinaten, str):
+        with open(koordinaten, 'r', encoding='utf-8') as f:
+            zeilen = [zeile.strip().split(';', 1) for zeile in f if zeile.strip()]
+        koordinaten = {}
+        for name, werte in zeilen:
+            try:
+                koordinaten[name.strip()] = _zahlen_zeile(werte)
+            except ValueError:
+                continue # Kopfzeile
+    fehlend = [m for m in messstellen_ids if m not in koordinaten]
+    if fehlend:
+        raise ValueError(f"Keine Koordinaten für: {', '.join(fehlend)}")
+    if einstellungen['korrelationslaenge'] is None:
+        raise ValueError("Für Koordinaten muss eine Korrelationslänge angegeben werden")
+    return distance_correlation([koordinaten[m] for m in messstellen_ids], float(einstellungen['korrelationslaenge']))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="watergen",
+        description="Grundwasser-Messdaten ohne Oberfläche generieren.")
+    parser.add_argument('--job', help="Jobdatei (JSON oder TOML); Angaben auf der Kommandozeile haben Vorrang")
+    parser.add_argument('--start', help="Startdatum (TT.MM.JJJJ, TT.MM.JJ oder JJJJ-MM-TT)")
+    parser.add_argument('--end', help="Enddatum (TT.MM.JJJJ, TT.MM.JJ oder JJJJ-MM-TT)")
+    parser.add_argument('--intervall', type=float, help="Messintervall in Stunden")
+    parser.add_argument('--messstellen', help="Messstellen, durch Semikolon getrennt")
+    parser.add_argument('--format', choices=["csv", "excel", "parquet", "arrow"], help="Ausgabeformat (Standard: csv)")
+    parser.add_argument('--time-axis', dest='time_axis', choices=["daily", "interval"],
+                        help="Modell täglich berechnen oder direkt im Messintervall (Standard: daily)")
+    parser.add_argument('--workers', type=int, help="Anzahl Prozesse für den CSV-Export (Standard: 1)")
+    parser.add_argument('--chunk-rows', dest='chunk_rows', type=int, help=f"Zeilen pro Block (Standard: {CHUNK_ROWS})")
+    parser.add_argument('--excel-mode', dest='excel_mode', choices=["constant_memory", "pandas"],
+                        help="Excel-Exportweg (Standard: constant_memory)")
+    parser.add_argument('--compression',
+                        help="Kompression: bei CSV gzip oder zstd (Standard: keine), "
+                             "bei Parquet/Arrow z.B. snappy, zstd, lz4 oder none (Standard: snappy bzw. keine)")
+    parser.add_argument('--compression-level', dest='compression_level', type=int,
+                        help="Kompressionsstufe für CSV (Standard: gzip 6, zstd 3)")
+    parser.add_argument('--csv-layout', dest='csv_layout', choices=["per_station", "long_by_station", "long_by_time"],
+                        help="CSV: Datei je Messstelle oder eine Datei im Langformat, "
+                             "nach Messstelle gruppiert bzw. nach Zeitpunkt verschränkt (Standard: per_station)")
+    parser.add_argument('--index', dest='csv_index', action='store_const', const=True,
+                        help="Bei long_by_station eine Index-Datei mit Byte-Offsets je Messstelle schreiben")
+    parser.add_argument('--verzeichnis', help="Ausgabeverzeichnis (Standard: aktuelles Verzeichnis)")
+    parser.add_argument('--werte-speicher', dest='werte_speicher', metavar='VERZEICHNIS',
+                        help="Werte zuerst in einen Speicher auf der Platte (Memory-Map) erzeugen und daraus "
+                             "exportieren; ein erneuter Lauf setzt dort fort oder exportiert ohne Neuberechnung "
+                             "in ein anderes Format (relativ zum Ausgabeverzeichnis)")
+    parser.add_argument('--verlaengerbar', action='store_const', const=True,
+                        help=f"CSV-Ausgabe (je Messstelle oder long_by_time) mit Zustandsdatei ({OUTPUT_STATE_FILE}) "
+                             f"abschließen, damit sie später mit --erweitern verlängert werden kann")
+    parser.add_argument('--erweitern', action='store_const', const=True,
+                        help="Vorhandene CSV-Ausgabe (je Messstelle oder long_by_time) bis zum neuen Enddatum "
+                             "verlängern; nur die neuen Zeitpunkte werden erzeugt und angehängt")
+    parser.add_argument('--fortsetzen', action='store_const', const=True,
+                        help=f"Nach Absturz, Abbruch oder Neustart ab dem letzten Checkpoint ({CHECKPOINT_FILE}) "
+                             f"eines Laufs mit --checkpoint-intervall fortsetzen; alle übrigen Angaben wie beim "
+                             f"unterbrochenen Lauf")
+    parser.add_argument('--checkpoint-intervall', dest='checkpoint_intervall', type=float, metavar='SEKUNDEN',
+                        help=f"Bei CSV je Messstelle oder long_by_time höchstens alle SEKUNDEN einen Checkpoint "
+                             f"sichern, damit der Lauf mit --fortsetzen weitergeführt werden kann (Standard: keine "
+                             f"Checkpoints, mit --fortsetzen {CHECKPOINT_INTERVAL_S:g} s)")
+    parser.add_argument('--quiet', action='store_true', help="Keine Fortschrittsanzeige während der Generierung")
+    parser.add_argument('--sweep', metavar='DATEI',
+                        help="Parameter-Sweep (JSON oder TOML, siehe sweep_members): Ensemble von Varianten einer "
+                             "Messstelle mit Perzentilbändern statt Messdaten je Messstelle")
+    parser.add_argument('--korrelation', metavar='DATEI',
+                        help="Räumliche Korrelation der Messstellen als Matrix (.npy oder CSV mit Semikolon, "
+                             "Reihenfolge wie --messstellen)")
+    parser.add_argument('--koordinaten', metavar='DATEI',
+                        help="Korrelation aus Koordinaten ableiten (CSV Name;x;y), mit --korrelationslaenge")
+    parser.add_argument('--korrelationslaenge', type=float,
+                        help="Abstand, bei dem die Korrelation auf 1/e fällt (gleiche Einheit wie die Koordinaten)")
+    parser.add_argument('--temp-verzeichnis', dest='temp_verzeichnis', metavar='VERZEICHNIS',
+                        help="Ort des Zwischenspeichers der Basisreihe, den mehrere Messstellen ohne "
+                             "--werte-speicher bei Ausgabe je Messstelle, Excel, Parquet oder Arrow anlegen "
+                             "(Standard: System-Temp, sonst relativ zum Ausgabeverzeichnis). Belegt 8 Byte je "
+                             "Zeitpunkt, mit Korrelation je Messstelle und Zeitpunkt, z.B. 100 korrelierte "
+                             "Messstellen über 10 Jahre im 15-min-Takt rund 280 MB; CSV long_by_time braucht keinen "
+                             "Zwischenspeicher")
+    parser.add_argument('--cprofile', nargs='?', const=CPROFILE_FILE, metavar='DATEI',
+                        help=f"cProfile-Mitschnitt des Laufs speichern (Standard: {CPROFILE_FILE}); "
+                             f"der Phasenbericht steht immer in {PROFILE_LOG}")
+
+    formel = parser.add_argument_group("Formelparameter")
+    for name, standard in formel_felder().items():
+        formel.add_argument(f'--{name}', dest=name, type=int if name == 'seed' else float,
+                            help=f"Standard: {standard}")
+    return parser
+
+
+def job_einstellungen(args):
+    """Jobdatei und Kommandozeile zusammenführen (Kommandozeile überschreibt die Datei)"""
+    job = lade_jobdatei(args.job) if args.job else {}
+    formel_werte = dict(job.get('formel', {}))
+
+    einstellungen = {
+        'start': job.get('start'),
+        'end': job.get('end'),
+        'intervall': job.get('intervall'),
+        'messstellen': job.get('messstellen'),
+        'format': job.get('format', "csv"),
+        'time_axis': job.get('time_axis', "daily"),
+        'workers': job.get('workers', 1),
+        'chunk_rows': job.get('chunk_rows', CHUNK_ROWS),
+        'excel_mode': job.get('excel_mode', "constant_memory"),
+        'compression': job.get('compression'),
+        'compression_level': job.get('compression_level'),
+        'csv_layout': job.get('csv_layout', "per_station"),
+        'csv_index': job.get('csv_index', False),
+        'verzeichnis': job.get('verzeichnis'),
+        'werte_speicher': job.get('werte_speicher'),
+        'sweep': job.get('sweep'),
+        'korrelation': job.get('korrelation'),
+        'koordinaten': job.get('koordinaten'),
+        'korrelationslaenge': job.get('korrelationslaenge'),
+        'temp_verzeichnis': job.get('temp_verzeichnis'),
+        'verlaengerbar': job.get('verlaengerbar', False),
+        'erweitern': job.get('erweitern', False),
+        'fortsetzen': job.get('fortsetzen', False),
+        'checkpoint_intervall': job.get('checkpoint_intervall'),
+    }
+    for schluessel in einstellungen:
+        wert = getattr(args, schluessel)
+        if wert is not None:
+            einstellungen[schluessel] = wert
+    if einstellungen['checkpoint_intervall'] is None:
+        # Checkpoints nur auf Wunsch; ein fortgesetzter Lauf sichert weiter, damit er erneut fortsetzbar ist
+        einstellungen['checkpoint_intervall'] = CHECKPOINT_INTERVAL_S if einstellungen['fortsetzen'] else 0
+
+    for name in formel_felder():
+        wert = getattr(args, name)
+        if wert is not None:
+            formel_werte[name] = wert
+    einstellungen['formel'] = formel_werte
+    return einstellungen
+
+
+def baue_formel_params(formel_werte):
+    formel_params = FormelParameter()
+    felder = formel_felder()
+    for name, wert in formel_werte.items():
+        if name not in felder:
+            raise ValueError(f"Unbekannter Formelparameter: {name}")
+        setattr(formel_params, name, int(wert) if name == 'seed' else float(wert))
+    return formel_params
+
+
+def zeige_fortschritt(channel, stop):
+    # Fortschritt periodisch auf stderr ausgeben, bis der Job fertig ist
+    while not stop.wait(PROGRESS_INTERVAL_S):
+        values_created, total_values, _, finished = channel.snapshot()
+        if finished:
+            break
+        if total_values:
+            print(f"\r{progress_text(values_created, total_values)}", end='', file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        einstellungen = job_einstellungen(args)
+        if not einstellungen['start'] or not einstellungen['end']:
+            raise ValueError("Start- und Enddatum müssen angegeben werden")
+        start_date = parse_flexible_date(str(einstellungen['start']))
+        end_date = parse_flexible_date(str(einstellungen['end']))
+        if start_date > end_date:
+            raise ValueError("Startdatum muss vor Enddatum liegen")
+
+        if einstellungen['intervall'] is None:
+            raise ValueError("Intervall darf nicht leer sein.")
+        interval_hours = float(einstellungen['intervall'])
+        if interval_hours <= 0:
+            raise ValueError("Intervall muss größer als 0 sein")
+
+        sweep = einstellungen['sweep']
+        if args.sweep:
+            # Sweep-Datei mit den Angaben direkt oder in einem Abschnitt "sweep"
+            sweep = lade_jobdatei(args.sweep)
+            sweep = sweep.get('sweep', sweep)
+        formel_params = baue_formel_params(einstellungen['formel'])
+
+        messstellen_ids, korrelation = [], None
+        if sweep:
+            # Ein Ensemble beschreibt Varianten einer Messstelle, Messstellen werden nicht benötigt
+            if einstellungen['format'] == "excel":
+                raise ValueError("Ein Sweep wird als csv, parquet oder arrow geschrieben")
+            if einstellungen['erweitern'] or einstellungen['fortsetzen'] or einstellungen['verlaengerbar']:
+                raise ValueError("Ein Ensemble kann nicht verlängert oder fortgesetzt werden")
+            sweep_members(formel_params, sweep)
+        else:
+            messstellen = einstellungen['messstellen'] or ""
+            if isinstance(messstellen, list):
+                messstellen = ';'.join(messstellen)
+            valid, result = validiere_messstellen(messstellen)
+            if not valid:
+                raise ValueError(result)
+            messstellen_ids = result
+            korrelation = lade_korrelation(einstellungen, messstellen_ids)
+
+        workers = max(1, int(einstellungen['workers']))
+        chunk_rows = max(1, int(einstellungen['chunk_rows']))
+
+        if einstellungen['verzeichnis']:
+            os.makedirs(einstellungen['verzeichnis'], exist_ok=True)
+            os.chdir(einstellungen['verzeichnis'])
+    except (ValueError, OSError) as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 2
+
+    channel = ProgressChannel()
+    control = JobControl()
+    stop = threading.Event()
+    anzeige = None
+    if not args.quiet:
+        anzeige = threading.Thread(target=zeige_fortschritt, args=(channel, stop), daemon=True)
+        anzeige.start()
+
+    def erzeugen():
+        try:
+            if sweep:
+                create_ensemble_files(einstellungen['format'], start_date, end_date, interval_hours, formel_params,
+                                      sweep, channel, time_axis=einstellungen['time_axis'], chunk_rows=chunk_rows,
+                                      control=control)
+            else:
+                create_csv_files(einstellungen['format'], start_date, end_date, messstellen_ids, interval_hours,
+                                 formel_params, channel, time_axis=einstellungen['time_axis'], workers=workers,
+                                 chunk_rows=chunk_rows, excel_mode=einstellungen['excel_mode'], control=control,
+                                 compression=einstellungen['compression'],
+                                 compression_level=einstellungen['compression_level'],
+                                 csv_layout=einstellungen['csv_layout'], csv_index=einstellungen['csv_index'],
+                                 profile_dump=args.cprofile, value_store=einstellungen['werte_speicher'],
+                                 correlation=korrelation, extend=einstellungen['erweitern'],
+                                 checkpoint_interval=einstellungen['checkpoint_intervall'],
+                                 resume=einstellungen['fortsetzen'],
+                                 extendable=einstellungen['verlaengerbar'],
+                                 temp_dir=einstellungen['temp_verzeichnis'])
+        except Exception as e:
+            channel.finish(f"Fehler: {str(e)}", failed=True)
+        finally:
+            beendet.set()
+
+    # Generierung in einem eigenen Thread: Strg+C unterbricht nur das Warten im Hauptthread und wird
+    # über JobControl als Abbruch weitergegeben, sodass der Generator unvollständige Dateien aufräumt
+    # (auf ein Event statt mit join() warten, ein unterbrochenes join() kann den Thread für beendet halten)
+    beendet = threading.Event()
+    start_zeit = time.perf_counter()
+    erzeugung = threading.Thread(target=erzeugen)
+    erzeugung.start()
+    while not beendet.is_set():
+        try:
+            beendet.wait(PROGRESS_INTERVAL_S)
+        except KeyboardInterrupt:
+            control.cancel()
+    erzeugung.join()
+    dauer = time.perf_counter() - start_zeit
+
+    stop.set()
+    if anzeige is not None:
+        anzeige.join()
+
+    values_created, total_values, message, _ = channel.snapshot()
+    print(message)
+    werte_pro_s = values_created / dauer if dauer > 0 else 0.0
+    print(f"Laufzeit: {dauer:.2f} s – {values_created:,} Werte – {werte_pro_s:,.0f} Werte/s".replace(',', '.'))
+    return 1 if channel.failed or control.cancelled else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
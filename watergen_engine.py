@@ -0,0 +1,2603 @@
+# Generator-Engine von WaterGen: Grundwassermodell, Messwert-Pipeline und Exporter.
+# Dieses Modul importiert weder tkinter noch matplotlib oder tkcalendar und kann daher
+# auch ohne Oberfläche (watergen_cli.py, Build-Server, geplante Jobs) verwendet werden.
+# pandas, xlsxwriter und pyarrow werden erst beim jeweiligen Export geladen.
+from datetime import datetime, timedelta
+import csv
+import io
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import itertools
+import time
+import contextlib
+import numpy as np
+import os
+import hashlib
+import gzip
+import json
+import functools
+import shutil
+import signal
+import tempfile
+
+
+# Die Formel-Parameter-Klasse (nur mit Grundwasser-Parametern)
+class FormelParameter:
+    def __init__(self):
+        # Bestehende Parameter beibehalten
+        self.GW0 = 10.0  # Grundniveau in Meter unter GOK
+        self.A = 0.5     # Saisonale Amplitude
+        self.T = 365     # Periodendauer in Tagen
+        self.freq = 1.0  # Sinusfrequenz pro Periodendauer
+        self.Da = 45     # Anstiegsdauer in Tagen
+        self.Dd = 120    # Abklingdauer in Tagen
+        self.R_scale = 0.05  # Skalierung für zufällige Schwankungen
+        self.phase = 60      # Phasenverschiebung in Tagen
+        self.trend = 0.0     # Langzeittrend pro Jahr in Meter
+        
+        # Neue Parameter für die gewünschten Funktionen
+        self.curve_randomness = 0.2  # Variabilität der Wellenform (0-1)
+        self.secondary_freq = 3.0    # Frequenz der überlagerten kleineren Wellen
+
+        # Job-Seed für reproduzierbare Zufallsströme (Modell und Messstellen)
+        self.seed = 42
+
+
+    def generiere_formel(self):
+        return (f"\n            Ganglinien Layout bearbeiten:\n")
+
+
+
+
+# Deutsches Datum aus Eingabefeld oder Jobdatei parsen
+def parse_flexible_date(date_string):
+    """Parst deutsches Datum flexibel mit 2- oder 4-stelligem Jahr"""
+    try:
+        # Erst mit 2-stelligem Jahr versuchen
+        return datetime.strptime(date_string, '%d.%m.%y')
+    except ValueError:
+        try:
+            # Dann mit 4-stelligem Jahr versuchen
+            return datetime.strptime(date_string, '%d.%m.%Y')
+        except ValueError:
+            try:
+                # ISO-Format (JJJJ-MM-TT) für Jobdateien und Kommandozeile
+                return datetime.strptime(date_string, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError("Ungültiges Datumsformat. Bitte TT.MM.JJ oder TT.MM.JJJJ verwenden.")
+
+
+# Messstellenliste (Semikolon-getrennt) prüfen
+def validiere_messstellen(messstellen_text):
+    """Prüft, ob doppelte Messstellennamen vorhanden sind"""
+    if not messstellen_text.strip():
+        return False, "Keine Messstellen angegeben"
+
+    messstellen = [m.strip() for m in messstellen_text.split(';') if m.strip()]
+    if not messstellen:
+        return False, "Keine gültigen Messstellen angegeben"
+
+    # Duplikate prüfen
+    duplicates = set()
+    seen = set()
+    for m in messstellen:
+        if m in seen:
+            duplicates.add(m)
+        else:
+            seen.add(m)
+
+    if duplicates:
+        return False, f"Doppelte Messstellennamen gefunden: {', '.join(duplicates)}"
+
+    return True, messstellen
+
+
+# Zufallsströme: ein Job-Seed, daraus unabhängige Ströme für Modell und Messstellen.
+# SeedSequence(seed, spawn_key=(i,)) entspricht dem i-ten Kind von SeedSequence(seed).spawn().
+MODEL_STREAM = 0
+STATION_STREAM = 1
+FIELD_STREAM = 2
+OFFSET_STREAM = 4
+
+
+def station_key(messstelle_id):
+    """Stabiler ganzzahliger Schlüssel aus dem Messstellennamen (unabhängig von der Position in der Liste)"""
+    return int.from_bytes(hashlib.blake2b(messstelle_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def model_rng(job_seed):
+    """Zufallsstrom für die Grundwasserganglinie eines Jobs"""
+    return np.random.default_rng(np.random.SeedSequence(job_seed, spawn_key=(MODEL_STREAM,)))
+
+
+def station_rng(job_seed, messstelle_id):
+    """Eigener Zufallsstrom pro Messstelle, identisch ob allein, im Stapel oder parallel erzeugt"""
+    return np.random.default_rng(np.random.SeedSequence(job_seed, spawn_key=(STATION_STREAM, station_key(messstelle_id))))
+
+
+def field_rng(job_seed):
+    """Zufallsstrom für das räumlich korrelierte Störungsfeld aller Messstellen"""
+    return np.random.default_rng(np.random.SeedSequence(job_seed, spawn_key=(FIELD_STREAM,)))
+
+
+# Spannweite der festen Messstellen-Offsets in Vielfachen des Offsetfaktors
+STATION_OFFSET_SPAN = 10
+
+
+def station_offset(job_seed, messstelle_id, offset_faktor):
+    """
+    Fester Offset einer Messstelle in [-STATION_OFFSET_SPAN / 2, STATION_OFFSET_SPAN / 2) * offset_faktor
+    aus einem eigenen Strom je Messstellenname, unabhängig von Position und Anzahl der Messstellen im Lauf
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(job_seed, spawn_key=(OFFSET_STREAM, station_key(messstelle_id))))
+    return (rng.random() - 0.5) * STATION_OFFSET_SPAN * offset_faktor
+
+
+# Räumliche Korrelation der Störungen zwischen Messstellen
+def distance_correlation(koordinaten, korrelationslaenge):
+    """
+    Korrelationsmatrix exp(-Abstand / Korrelationslänge) aus Koordinaten (Messstellen x 2 oder 3).
+    Das exponentielle Modell ist für beliebige Punktlagen positiv definit.
+    Die Abstände werden über ein Matrixprodukt bestimmt (Speicher n x n statt n x n x Dimension).
+    """
+    if korrelationslaenge <= 0:
+        raise ValueError("Korrelationslänge muss größer als 0 sein")
+    punkte = np.asarray(koordinaten, dtype=float)
+    if punkte.ndim != 2:
+        raise ValueError("Koordinaten müssen als Liste von Punkten (x, y) angegeben werden")
+    quadrate = np.einsum('ij,ij->i', punkte, punkte)
+    abstand2 = quadrate[:, None] + quadrate[None, :] - 2 * (punkte @ punkte.T)
+    np.maximum(abstand2, 0, out=abstand2)
+    korrelation = np.exp(-np.sqrt(abstand2) / korrelationslaenge)
+    np.fill_diagonal(korrelation, 1.0)
+    return korrelation
+
+
+def correlation_factor(korrelation):
+    """
+    Unterer Cholesky-Faktor L der Korrelationsmatrix (L @ L.T = Korrelation).
+    Nur positiv semidefinite Matrizen (z.B. vollständig korrelierte Messstellen) erhalten
+    einen kleinen Zuschlag auf der Diagonalen, damit die Zerlegung gelingt.
+    """
+    korrelation = np.asarray(korrelation, dtype=float)
+    if korrelation.ndim != 2 or korrelation.shape[0] != korrelation.shape[1]:
+        raise ValueError("Korrelationsmatrix muss quadratisch sein")
+    if not np.allclose(korrelation, korrelation.T):
+        raise ValueError("Korrelationsmatrix muss symmetrisch sein")
+    if not np.allclose(np.diag(korrelation), 1.0):
+        raise ValueError("Korrelationsmatrix muss auf der Diagonalen 1 enthalten")
+    for zuschlag in (0.0, 1e-12, 1e-10, 1e-8, 1e-6):
+        try:
+            return np.linalg.cholesky(korrelation + zuschlag * np.eye(len(korrelation)))
+        except np.linalg.LinAlgError:
+            continue
+    raise ValueError("Korrelationsmatrix ist nicht positiv semidefinit")
+
+
+# Lineare Rekursion x[i] = a[i] * x[i-1] + b[i] als Präfix-Scan lösen
+def _linear_recurrence_scan(a, b):
+    """
+    Berechnet für jede Position die zusammengesetzte Abbildung (A[i], B[i]),
+    sodass x[i] = A[i] * x[-1] + B[i] gilt (x[-1] = Startwert vor dem ersten Element).
+    Arbeitet mit log2(n) Verdopplungsschritten über ganze Arrays statt einer Python-Schleife.
+    Die Rekursion läuft entlang Achse 0; weitere Achsen (z.B. Messstellen) werden mitgerechnet.
+    """
+    A = np.array(a, dtype=float)
+    B = np.array(b, dtype=float)
+    shift = 1
+    while shift < len(A):
+        # Abbildung an Position i mit der an Position i-shift verketten
+        B[shift:] = A[shift:] * B[:-shift] + B[shift:]
+        A[shift:] = A[shift:] * A[:-shift]
+        shift *= 2
+    return A, B
+
+
+# Anstiegs-/Abklingmodell auf eine vorberechnete saisonale Kurve anwenden
+def _gw_recurrence(seasonal, R_base, GW0, Da, Dd, R_scale, engine="scan", prev=None):
+    """
+    Wendet das stückweise lineare Anstiegs-/Abklingmodell an.
+    engine="scan" rechnet vektorisiert, engine="loop" ist die ursprüngliche
+    Tagesschleife und dient als Referenz für Vergleiche.
+    prev=(GW, seasonal) des vorherigen Schritts setzt eine bereits begonnene Reihe fort.
+    R_base der Form (Schritte x Messstellen) ergibt eine Ganglinie je Spalte mit gemeinsamer
+    saisonaler Kurve (nur engine="scan"). GW0, Da, Dd und R_scale dürfen dann auch je Spalte
+    verschieden sein (Parameterfeld eines Ensembles), ebenso seasonal (Schritte x Spalten).
+    """
+    R_base = np.asarray(R_base, dtype=float)
+    if prev is not None:
+        # Vorherigen Schritt als Element 0 voranstellen und am Ende wieder abschneiden
+        seasonal = np.concatenate(([prev[1]], seasonal))
+        R_base = np.concatenate((np.zeros((1,) + R_base.shape[1:]), R_base))
+
+    GW = np.zeros((len(seasonal),) + R_base.shape[1:], dtype=float)
+    if len(seasonal) == 0:
+        return GW
+    GW[0] = GW0 + seasonal[0] if prev is None else prev[0]
+
+    if engine == "loop" and R_base.ndim > 1:
+        raise ValueError("engine='loop' berechnet nur eine einzelne Ganglinie")
+    if engine == "loop":
+        for i in range(1, len(seasonal)):
+            disturbance = R_scale * R_base[i]
+            diff_from_GW0 = GW[i-1] - GW0
+            daily_change = 0
+
+            if disturbance > 0 and Da > 0:
+                daily_change = (disturbance - diff_from_GW0) / Da
+            elif Dd > 0:
+                daily_change = -diff_from_GW0 / Dd
+
+            GW[i] = GW[i-1] + daily_change
+            GW[i] += seasonal[i] - seasonal[i-1]
+    elif engine == "scan":
+        # Zweigwahl hängt nur von der Störung ab, nicht vom Zustand -> Koeffizienten vorab bestimmbar
+        disturbance = R_scale * R_base[1:len(seasonal)]
+        rise = (disturbance > 0) & (Da > 0)
+        decay = ~rise & (Dd > 0)
+
+        # Eine gemeinsame saisonale Kurve gilt für alle Spalten gleichermaßen
+        saison_diff = np.diff(np.asarray(seasonal, dtype=float), axis=0)
+        saison_diff = saison_diff.reshape(saison_diff.shape + (1,) * (disturbance.ndim - saison_diff.ndim))
+        if np.ndim(Da) == 0 and np.ndim(Dd) == 0 and np.ndim(GW0) == 0:
+            a = np.ones(disturbance.shape, dtype=float)
+            b = np.array(np.broadcast_to(saison_diff, disturbance.shape))
+            if Da > 0:
+                a[rise] = 1 - 1 / Da
+                b[rise] += (disturbance[rise] + GW0) / Da
+            if Dd > 0:
+                a[decay] = 1 - 1 / Dd
+                b[decay] += GW0 / Dd
+        else:
+            # Parameter je Spalte: gleiche Rechnung elementweise (maskierte Divisionen durch 0 werden verworfen)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                a = np.where(rise, 1 - 1 / Da, np.where(decay, 1 - 1 / Dd, 1.0))
+                b = saison_diff + np.where(rise, (disturbance + GW0) / Da, np.where(decay, GW0 / Dd, 0.0))
+
+        A, B = _linear_recurrence_scan(a, b)
+        GW[1:] = A * GW[0] + B
+    else:
+        raise ValueError(f"Unbekannte Berechnungsmethode: {engine}")
+
+    return GW if prev is None else GW[1:]
+
+
+# Saisonaler Anteil der Ganglinie (Hauptwelle mit Amplitudenvariation + kleinere Wellen)
+def _seasonal_component(t_array, A, T, freq, phase, curve_randomness, secondary_freq, amplitude_noise):
+    # Parameter dürfen Arrays sein (ein Wert je Ensemble-Mitglied, t_array dann als Spalte)
+    ensemble = any(np.ndim(p) for p in (A, T, freq, phase, curve_randomness, secondary_freq))
+
+    # Stellen Sie sicher, dass T nicht Null ist, um Division durch Null zu vermeiden
+    if ensemble:
+        T = np.where(np.equal(T, 0), 365, T)
+    elif T == 0: T = 365 # Fallback-Wert
+
+    # Amplitudenvariationen für jeden Wellenzyklus
+    if ensemble:
+        # curve_randomness <= 0 ergibt exakt den Faktor 1 wie ohne Variation
+        amplitude_variation = 1.0 + np.maximum(curve_randomness, 0) * amplitude_noise
+        seasonal = A * np.sin(2 * np.pi * freq * (t_array - phase) / T) * amplitude_variation
+    elif curve_randomness > 0:
+        amplitude_variation = 1.0 + curve_randomness * amplitude_noise
+        seasonal = A * np.sin(2 * np.pi * freq * (t_array - phase) / T) * amplitude_variation
+    else:
+        seasonal = A * np.sin(2 * np.pi * freq * (t_array - phase) / T)
+
+    # Sekundäre kleinere Wellen hinzufügen
+    if ensemble:
+        small_waves = A * 0.3 * np.sin(2 * np.pi * secondary_freq * freq * t_array / T)
+        seasonal = seasonal + np.where(np.greater(secondary_freq, 0), small_waves, 0.0)
+    elif secondary_freq > 0:
+        small_waves = A * 0.3 * np.sin(2 * np.pi * secondary_freq * freq * t_array / T)
+        seasonal += small_waves
+
+    return seasonal
+
+
+# Zustand von Zufallsströmen (Generator, Liste von Generatoren oder None) sichern und laden
+def _rng_zustand(rng):
+    if rng is None:
+        return None
+    if isinstance(rng, (list, tuple)):
+        return [_rng_zustand(r) for r in rng]
+    if isinstance(rng, np.random.RandomState):
+        return rng.get_state(legacy=False)
+    return rng.bit_generator.state
+
+
+def _rng_laden(rng, zustand):
+    if isinstance(rng, (list, tuple)):
+        for r, z in zip(rng, zustand):
+            _rng_laden(r, z)
+    elif isinstance(rng, np.random.RandomState):
+        rng.set_state(zustand)
+    elif rng is not None:
+        rng.bit_generator.state = zustand
+
+
+# Modellschritte pro Berechnungsblock; Blockgrenzen liegen immer bei Vielfachen ab Index 0,
+# damit eine blockweise gestreamte Reihe exakt der vollständig berechneten entspricht
+MODEL_BLOCK = 65_536
+# Werte (Schritte x Mitglieder) pro Berechnungsblock eines Parameter-Ensembles; bis
+# ENSEMBLE_BLOCK_VALUES // MODEL_BLOCK (64) Mitglieder bleiben die Blöcke so lang wie im Einzellauf
+ENSEMBLE_BLOCK_VALUES = 1 << 22
+
+
+class GWSeriesStream:
+    """
+    Berechnet die Grundwasserganglinie blockweise mit übertragenem Zustand.
+    t_source(a, b) liefert die Zeitwerte (in Tagen) der Modellschritte a..b-1.
+    values(a, b) darf nur vorwärts laufend abgefragt werden; der Speicherbedarf
+    hängt von MODEL_BLOCK ab, nicht von der Länge der Reihe.
+    Mit correlation_factor (siehe correlation_factor) entsteht eine Ganglinie je Messstelle:
+    values(a, b) liefert dann (Schritte x Messstellen), die Störungen sind über L räumlich korreliert.
+    Sind Formelparameter Arrays gleicher Länge, entsteht ein Ensemble mit einer Ganglinie je
+    Mitglied: values(a, b) liefert (Schritte x Mitglieder) aus einer gemeinsamen Array-Rechnung.
+    zustand()/fortsetzen() sichern und laden den Zustand am Beginn des letzten Blocks, damit eine
+    spätere Verlängerung der Reihe ab dort mit denselben Werten weiterrechnet.
+    """
+    def __init__(self, t_source, anzahl, GW0, A, T, freq, Da, Dd, R_scale, phase=60, trend=0.0,
+                 curve_randomness=0.2, secondary_freq=3.0, engine="scan", dt=1.0, rng=None,
+                 correlation_factor=None, field_rng=None, rng_index=None):
+        # rng: Zufallsgenerator des Jobs (siehe model_rng); ohne Angabe lokaler Seed 42,
+        # der globale NumPy-Zustand wird nicht verändert.
+        # Im Ensemble auch eine Liste von Generatoren (einer je Seed); rng_index ordnet jedem
+        # Mitglied seinen Generator zu
+        if rng is None:
+            rng = np.random.RandomState(42)
+        if correlation_factor is not None and field_rng is None:
+            field_rng = np.random.default_rng(42)
+        # Anstiegs- und Abklingdauer von Tagen auf Zeitschritte umrechnen
+        if dt <= 0: dt = 1.0 # Fallback-Wert
+        if engine not in ("scan", "loop"):
+            raise ValueError(f"Unbekannte Berechnungsmethode: {engine}")
+
+        self.t_source = t_source
+        self.anzahl = anzahl
+        self.GW0 = GW0
+        self.A = A
+        self.T = T
+        self.freq = freq
+        self.Da_steps = Da / dt
+        self.Dd_steps = Dd / dt
+        self.R_scale = R_scale
+        self.phase = phase
+        self.trend = trend
+        self.curve_randomness = curve_randomness
+        self.secondary_freq = secondary_freq
+        self.engine = engine
+        self.rng = rng
+        self.correlation_factor = correlation_factor
+        self.field_rng = field_rng
+        self.rng_index = rng_index
+        # Form eines Modellschritts: () für eine Ganglinie, (Mitglieder,) für ein Ensemble
+        self.mitglieder = np.broadcast_shapes(*(np.shape(p) for p in (
+            GW0, A, T, freq, Da, Dd, R_scale, phase, trend, curve_randomness, secondary_freq, rng_index)))
+        if self.mitglieder and correlation_factor is not None:
+            raise ValueError("Ensemble und räumliche Korrelation lassen sich nicht kombinieren")
+        if correlation_factor is not None:
+            # Bei vielen Messstellen kürzere Blöcke, damit ein Block etwa MODEL_BLOCK Werte umfasst
+            self.block_len = max(1, MODEL_BLOCK // len(correlation_factor))
+            form = (len(correlation_factor),)
+        elif self.mitglieder:
+            # Ensemble: bis ENSEMBLE_BLOCK_VALUES Werte je Block, höchstens MODEL_BLOCK Schritte.
+            # Mit höchstens 64 Mitgliedern liegen die Blockgrenzen wie beim Einzellauf und jedes Mitglied
+            # entspricht ihm bitgleich. Bei mehr Mitgliedern sind die Blöcke kürzer; der Scan fasst die
+            # Schritte dann anders zusammen, die Werte stimmen nur im Rahmen der Gleitkommagenauigkeit
+            # überein (Abweichungen um 1e-14); nur Reihen, die in einen Block passen, bleiben bitgleich
+            self.block_len = max(1, min(MODEL_BLOCK, ENSEMBLE_BLOCK_VALUES // self.mitglieder[0]))
+            form = self.mitglieder
+        else:
+            self.block_len = MODEL_BLOCK
+            form = ()
+
+        self.block_start = 0
+        self.block = np.zeros((0,) + form, dtype=float)
+        self.prev = None # (GW, seasonal) des letzten berechneten Schritts
+        self.block_modell = None
+        self.block_zustand = self.zustand()
+
+    def zustand(self):
+        """
+        Zustand vor dem nächsten Block als JSON-taugliches Dict: erster Schritt, (GW, seasonal)
+        des Schritts davor und die Zustände der Zufallsströme. Blockgrenzen bleiben Vielfache von
+        block_len, daher rechnet ein fortgesetzter Strom exakt wie ein durchgehender.
+        """
+        return {
+            'schritt': self.block_start + len(self.block),
+            'prev': None if self.prev is None else [np.asarray(wert).tolist() for wert in self.prev],
+            'rng': _rng_zustand(self.rng),
+            'field_rng': _rng_zustand(self.field_rng),
+        }
+
+    def fortsetzen(self, zustand):
+        """Strom auf einen mit zustand() gesicherten Blockbeginn setzen; nur vorwärts ab dort lesbar"""
+        if zustand['schritt'] % self.block_len:
+            raise ValueError("Gesicherter Modellzustand liegt nicht an einer Blockgrenze")
+        self.block_start = zustand['schritt']
+        self.block = self.block[:0]
+        self.prev = None if zustand['prev'] is None else tuple(np.asarray(wert) for wert in zustand['prev'])
+        _rng_laden(self.rng, zustand['rng'])
+        _rng_laden(self.field_rng, zustand['field_rng'])
+        self.block_zustand = self.zustand()
+
+    def _next_block(self):
+        a = self.block_start + len(self.block)
+        b = min(a + self.block_len, self.anzahl)
+        t_array = self.t_source(a, b)
+        self.block_zustand = self.zustand()
+
+        # Störung und Amplitudenvariation paarweise ziehen, damit der Zufallsstrom
+        # unabhängig von der Blockaufteilung ist
+        if isinstance(self.rng, (list, tuple)):
+            # Ein Strom je Seed; Mitglieder mit gleichem Seed teilen sich die Zufallszahlen
+            draws = np.stack([rng.normal(0, 1, size=(b - a, 2)) for rng in self.rng], axis=-1)[..., self.rng_index]
+        else:
+            draws = self.rng.normal(0, 1, size=(b - a, 2))
+        R_base = draws[:, 0]
+        amplitude_noise = draws[:, 1]
+        if self.mitglieder:
+            # Ensemble: Zeit entlang Achse 0, Mitglieder entlang Achse 1
+            form = (b - a,) + self.mitglieder
+            t_array = np.asarray(t_array)[:, None]
+            R_base = np.broadcast_to(R_base.reshape(b - a, -1), form)
+            amplitude_noise = np.broadcast_to(amplitude_noise.reshape(b - a, -1), form)
+        if self.correlation_factor is not None:
+            # Korreliertes Störungsfeld: unabhängige Normalwerte je Schritt und Messstelle,
+            # mit einem Matrixprodukt über alle Messstellen in die Korrelation überführt
+            z = self.field_rng.standard_normal((b - a, len(self.correlation_factor)))
+            R_base = z @ self.correlation_factor.T
+
+        try:
+            seasonal = _seasonal_component(t_array, self.A, self.T, self.freq, self.phase,
+                                           self.curve_randomness, self.secondary_freq, amplitude_noise)
+
+            # Grundwasserstand berechnen (Anstieg bei positiver Störung, sonst Abklingen)
+            GW = _gw_recurrence(seasonal, R_base, self.GW0, self.Da_steps, self.Dd_steps,
+                                self.R_scale, self.engine, self.prev)
+        except Exception as e:
+            print(f"Fehler bei Grundwasserreihen-Berechnung: {e}")
+            seasonal = np.zeros(b - a)
+            GW = np.full(R_base.shape, self.GW0, dtype=float)
+
+        if b > a:
+            self.prev = (GW[-1], seasonal[-1])
+        # (GW ohne Trend, saisonaler Anteil) des Blocks: Zwischenzustände für die Vorschau (siehe _preview_index)
+        self.block_modell = (GW, seasonal)
+        self.block_start = a
+        if np.any(np.not_equal(self.trend, 0)):
+            # Trend-Komponente hinzufügen (nur in der Ausgabe, der übertragene Zustand bleibt ohne Trend)
+            GW = GW + self.trend * t_array / 365
+        self.block = GW
+
+    def values(self, a, b):
+        """Modellwerte der Schritte a..b-1"""
+        teile = []
+        while a < b:
+            block_end = self.block_start + len(self.block)
+            if a >= block_end:
+                if block_end >= self.anzahl:
+                    raise IndexError("Modellschritt außerhalb der Reihe")
+                self._next_block()
+                continue
+            if a < self.block_start:
+                raise IndexError("GWSeriesStream kann nur vorwärts gelesen werden")
+            ende = min(b, block_end)
+            teile.append(self.block[a - self.block_start:ende - self.block_start])
+            a = ende
+        if not teile:
+            return np.zeros((0,) + self.block.shape[1:], dtype=float)
+        return teile[0] if len(teile) == 1 else np.concatenate(teile)
+
+
+# Funktion zur Berechnung der Grundwasserganglinie
+def calculate_gw_series(t_array, GW0, A, T, freq, Da, Dd, R_scale, phase=60, trend=0.0, curve_randomness=0.2, secondary_freq=3.0, engine="scan", dt=1.0, rng=None, correlation=None, field_rng=None):
+    # t_array in (ggf. gebrochenen) Tagen, dt = Zeitschritt in Tagen
+    # Gleiche Blockberechnung wie beim Streaming, damit beide Wege identische Werte liefern
+    # correlation: Korrelationsmatrix (Messstellen x Messstellen); dann Ergebnis (Messstellen x Schritte)
+    #              in einem vektorisierten Durchlauf, Störungen aus field_rng (siehe field_rng())
+    t_array = np.asarray(t_array)
+    faktor = None if correlation is None else correlation_factor(correlation)
+    stream = GWSeriesStream(lambda a, b: t_array[a:b], len(t_array), GW0, A, T, freq, Da, Dd, R_scale,
+                            phase, trend, curve_randomness, secondary_freq, engine, dt, rng, faktor, field_rng)
+    werte = stream.values(0, len(t_array))
+    return werte if faktor is None else werte.T
+
+
+# Anzahl der Messzeitpunkte start_date + k * Intervall, solange <= end_date
+def _interval_step(interval_hours):
+    return np.timedelta64(timedelta(hours=interval_hours), 'us')
+
+
+def anzahl_zeitpunkte(start_date, end_date, interval_hours):
+    step = _interval_step(interval_hours)
+    start = np.datetime64(start_date, 'us')
+    end = np.datetime64(end_date, 'us')
+    if step <= np.timedelta64(0, 'us') or end < start:
+        return 0
+    return int((end - start) // step) + 1
+
+
+# Zeitachse der Messzeitpunkte als datetime64-Array aufbauen
+def build_time_axis(start_date, end_date, interval_hours, von=0, bis=None):
+    """Messzeitpunkte mit Index von..bis-1 (ohne Angabe alle bis einschließlich end_date)"""
+    if bis is None:
+        bis = anzahl_zeitpunkte(start_date, end_date, interval_hours)
+    return np.datetime64(start_date, 'us') + np.arange(von, bis) * _interval_step(interval_hours)
+
+
+# Job-Beschreibung für die Generator-Pipeline (klein und picklebar, ohne Arrays)
+def prepare_job(start_date, end_date, interval_hours, formel_params, time_axis="daily", correlation=None):
+    # time_axis="daily": Tagesreihe berechnen und pro Messzeitpunkt nachschlagen
+    # time_axis="interval": Modell direkt im Messintervall berechnen (ohne Treppenstufen)
+    # correlation: Korrelationsmatrix der Messstellen (Reihenfolge wie die Messstellenliste) oder None;
+    #              die einzige Angabe in Größe n x n, nur für das korrelierte Störungsfeld benötigt
+    # Beim Verlängern einer vorhandenen Ausgabe werden nur die Zeitpunkte ab 'von' erzeugt; das Modell
+    # setzt dann mit 'modell_zustand' (siehe GWSeriesStream.zustand) fort statt ab Schritt 0 zu rechnen
+    if interval_hours == 0: interval_hours = 1 # Fallback-Wert
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'interval_hours': interval_hours,
+        'anzahl': anzahl_zeitpunkte(start_date, end_date, interval_hours),
+        'total_days': (end_date - start_date).days + 1,
+        'time_axis': time_axis,
+        'formel_params': formel_params,
+        'korrelation': None if correlation is None else np.asarray(correlation, dtype=float),
+        'von': 0,
+        'modell_zustand': None,
+    }
+
+
+# Modellstrom eines Jobs (Tagesachse oder gebrochene Tage im Messintervall)
+def job_model_stream(job, mitglieder=None):
+    # mitglieder: Dict Feldname -> Array je Ensemble-Mitglied (siehe sweep_members); diese Felder
+    #             ersetzen die Formelparameter, das Ergebnis hat dann eine Spalte je Mitglied
+    formel_params = job['formel_params']
+    werte = dict(vars(formel_params), **(mitglieder or {}))
+    if np.ndim(werte['seed']):
+        # Ein Modellstrom je verschiedenem Seed, Mitglieder mit gleichem Seed teilen ihn
+        seeds, rng_index = np.unique(werte['seed'], return_inverse=True)
+        rng = [model_rng(int(seed)) for seed in seeds]
+    else:
+        rng = model_rng(werte['seed'])
+        rng_index = None
+
+    if job['time_axis'] == "interval":
+        # Gebrochene Tage im Messintervall: ein Modellwert pro Messzeitpunkt
+        step_days = job['interval_hours'] / 24
+        t_source = lambda a, b: np.arange(a, b) * step_days
+        anzahl = job['anzahl']
+    else:
+        # Tages-basiert
+        step_days = 1.0
+        t_source = lambda a, b: np.arange(a, b, 1)
+        anzahl = job['total_days']
+
+    stream = GWSeriesStream(t_source, anzahl,
+                            werte['GW0'],
+                            werte['A'],
+                            werte['T'],
+                            werte['freq'],
+                            werte['Da'],
+                            werte['Dd'],
+                            werte['R_scale'],
+                            werte['phase'],
+                            werte['trend'],
+                            werte['curve_randomness'],
+                            werte['secondary_freq'],
+                            dt=step_days,
+                            rng=rng,
+                            correlation_factor=None if job.get('korrelation') is None else correlation_factor(job['korrelation']),
+                            field_rng=field_rng(formel_params.seed),
+                            rng_index=rng_index)
+    if job.get('modell_zustand') is not None:
+        stream.fortsetzen(job['modell_zustand'])
+    return stream
+
+
+# Modellzustand am Ende eines Jobs, aus dem eine Verlängerung weiterrechnet
+def job_model_state(job):
+    """Zustand am Beginn des Modellblocks, der den letzten Messzeitpunkt enthält (siehe GWSeriesStream.zustand)"""
+    model = job_model_stream(job)
+    if job['anzahl'] > job.get('von', 0):
+        if job['time_axis'] == "interval":
+            letzter = job['anzahl'] - 1
+        else:
+            zeitpunkt = build_time_axis(job['start_date'], job['end_date'], job['interval_hours'],
+                                        job['anzahl'] - 1, job['anzahl'])[0]
+            letzter = int((zeitpunkt.astype('datetime64[D]') - np.datetime64(job['start_date'].date(), 'D'))
+                          .astype(int))
+        model.values(letzter, letzter + 1)
+    return model.block_zustand
+
+
+# Vorschau im Formel-Untermenü: bereits gesehene Parametersätze aus einem LRU-Cache
+PREVIEW_CACHE_SIZE = 256
+# Nachkommastellen, auf die die Parameter für den Cache-Schlüssel gerundet werden
+PREVIEW_QUANT_DIGITS = 3
+
+
+def preview_key(GW0, A, T, freq, Da, Dd, R_scale, curve_randomness, secondary_freq, seed, phase=60, trend=0.0):
+    """Quantisierter Parametersatz plus Seed als Cache-Schlüssel"""
+    parameter = (GW0, A, T, freq, Da, Dd, R_scale, curve_randomness, secondary_freq)
+    return (tuple(round(float(wert), PREVIEW_QUANT_DIGITS) for wert in parameter)
+            + (int(seed), round(float(phase), PREVIEW_QUANT_DIGITS), round(float(trend), PREVIEW_QUANT_DIGITS)))
+
+
+# Schrittweite der Modellreihe in Tagen (für die Zeitachse der Vorschau)
+def model_step_days(job):
+    return job['interval_hours'] / 24 if job['time_axis'] == "interval" else 1.0
+
+
+def model_length(job):
+    return job['anzahl'] if job['time_axis'] == "interval" else job['total_days']
+
+
+# Modellschritte je Blatt der Vorschau-Übersicht (Minimum/Maximum je Blatt, siehe _preview_index)
+PREVIEW_LEAF = 256
+# Übersichten (Block- und Blattzustände plus Blatt-Minima/-Maxima) verschiedener Parametersätze im Cache
+PREVIEW_INDEX_CACHE_SIZE = 16
+
+
+# Minimum/Maximum der Werte ab Modellschritt a in die Bildpunkt-Spalten von..bis eintragen
+def _spalten_minmax(b_min, b_max, a, werte, von, laenge, n_buckets):
+    # Spalte jedes Schritts; aufeinanderfolgende Schritte derselben Spalte per reduceat zusammenfassen
+    spalte = (np.arange(a, a + len(werte)) - von) * n_buckets // laenge
+    starts = np.flatnonzero(np.r_[True, spalte[1:] != spalte[:-1]])
+    ziel = spalte[starts]
+    b_min[ziel] = np.minimum(b_min[ziel], np.minimum.reduceat(werte, starts))
+    b_max[ziel] = np.maximum(b_max[ziel], np.maximum.reduceat(werte, starts))
+
+
+# Modellwerte a..b-1 ab dem gesicherten Zustand des Blocks, in dem a liegt
+def _preview_values(job, index, a, b):
+    model = job_model_stream(job)
+    model.fortsetzen(index['zustaende'][a // MODEL_BLOCK])
+    return model.values(a // MODEL_BLOCK * MODEL_BLOCK, b)[a % MODEL_BLOCK:]
+
+
+# Modellwerte eines Blatts ab seinem gesicherten Zustand (siehe _preview_index)
+def _preview_leaf_values(model, index, blatt):
+    # Der Strom rechnet in Blöcken von Blattlänge; die Werte weichen nur im Rahmen der
+    # Gleitkommagenauigkeit (um 1e-14) vom durchgehend in MODEL_BLOCK-Blöcken berechneten Strom ab
+    model.block_len = PREVIEW_LEAF
+    vorlage = index['zustaende'][blatt * PREVIEW_LEAF // MODEL_BLOCK]
+    model.fortsetzen(dict(
+        vorlage,
+        schritt=blatt * PREVIEW_LEAF,
+        prev=None if blatt == 0 else [index['blatt_gw'][blatt], index['blatt_saison'][blatt]],
+        rng=dict(vorlage['rng'], state=dict(vorlage['rng']['state'], state=index['blatt_rng'][blatt])),
+    ))
+    return model.values(blatt * PREVIEW_LEAF, min((blatt + 1) * PREVIEW_LEAF, model.anzahl))
+
+
+# Modellreihe eines Zeitraums blockweise auf Minimum/Maximum je Bildpunkt verdichten
+def decimate_model_minmax(job, n_buckets, von=0, bis=None, index=None):
+    """
+    Liefert (Modellschritte, Werte) für die Schritte von..bis-1 mit höchstens 2 * n_buckets Punkten.
+    Pro Bildpunkt-Spalte werden Minimum und Maximum behalten, Spitzen gehen also nicht verloren.
+    Passt der Bereich bereits in die Spalten, werden alle Punkte unverändert geliefert.
+    Die Reihe wird in MODEL_BLOCK-Blöcken berechnet, der Speicherbedarf hängt nicht von der Länge ab.
+    Mit index (siehe _preview_index) beginnt die Rechnung am Blockzustand vor von, der Aufwand hängt
+    dann nur vom sichtbaren Bereich ab. Umfasst eine Spalte mindestens 4 Blätter, werden die Blatt-Minima
+    und -Maxima zusammengefasst. Blätter über einer Spaltengrenze werden ab ihrem Blattzustand neu
+    berechnet und auf beide Spalten aufgeteilt (höchstens eins je Grenze), die angeschnittenen Blätter an
+    den Rändern ab dem Blockzustand; jede Spalte enthält so Minimum und Maximum genau ihrer Schritte.
+    """
+    anzahl = model_length(job)
+    bis = anzahl if bis is None else max(0, min(bis, anzahl))
+    von = max(0, min(von, bis))
+    n_buckets = max(1, int(n_buckets))
+    laenge = bis - von
+
+    if laenge <= 2 * n_buckets:
+        if laenge == 0:
+            return np.zeros(0), np.zeros(0)
+        if index is not None:
+            return np.arange(von, bis, dtype=float), _preview_values(job, index, von, bis)
+        # Vorherige Schritte müssen für den Zustand trotzdem durchlaufen werden
+        model = job_model_stream(job)
+        for a in range(0, von, MODEL_BLOCK):
+            model.values(a, min(a + MODEL_BLOCK, von))
+        return np.arange(von, bis, dtype=float), model.values(von, bis)
+
+    b_min = np.full(n_buckets, np.inf)
+    b_max = np.full(n_buckets, -np.inf)
+    if index is not None and laenge >= 4 * PREVIEW_LEAF * n_buckets:
+        # Vollständige Blätter einer Spalte aus der Übersicht, die angeschnittenen Ränder exakt
+        erstes = -(-von // PREVIEW_LEAF)
+        letztes = bis // PREVIEW_LEAF
+        blaetter = np.arange(erstes, letztes)
+        spalte = (blaetter * PREVIEW_LEAF - von) * n_buckets // laenge
+        spalte_ende = ((blaetter + 1) * PREVIEW_LEAF - 1 - von) * n_buckets // laenge
+        ganz = spalte == spalte_ende
+        np.minimum.at(b_min, spalte[ganz], index['blatt_min'][erstes:letztes][ganz])
+        np.maximum.at(b_max, spalte[ganz], index['blatt_max'][erstes:letztes][ganz])
+        model = job_model_stream(job)
+        for blatt in blaetter[~ganz]:
+            _spalten_minmax(b_min, b_max, blatt * PREVIEW_LEAF, _preview_leaf_values(model, index, blatt),
+                            von, laenge, n_buckets)
+        for a, b in ((von, erstes * PREVIEW_LEAF), (letztes * PREVIEW_LEAF, bis)):
+            if b > a:
+                _spalten_minmax(b_min, b_max, a, _preview_values(job, index, a, b), von, laenge, n_buckets)
+    else:
+        model = job_model_stream(job)
+        beginn = 0
+        if index is not None:
+            # Ab dem Block, in dem von liegt
+            beginn = von // MODEL_BLOCK * MODEL_BLOCK
+            model.fortsetzen(index['zustaende'][von // MODEL_BLOCK])
+        for a in range(beginn, bis, MODEL_BLOCK):
+            b = min(a + MODEL_BLOCK, bis)
+            werte = model.values(a, b)
+            if b <= von:
+                continue
+            lo = max(a, von)
+            _spalten_minmax(b_min, b_max, lo, werte[lo - a:], von, laenge, n_buckets)
+
+    # Jede Spalte als senkrechte Strecke Minimum -> Maximum in der Spaltenmitte
+    mitte = von + (np.arange(n_buckets) + 0.5) * laenge / n_buckets
+    return np.repeat(mitte, 2), np.column_stack([b_min, b_max]).ravel()
+
+
+# Job der Vorschau aus einem Cache-Schlüssel (siehe preview_key) aufbauen
+def _preview_job(key, start_date, end_date, interval_hours, time_axis):
+    formel_params = FormelParameter()
+    (formel_params.GW0, formel_params.A, formel_params.T, formel_params.freq, formel_params.Da, formel_params.Dd,
+     formel_params.R_scale, formel_params.curve_randomness, formel_params.secondary_freq,
+     formel_params.seed, formel_params.phase, formel_params.trend) = key
+    # Stellen Sie sicher, dass T nicht Null ist, um Division durch Null zu vermeiden.
+    if formel_params.T == 0: formel_params.T = 365 # Fallback-Wert
+    return prepare_job(start_date, end_date, interval_hours, formel_params, time_axis)
+
+
+@functools.lru_cache(maxsize=PREVIEW_INDEX_CACHE_SIZE)
+def _preview_index(key, start_date, end_date, interval_hours, time_axis):
+    """
+    Übersicht eines Parametersatzes in einem Durchlauf: Modellzustand am Beginn jedes MODEL_BLOCK-Blocks,
+    Minimum/Maximum je PREVIEW_LEAF Schritte und der Zustand vor jedem Blatt (GW ohne Trend und saisonaler
+    Anteil des Schritts davor, Zustand des Zufallsstroms). Gezoomte Ansichten rechnen ab dem Blockzustand,
+    weite Ansichten fassen die Blätter zusammen, statt die Reihe ab Schritt 0 neu zu berechnen.
+    """
+    job = _preview_job(key, start_date, end_date, interval_hours, time_axis)
+    model = job_model_stream(job)
+    anzahl = model_length(job)
+    n_blaetter = -(-anzahl // PREVIEW_LEAF)
+    zustaende = []
+    blatt_min = np.empty(n_blaetter)
+    blatt_max = np.empty(n_blaetter)
+    blatt_gw = np.empty(n_blaetter)
+    blatt_saison = np.empty(n_blaetter)
+    # Zweiter Strom mit demselben Seed, blattweise gezogen: Züge sind unabhängig von der Aufteilung, der
+    # Zustand vor jedem Blatt entspricht also dem des Modellstroms. normal() zieht nur 64-Bit-Werte,
+    # daher genügt der 128-Bit-Zustand (inc und der 32-Bit-Puffer bleiben wie beim Blockzustand)
+    ziehung = model_rng(job['formel_params'].seed)
+    blatt_rng = []
+    for a in range(0, anzahl, MODEL_BLOCK):
+        werte = model.values(a, min(a + MODEL_BLOCK, anzahl))
+        zustaende.append(model.block_zustand)
+        # MODEL_BLOCK ist ein Vielfaches von PREVIEW_LEAF, Blätter liegen nie über einer Blockgrenze
+        starts = np.arange(0, len(werte), PREVIEW_LEAF)
+        blaetter = slice(a // PREVIEW_LEAF, a // PREVIEW_LEAF + len(starts))
+        blatt_min[blaetter] = np.minimum.reduceat(werte, starts)
+        blatt_max[blaetter] = np.maximum.reduceat(werte, starts)
+        GW, seasonal = model.block_modell
+        blatt_gw[blaetter][1:] = GW[starts[1:] - 1]
+        blatt_saison[blaetter][1:] = seasonal[starts[1:] - 1]
+        if a > 0:
+            blatt_gw[blaetter.start], blatt_saison[blaetter.start] = model.block_zustand['prev']
+        for start in starts:
+            blatt_rng.append(ziehung.bit_generator.state['state']['state'])
+            ziehung.normal(0, 1, size=(min(PREVIEW_LEAF, len(werte) - start), 2))
+    return {'zustaende': zustaende, 'blatt_min': blatt_min, 'blatt_max': blatt_max,
+            'blatt_gw': blatt_gw, 'blatt_saison': blatt_saison, 'blatt_rng': blatt_rng}
+
+
+@functools.lru_cache(maxsize=PREVIEW_CACHE_SIZE)
+def _preview_series(key, start_date, end_date, interval_hours, time_axis, n_buckets, von, bis):
+    job = _preview_job(key, start_date, end_date, interval_hours, time_axis)
+    index = _preview_index(key, start_date, end_date, interval_hours, time_axis)
+    schritte, GW = decimate_model_minmax(job, n_buckets, von, bis, index)
+    # Gecachte Arrays werden geteilt und dürfen nicht verändert werden
+    schritte.setflags(write=False)
+    GW.setflags(write=False)
+    return schritte, GW
+
+
+def job_preview_key(job):
+    """Cache-Schlüssel (siehe preview_key) der Formelparameter eines Jobs"""
+    p = job['formel_params']
+    return preview_key(p.GW0, p.A, p.T, p.freq, p.Da, p.Dd, p.R_scale, p.curve_randomness, p.secondary_freq,
+                       p.seed, p.phase, p.trend)
+
+
+# Funktion zur Berechnung der Grundwasserganglinie für die Plot-Vorschau
+def calculate_gw_preview(job, n_buckets, von=0, bis=None):
+    """
+    Vorschau der Modellreihe des konfigurierten Jobs (gleiche Werte wie bei der Generierung,
+    ohne Messstellen-Offset und -Rauschen), verdichtet auf n_buckets Bildpunkt-Spalten.
+    Gibt (Modellschritte, Werte) zurück; Zeit in Tagen = Modellschritt * model_step_days(job).
+    Der erste Aufruf je Parametersatz berechnet die ganze Reihe einmal (siehe _preview_index),
+    weitere Ausschnitte kosten nur noch den sichtbaren Bereich.
+    """
+    return _preview_series(job_preview_key(job), job['start_date'], job['end_date'], job['interval_hours'],
+                           job['time_axis'], int(n_buckets), int(von), None if bis is None else int(bis))
+
+
+def preview_cache_info():
+    """Treffer, Fehlzugriffe und Füllstand des Vorschau-Caches (functools-CacheInfo)"""
+    return _preview_series.cache_info()
+
+
+# Messwerte einer Messstelle aus der Basisreihe ableiten
+def station_values(basis_values, messstellen_offset, noise_scale, zufall):
+    """
+    Basisreihe + Offset der Messstelle + gleichverteiltes Rauschen (vektorisiert).
+    messstellen_offset: fester Offset der Messstelle (siehe station_offset), bei einer Matrix einer je Spalte.
+    zufall: Zufallszahlen in [0, 1) aus dem Strom der Messstelle (siehe StationDraws), eine pro Wert.
+    """
+    # Sehr kleine Zufallsschwankungen, nicht Teil des GW-Modells; gleiche Rechnung wie
+    # rng.uniform(-noise_scale, noise_scale), damit auch gespeicherte Zufallszahlen dieselben Werte ergeben
+    noise = -noise_scale + (2 * noise_scale) * zufall
+    return basis_values + messstellen_offset + noise
+
+
+class StationDraws:
+    """
+    Zufallszahlen in [0, 1) einer Messstelle, blockweise und nur vorwärts abgefragt.
+    Mit Wertespeicher werden bereits gespeicherte Blöcke gelesen und neue dort abgelegt;
+    fehlende Blöcke werden nach einem Sprung im Zufallsstrom (PCG64.advance) gezogen.
+    """
+    def __init__(self, job_seed, messstelle_id, store=None, idx=None):
+        self.rng = station_rng(job_seed, messstelle_id)
+        self.position = 0
+        # Ein Speicher nur für die Basis enthält keine Zufallszahlen
+        self.store = store if store is not None and store.zufall is not None else None
+        self.idx = idx
+
+    def values(self, von, bis):
+        store = self.store
+        if store is not None and bis <= store.fertig[self.idx]:
+            return store.zufall[self.idx, von:bis]
+        if von > self.position:
+            # Eine Zufallszahl entspricht einem Schritt des Generators
+            self.rng.bit_generator.advance(von - self.position)
+        zufall = self.rng.random(bis - von)
+        self.position = bis
+        if store is not None:
+            store.zufall[self.idx, von:bis] = zufall
+            if von <= store.fertig[self.idx]:
+                store.fertig[self.idx] = bis
+        return zufall
+
+
+# Offset- und Rauschfaktor pro Messstelle je Ausgabeformat
+CSV_OFFSET_FAKTOR = 0.02
+EXCEL_OFFSET_FAKTOR = 1.02
+
+# Zeilen pro Block der Generator-Pipeline (bestimmt den Speicherbedarf)
+CHUNK_ROWS = 50_000
+
+
+# Wartezeit (s), nach der der Hauptprozess Abbruch und Pause an die Worker-Prozesse weitergibt
+CONTROL_POLL_S = 0.2
+
+
+# Abbruch eines Jobs durch den Benutzer
+class JobCancelled(Exception):
+    # Von der CSV-Ausgabe gesetzt: Checkpoint-Datei, ab der der Lauf fortgesetzt werden kann, und
+    # die laufende Datei, die auf dessen Stand gekürzt statt entfernt wurde (sonst None)
+    checkpoint = None
+    gekuerzt = None
+
+
+class JobControl:
+    """
+    Steuerung eines laufenden Jobs: Abbrechen und Pausieren/Fortsetzen.
+    Der Generator prüft den Zustand an jeder Blockgrenze (checkpoint).
+    """
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set() # Pausierten Job aufwecken, damit er den Abbruch bemerkt
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def checkpoint(self):
+        """Wartet, solange pausiert ist, und bricht ab, wenn cancel() aufgerufen wurde"""
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+
+class ProcessJobControl(JobControl):
+    """
+    JobControl für Worker-Prozesse: dieselben Zustände als multiprocessing-Events, damit Abbruch und
+    Pause auch Messstellen erreichen, die ein Prozess gerade schreibt. Der Hauptprozess überträgt den
+    Zustand seines JobControl mit spiegeln().
+    """
+    def __init__(self):
+        self._cancelled = multiprocessing.Event()
+        self._running = multiprocessing.Event()
+        self._running.set()
+
+    def spiegeln(self, control):
+        if control is None:
+            return
+        if control.cancelled:
+            self.cancel()
+        elif control.paused:
+            self.pause()
+        else:
+            self.resume()
+
+
+# Phasen eines Generierungslaufs für den Profilbericht (Schlüssel und Bezeichnung)
+PROFILE_PHASES = {
+    'modell': "Modell",
+    'zeilen': "Zeitachse/Messwerte",
+    'formatierung': "Formatierung",
+    'excel': "DataFrame/xlsxwriter",
+    'schreiben': "Schreiben",
+}
+PROFILE_LOG = 'watergen_profil.log'
+# Standarddatei für den optionalen cProfile-Mitschnitt (auswertbar mit pstats oder snakeviz)
+CPROFILE_FILE = 'watergen_run.prof'
+
+
+class PhaseProfile:
+    """
+    Laufzeit je Phase eines Generierungslaufs sowie erzeugte Zeilen und geschriebene Bytes (Dateigröße).
+    Die Generatoren und Exporter messen mit phase(); Profile aus Worker-Prozessen
+    werden mit merge() zusammengeführt (die Phasenzeiten addieren sich dann über alle Prozesse).
+    """
+    def __init__(self):
+        self.sekunden = dict.fromkeys(PROFILE_PHASES, 0.0)
+        self.zeilen = 0
+        self.bytes = 0
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        beginn = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sekunden[name] += time.perf_counter() - beginn
+
+    def merge(self, other):
+        for name, sekunden in other.sekunden.items():
+            self.sekunden[name] += sekunden
+        self.zeilen += other.zeilen
+        self.bytes += other.bytes
+
+    def summary(self):
+        """Kurzfassung für die Oberfläche: Anteil der Phasen an der gemessenen Zeit"""
+        gesamt = sum(self.sekunden.values())
+        if gesamt <= 0:
+            return ""
+        teile = [f"{PROFILE_PHASES[name]} {sekunden / gesamt:.0%}"
+                 for name, sekunden in self.sekunden.items() if sekunden / gesamt >= 0.005]
+        return "Phasen: " + " · ".join(teile)
+
+    def report(self, wall_seconds, titel="", prozesse=1):
+        """
+        Ausführlicher Bericht: Zeit, Anteil und Durchsatz je Phase.
+        Bei mehreren Prozessen beziehen sich die Anteile auf die Summe der Phasenzeiten statt auf die Laufzeit.
+        """
+        def zahl(wert):
+            return f"{wert:,.0f}".replace(',', '.')
+
+        gemessen = sum(self.sekunden.values())
+        zeilen_pro_s = self.zeilen / wall_seconds if wall_seconds > 0 else 0.0
+        zeilen = [
+            f"WaterGen-Profil {datetime.now():%d.%m.%Y %H:%M:%S}" + (f" – {titel}" if titel else ""),
+            f"  Gesamt: {wall_seconds:.3f} s, {zahl(self.zeilen)} Zeilen ({zahl(zeilen_pro_s)} Zeilen/s), "
+            f"{format_bytes(self.bytes)}",
+            f"  {'Phase':<22}{'Zeit [s]':>10}{'Anteil':>9}{'Zeilen/s':>14}",
+        ]
+        bezug = gemessen if prozesse > 1 else wall_seconds
+        if prozesse > 1:
+            zeilen.insert(2, f"  Phasenzeiten über {prozesse} Prozesse summiert")
+        for name, sekunden in self.sekunden.items():
+            if sekunden <= 0:
+                continue
+            anteil = sekunden / bezug if bezug > 0 else 0.0
+            durchsatz = zahl(self.zeilen / sekunden)
+            zeilen.append(f"  {PROFILE_PHASES[name]:<22}{sekunden:>10.3f}{anteil:>9.1%}{durchsatz:>14}")
+        if prozesse == 1 and gemessen < wall_seconds:
+            # Übrige Zeit: Fortschritt, Pausen, Warten auf Worker-Prozesse
+            rest = wall_seconds - gemessen
+            zeilen.append(f"  {'Sonstiges':<22}{rest:>10.3f}{rest / wall_seconds:>9.1%}{'':>14}")
+        return "\n".join(zeilen)
+
+
+def write_profile_log(text, filename=PROFILE_LOG):
+    """Profilbericht an die Logdatei im Ausgabeverzeichnis anhängen"""
+    with open(filename, 'a', encoding='utf-8') as f:
+        f.write(text + "\n\n")
+
+
+# Wertespeicher: Rohwerte eines Jobs als Memory-Map auf der lokalen Platte
+VALUE_STORE_VERSION = 1
+VALUE_STORE_META = 'speicher.json'
+
+
+class ValueStore:
+    """
+    Formatunabhängige Rohwerte eines Jobs in einem Verzeichnis:
+    basis.npy   (Zeitpunkte,)               Modellwert je Messzeitpunkt
+                (Messstellen x Zeitpunkte)  bei räumlicher Korrelation eine Reihe je Messstelle
+    zufall.npy  (Messstellen x Zeitpunkte)  Zufallszahlen in [0, 1) je Messstelle, zeilenweise zusammenhängend
+    fertig.npy  (Messstellen,)              Index nach dem letzten gespeicherten Zeitpunkt je Messstelle
+                                            (beim Verlängern beginnt der Speicher beim ersten neuen Zeitpunkt)
+    Offset und Rauschskala hängen vom Ausgabeformat ab und werden erst beim Lesen angewendet
+    (station_values), daher kann derselbe Speicher in jedes Format exportiert werden.
+    Ein Speicher nur für die Basis (meta 'nur_basis', siehe open_value_store) hat weder zufall.npy
+    noch fertig.npy; die Zufallszahlen werden dann wie ohne Speicher gezogen.
+    Beim Pickeln (Worker-Prozesse) wird nur der Pfad übertragen und die Dateien neu geöffnet.
+    """
+    def __init__(self, pfad):
+        self.pfad = pfad
+        with open(os.path.join(pfad, VALUE_STORE_META), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.basis = np.load(os.path.join(pfad, 'basis.npy'), mmap_mode='r+')
+        self.zufall = None
+        self.fertig = None
+        if not self.meta.get('nur_basis'):
+            self.zufall = np.load(os.path.join(pfad, 'zufall.npy'), mmap_mode='r+')
+            self.fertig = np.load(os.path.join(pfad, 'fertig.npy'), mmap_mode='r+')
+
+    def __getstate__(self):
+        return {'pfad': self.pfad}
+
+    def __setstate__(self, state):
+        self.__init__(state['pfad'])
+
+    def flush(self):
+        for array in (self.basis, self.zufall, self.fertig):
+            if array is not None:
+                array.flush()
+
+    def stored_values(self):
+        if self.fertig is None:
+            return 0
+        return int(np.sum(self.fertig)) - len(self.fertig) * self.meta.get('von', 0)
+
+
+def _value_store_meta(job, messstellen_ids):
+    # Alles, wovon die gespeicherten Rohwerte abhängen; JSON-Rundreise für den Vergleich mit der Datei
+    korrelation = job.get('korrelation')
+    if korrelation is not None:
+        # Prüfsumme statt der ganzen n x n-Matrix
+        korrelation = hashlib.blake2b(np.ascontiguousarray(korrelation, dtype=float).tobytes(),
+                                      digest_size=16).hexdigest()
+    return json.loads(json.dumps({
+        'version': VALUE_STORE_VERSION,
+        'start_date': job['start_date'].isoformat(),
+        'end_date': job['end_date'].isoformat(),
+        'interval_hours': job['interval_hours'],
+        'time_axis': job['time_axis'],
+        'anzahl': job['anzahl'],
+        'formel_params': vars(job['formel_params']),
+        'messstellen': list(messstellen_ids),
+        'korrelation': korrelation,
+        'von': job.get('von', 0),
+        'basis_fertig': False,
+        'modell_ende': None,
+    }))
+
+
+def _write_json_replace(filename, daten, sync=False):
+    # Erst vollständig schreiben, dann ersetzen, damit ein Abbruch keine halbe Datei hinterlässt;
+    # sync: vor dem Ersetzen auf die Platte schreiben (übersteht auch einen Neustart des Rechners)
+    temp = filename + '.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(daten, f, ensure_ascii=False, indent=1)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(temp, filename)
+
+
+def _write_value_store_meta(pfad, meta):
+    _write_json_replace(os.path.join(pfad, VALUE_STORE_META), meta)
+
+
+def open_value_store(pfad, job, messstellen_ids, control=None, profil=None, nur_basis=False):
+    """
+    Wertespeicher für den Job öffnen oder anlegen und die Basisreihe berechnen, falls sie fehlt.
+    Passt ein vorhandener Speicher zum Job (gleiche Zeitachse, Formelparameter und Messstellen),
+    werden seine Werte weiterverwendet: ein abgebrochener Lauf setzt fort, ein weiterer Export
+    in einem anderen Format liest nur noch. Sonst wird der Speicher neu angelegt.
+    Bei räumlicher Korrelation enthält basis.npy eine Reihe je Messstelle (Messstellen x Zeitpunkte).
+    nur_basis: nur basis.npy anlegen (Zwischenspeicher der Basisreihen für den Export je Messstelle,
+               siehe create_csv_files).
+    """
+    meta = _value_store_meta(job, messstellen_ids)
+    if nur_basis:
+        meta['nur_basis'] = True
+    korreliert = job.get('korrelation') is not None
+    # Blöcke der Basisberechnung mit etwa CHUNK_ROWS Werten über alle Messstellen
+    basis_zeilen = max(1, CHUNK_ROWS // len(messstellen_ids)) if korreliert else CHUNK_ROWS
+    vorhanden = None
+    try:
+        with open(os.path.join(pfad, VALUE_STORE_META), 'r', encoding='utf-8') as f:
+            vorhanden = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if vorhanden is None or dict(vorhanden, basis_fertig=False, modell_ende=None) != meta:
+        os.makedirs(pfad, exist_ok=True)
+        basis_form = (len(messstellen_ids), job['anzahl']) if korreliert else (job['anzahl'],)
+        np.lib.format.open_memmap(os.path.join(pfad, 'basis.npy'), 'w+', float, basis_form).flush()
+        if not nur_basis:
+            np.lib.format.open_memmap(os.path.join(pfad, 'zufall.npy'), 'w+', float,
+                                      (len(messstellen_ids), job['anzahl'])).flush()
+            fertig = np.lib.format.open_memmap(os.path.join(pfad, 'fertig.npy'), 'w+', np.int64,
+                                               (len(messstellen_ids),))
+            fertig[:] = meta['von']
+            fertig.flush()
+            del fertig
+        _write_value_store_meta(pfad, meta)
+        vorhanden = meta
+
+    store = ValueStore(pfad)
+    if not vorhanden['basis_fertig']:
+        # Die Modellreihe läuft nur vorwärts, daher wird die Basis bei Bedarf ganz neu berechnet
+        ende = {}
+        for von, (zeitpunkte, basis_values) in zip(itertools.count(meta['von'], basis_zeilen),
+                                                   iter_basis_blocks(job, basis_zeilen, control, profil, ende=ende)):
+            if korreliert:
+                store.basis[:, von:von + len(zeitpunkte)] = basis_values.T
+            else:
+                store.basis[von:von + len(zeitpunkte)] = basis_values
+        store.basis.flush()
+        # Modellzustand am Ende mitspeichern, damit eine Ausgabe aus dem Speicher verlängerbar bleibt
+        store.meta = dict(vorhanden, basis_fertig=True, modell_ende=ende.get('modell'))
+        _write_value_store_meta(pfad, store.meta)
+    return store
+
+
+# Blöcke (Zeitpunkte, Basiswerte) der Modellreihe im Messraster erzeugen
+def iter_basis_blocks(job, chunk_rows=CHUNK_ROWS, control=None, profil=None, idx=None, checkpoint=None, start=None,
+                      ende=None):
+    """
+    Bei räumlicher Korrelation hat jede Messstelle eine eigene Basisreihe: mit idx nur die
+    Reihe dieser Messstelle, sonst ein Block (Zeitpunkte x Messstellen).
+    checkpoint (CheckpointWriter) erhält vor jedem gelieferten Block den Modellzustand, aus dem die
+    folgenden Zeitpunkte weiterrechnen; start (Eintrag 'laufend' eines Checkpoints) setzt dort fort.
+    ende: Dict, in das nach dem letzten Block unter 'modell' der Modellzustand am Ende der Reihe
+    eingetragen wird (für output_state, ohne weiteren Modelldurchlauf).
+    """
+    if profil is None:
+        profil = PhaseProfile()
+    # Mit Wertespeicher liegt die Basisreihe bereits vollständig im Messraster vor
+    store = job.get('werte_speicher')
+    model = job_model_stream(job) if store is None else None
+    if model is not None and start is not None and start['modell'] is not None:
+        model.fortsetzen(start['modell'])
+    start_day = np.datetime64(job['start_date'].date(), 'D')
+    erster = job.get('von', 0) if start is None else start['zeile']
+
+    for von in range(erster, job['anzahl'], chunk_rows):
+        if control is not None:
+            control.checkpoint()
+        bis = min(von + chunk_rows, job['anzahl'])
+        with profil.phase('zeilen'):
+            zeitpunkte = build_time_axis(job['start_date'], job['end_date'], job['interval_hours'], von, bis)
+
+        # Basiswert für jeden Messzeitpunkt (eine Spalte statt Nachschlagen pro Zeile)
+        with profil.phase('modell'):
+            if store is not None and store.basis.ndim == 2:
+                # Gespeichert als (Messstellen x Zeitpunkte), je Messstelle zusammenhängend
+                basis_values = store.basis[:, von:bis].T if idx is None else store.basis[idx, von:bis]
+            elif store is not None:
+                basis_values = store.basis[von:bis]
+            elif job['time_axis'] == "interval":
+                basis_values = model.values(von, bis)
+            else:
+                tage_index = (zeitpunkte.astype('datetime64[D]') - start_day).astype(int)
+                basis_values = model.values(tage_index[0], tage_index[-1] + 1)[tage_index - tage_index[0]]
+            if idx is not None and basis_values.ndim == 2:
+                basis_values = basis_values[:, idx]
+        if checkpoint is not None:
+            checkpoint.modell = None if model is None else model.block_zustand
+        yield zeitpunkte, basis_values
+    if ende is not None:
+        # Der Wertespeicher hat den Zustand beim Berechnen der Basis festgehalten
+        ende['modell'] = model.block_zustand if model is not None else store.meta.get('modell_ende')
+
+
+# Blöcke (Messstelle, Zeitpunkte, Messwerte) einer Messstelle erzeugen
+def iter_station_blocks(job, idx, messstelle_id, offset_faktor, chunk_rows=CHUNK_ROWS, control=None, profil=None,
+                        checkpoint=None, start=None, ende=None):
+    if profil is None:
+        profil = PhaseProfile()
+    formel_params = job['formel_params']
+    zufall = StationDraws(formel_params.seed, messstelle_id, job.get('werte_speicher'), idx)
+    messstellen_offset = station_offset(formel_params.seed, messstelle_id, offset_faktor)
+    von = job.get('von', 0) if start is None else start['zeile']
+
+    for zeitpunkte, basis_values in iter_basis_blocks(job, chunk_rows, control, profil, idx, checkpoint, start, ende):
+        bis = von + len(zeitpunkte)
+        with profil.phase('zeilen'):
+            messwerte = station_values(basis_values, messstellen_offset, formel_params.R_scale * offset_faktor,
+                                       zufall.values(von, bis))
+        profil.zeilen += len(messwerte)
+        von = bis
+        yield messstelle_id, zeitpunkte, messwerte
+
+
+# Blöcke aller Messstellen nacheinander erzeugen
+def iter_value_blocks(job, messstellen_ids, offset_faktor, chunk_rows=CHUNK_ROWS, control=None, profil=None):
+    for idx, messstelle_id in enumerate(messstellen_ids):
+        yield from iter_station_blocks(job, idx, messstelle_id, offset_faktor, chunk_rows, control, profil)
+
+
+# Blöcke (Zeitpunkte, Messwerte aller Messstellen) im Zeittakt erzeugen
+def iter_time_blocks(job, messstellen_ids, offset_faktor, chunk_rows=CHUNK_ROWS, control=None, profil=None,
+                     checkpoint=None, start=None, ende=None):
+    """
+    Liefert pro Block eine Matrix (Zeitpunkte x Messstellen) mit denselben Werten wie iter_value_blocks.
+    Ein Block umfasst etwa chunk_rows Werte über alle Messstellen; die Modellreihe wird nur einmal berechnet.
+    Nur das Ziehen der Zufallszahlen läuft je Messstelle (eigener Strom), die Messwerte entstehen in einer
+    Matrixrechnung für alle Messstellen.
+    """
+    formel_params = job['formel_params']
+    anzahl_messstellen = len(messstellen_ids)
+    store = job.get('werte_speicher')
+    if store is not None and store.zufall is None:
+        store = None
+    zufall = [StationDraws(formel_params.seed, messstelle_id, store, idx)
+              for idx, messstelle_id in enumerate(messstellen_ids)]
+    messstellen_offset = np.array([station_offset(formel_params.seed, messstelle_id, offset_faktor)
+                                   for messstelle_id in messstellen_ids])
+    zeilen_pro_block = max(1, chunk_rows // anzahl_messstellen)
+    if profil is None:
+        profil = PhaseProfile()
+    von = job.get('von', 0) if start is None else start['zeile']
+
+    for zeitpunkte, basis_values in iter_basis_blocks(job, zeilen_pro_block, control, profil, checkpoint=checkpoint,
+                                                      start=start, ende=ende):
+        bis = von + len(zeitpunkte)
+        with profil.phase('zeilen'):
+            if store is not None and store.fertig.min() >= bis:
+                # Alle Zufallszahlen des Blocks liegen im Speicher: ein Lesezugriff für alle Messstellen
+                zufall_block = store.zufall[:, von:bis].T
+            else:
+                zufall_block = np.empty((len(zeitpunkte), anzahl_messstellen), dtype=float)
+                for idx, draws in enumerate(zufall):
+                    zufall_block[:, idx] = draws.values(von, bis)
+            basis = basis_values[:, None] if basis_values.ndim == 1 else basis_values
+            messwerte = station_values(basis, messstellen_offset, formel_params.R_scale * offset_faktor, zufall_block)
+        profil.zeilen += messwerte.size
+        von = bis
+        yield zeitpunkte, messwerte
+
+
+# Zeilenende wie beim csv-Modul (Standard-lineterminator)
+CSV_LINE_END = '\r\n'
+
+
+# Zeitstempel spaltenweise im Format TT.MM.JJJJ hh:mm:ss formatieren
+def format_timestamps(zeitpunkte):
+    """Formatiert ein datetime64-Array ohne strftime pro Zeile"""
+    zeitpunkte = np.asarray(zeitpunkte, dtype='datetime64[s]')
+    if len(zeitpunkte) == 0:
+        return []
+    jahre = zeitpunkte.astype('datetime64[Y]').astype(int) + 1970
+    if jahre.min() < 1000 or jahre.max() > 9999:
+        # Außerhalb vierstelliger Jahre bleibt strftime maßgeblich
+        return [t.strftime("%d.%m.%Y %H:%M:%S") for t in zeitpunkte.astype(datetime)]
+
+    # ISO-Text 'JJJJ-MM-TTThh:mm:ss' byteweise in 'TT.MM.JJJJ hh:mm:ss' umsortieren
+    iso = np.datetime_as_string(zeitpunkte, unit='s').astype('S19').view(np.uint8).reshape(-1, 19)
+    reihenfolge = [8, 9, 4, 5, 6, 4, 0, 1, 2, 3, 10, 11, 12, 13, 14, 15, 16, 17, 18]
+    umgestellt = iso[:, reihenfolge]
+    umgestellt[:, [2, 5]] = ord('.')
+    umgestellt[:, 10] = ord(' ')
+    return np.ascontiguousarray(umgestellt).view('S19').ravel().astype('U19').tolist()
+
+
+# Messwerte mit zwei Nachkommastellen und Dezimalkomma formatieren
+def format_messwerte(werte):
+    """Ein Formatierungsaufruf und ein replace für den ganzen Block statt pro Wert"""
+    if len(werte) == 0:
+        return []
+    text = ('%.2f\n' * len(werte)) % tuple(np.asarray(werte, dtype=float).tolist())
+    return text[:-1].replace('.', ',').split('\n')
+
+
+# Feld so quoten, wie es csv.writer mit Semikolon-Trennzeichen tun würde
+def csv_field(value):
+    buffer = io.StringIO(newline='')
+    csv.writer(buffer, delimiter=';', lineterminator=CSV_LINE_END).writerow([value])
+    return buffer.getvalue()[:-len(CSV_LINE_END)]
+
+
+# Zeilen eines Blocks einer Messstelle als UTF-8-Bytes zusammensetzen
+def csv_block_bytes(name_feld, formatted_dates, formatted_values):
+    zeile = name_feld.replace('%', '%%') + ';%s;%s' + CSV_LINE_END
+    felder = tuple(itertools.chain.from_iterable(zip(formatted_dates, formatted_values)))
+    return ((zeile * len(formatted_dates)) % felder).encode('utf-8')
+
+
+# Einen Block Zeilen einer Messstelle mit einem einzigen write() schreiben
+def write_csv_block(csvfile, name_feld, formatted_dates, formatted_values, profil=None):
+    """Schreibt UTF-8-kodiert in einen Binärstrom und gibt die Anzahl unkomprimierter Bytes zurück"""
+    if profil is None:
+        profil = PhaseProfile()
+    with profil.phase('formatierung'):
+        daten = csv_block_bytes(name_feld, formatted_dates, formatted_values)
+    with profil.phase('schreiben'):
+        csvfile.write(daten)
+    return len(daten)
+
+
+# Kompression der CSV-Ausgabe: Dateiendung und Standardstufe
+CSV_COMPRESSION = {
+    "gzip": ('.gz', 6),
+    "zstd": ('.zst', 3),
+}
+
+
+# Dateiname der CSV-Datei einer Messstelle
+def csv_filename(messstelle_id, compression=None):
+    endung = CSV_COMPRESSION[compression][0] if compression else ''
+    return f'wasserstände_{messstelle_id.replace(" ", "_")}.csv{endung}'
+
+
+# Binärstrom für die CSV-Ausgabe öffnen, bei Bedarf mit Kompression während des Schreibens
+def open_csv_output(filename, compression=None, compression_level=None, append=False):
+    # append: an eine vorhandene Datei anhängen; komprimiert entsteht ein weiterer gzip-Member bzw.
+    #         zstd-Frame, der entpackte Inhalt ist derselbe wie bei einer in einem Zug geschriebenen Datei
+    modus = 'ab' if append else 'wb'
+    if not compression:
+        return open(filename, modus)
+    if compression not in CSV_COMPRESSION:
+        raise ValueError(f"Unbekannte CSV-Kompression: {compression}")
+    level = CSV_COMPRESSION[compression][1] if compression_level is None else compression_level
+    if compression == "gzip":
+        # mtime=0: gleiche Werte ergeben byteidentische Dateien
+        return gzip.GzipFile(filename, modus, compresslevel=level, mtime=0)
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("Für zstd-Kompression wird das Paket 'zstandard' benötigt.")
+    return zstandard.open(filename, modus, cctx=zstandard.ZstdCompressor(level=level))
+
+
+# Geschriebene Datenmenge für die Abschlussmeldung (Dezimalkomma wie bei den Messwerten)
+def format_bytes(anzahl):
+    for einheit in ("B", "KB", "MB", "GB"):
+        if anzahl < 1000 or einheit == "GB":
+            break
+        anzahl /= 1000
+    return f"{anzahl:.1f} {einheit}".replace('.', ',')
+
+
+def csv_size_text(roh_bytes, datei_bytes, compression=None):
+    text = f"{format_bytes(datei_bytes)} geschrieben"
+    if compression and datei_bytes:
+        text += f" ({compression}, Verhältnis {roh_bytes / datei_bytes:.1f}:1)".replace('.', ',')
+    return text
+
+
+# Abgebrochenen Schreibvorgang rückgängig machen: neue Datei entfernen, angehängte Bytes abschneiden
+def _discard_csv_output(filename, append_offset=None):
+    if append_offset is None:
+        os.remove(filename)
+    else:
+        os.truncate(filename, append_offset)
+
+
+def _cancel_offset(filename, append_offset, start, checkpoint):
+    # Länge, auf die eine abgebrochene Datei gekürzt wird (None = entfernen). Ist die Datei in einem
+    # Checkpoint gesichert, bleibt dieser Stand erhalten, damit der Lauf fortgesetzt werden kann
+    if checkpoint is not None and checkpoint.laufend is not None and checkpoint.laufend['datei'] == filename:
+        return checkpoint.laufend['offset']
+    if start is not None:
+        return start['offset']
+    return append_offset
+
+
+# CSV-Datei einer Messstelle schreiben
+def export_station_csv(job, idx, messstelle_id, chunk_rows=CHUNK_ROWS, on_block=None, control=None,
+                       compression=None, compression_level=None, profil=None, append=False, checkpoint=None,
+                       start=None, ende=None):
+    """
+    Erzeugt die Messwerte einer Messstelle blockweise und schreibt wasserstände_<id>.csv (bzw. .csv.gz/.csv.zst).
+    Mit append werden die Zeilen ab job['von'] ohne Kopfzeile an die vorhandene Datei angehängt.
+    checkpoint: CheckpointWriter, der nach geschriebenen Blöcken den Fortschritt sichert (nur unkomprimiert);
+    start: Eintrag 'laufend' eines Checkpoints, die Datei wird ab dessen Offset und Zeile fortgesetzt.
+    ende: erhält den Modellzustand am Ende der Reihe (siehe iter_basis_blocks).
+    Gibt (Zeilen, unkomprimierte Bytes, neue Bytes auf der Platte) zurück.
+    Bei Abbruch wird die unvollständige Datei entfernt bzw. auf ihre vorherige Länge gekürzt,
+    eine in einem Checkpoint gesicherte Datei auf den zuletzt gesicherten Offset.
+    """
+    filename = csv_filename(messstelle_id, compression)
+    zeilen = 0
+    roh_bytes = 0
+    if start is not None:
+        # Alles hinter dem gesicherten Offset stammt aus der Zeit nach dem Checkpoint
+        os.truncate(filename, start['offset'])
+    fortsetzen = append or start is not None
+    append_offset = os.path.getsize(filename) if fortsetzen else None
+    position = job.get('von', 0) if start is None else start['zeile']
+    if profil is None:
+        profil = PhaseProfile()
+
+    try:
+        with open_csv_output(filename, compression, compression_level, fortsetzen) as csvfile:
+            if not fortsetzen:
+                kopf = ('GWMST Name;Datum/Zeit;Messwert' + CSV_LINE_END).encode('utf-8')
+                csvfile.write(kopf)
+                roh_bytes += len(kopf)
+            name_feld = csv_field(messstelle_id)
+
+            # Blockweise formatieren und schreiben, sobald der Generator liefert
+            for _, zeitpunkte, messwerte in iter_station_blocks(job, idx, messstelle_id, CSV_OFFSET_FAKTOR,
+                                                                chunk_rows, control, profil, checkpoint, start,
+                                                                ende):
+                with profil.phase('formatierung'):
+                    datumstexte = format_timestamps(zeitpunkte)
+                    werte = format_messwerte(messwerte)
+                roh_bytes += write_csv_block(csvfile, name_feld, datumstexte, werte, profil)
+                zeilen += len(zeitpunkte)
+                position += len(zeitpunkte)
+                if checkpoint is not None and not compression:
+                    checkpoint.block(idx, position, csvfile, filename)
+                if on_block is not None:
+                    on_block(len(zeitpunkte))
+    except JobCancelled:
+        _discard_csv_output(filename, _cancel_offset(filename, append_offset if append else None, start, checkpoint))
+        raise
+
+    datei_bytes = os.path.getsize(filename) - (append_offset or 0)
+    profil.bytes += datei_bytes
+    return zeilen, roh_bytes, datei_bytes
+
+
+# Steuerung im Worker-Prozess, beim Start des Prozesspools gesetzt
+_worker_control = None
+
+
+def _worker_init(control):
+    global _worker_control
+    _worker_control = control
+    # Strg+C erreicht die ganze Prozessgruppe; abgebrochen wird über control, damit der Worker aufräumt
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _export_station_csv_profiled(*args, **kwargs):
+    """
+    Für Worker-Prozesse: Ergebnis von export_station_csv zusammen mit dem eigenen Profil und
+    dem Modellzustand am Ende der Reihe zurückgeben
+    """
+    profil = PhaseProfile()
+    ende = {}
+    return export_station_csv(*args, control=_worker_control, profil=profil, ende=ende, **kwargs), profil, ende
+
+
+# Aufbau der CSV-Ausgabe: eine Datei je Messstelle oder eine gemeinsame Datei im Langformat
+CSV_LAYOUTS = ("per_station", "long_by_station", "long_by_time")
+
+
+def long_csv_filename(compression=None):
+    endung = CSV_COMPRESSION[compression][0] if compression else ''
+    return f'wasserstände_alle_messstellen.csv{endung}'
+
+
+def long_csv_index_filename(filename):
+    return filename + '.index.json'
+
+
+# Alle Messstellen in eine CSV-Datei im Langformat schreiben
+def export_long_csv(job, messstellen_ids, filename, order="station", chunk_rows=CHUNK_ROWS, on_block=None,
+                    control=None, compression=None, compression_level=None, write_index=False, profil=None,
+                    append=False, checkpoint=None, start=None, ende=None):
+    """
+    Schreibt eine Tabelle GWMST Name;Datum/Zeit;Messwert für alle Messstellen mit wenigen großen write()-Aufrufen.
+    order="station": Messstellen nacheinander, optional mit Index-Datei (Byte-Offset, Länge und Zeilen je Messstelle).
+    order="time": Zeilen nach Zeitpunkt verschränkt, alle Messstellen je Zeitpunkt hintereinander.
+    Die Offsets beziehen sich auf den unkomprimierten Inhalt. Gibt (Zeilen, unkomprimierte Bytes, neue Bytes auf der Platte) zurück.
+    append (nur order="time"): Zeitpunkte ab job['von'] ohne Kopfzeile an die vorhandene Datei anhängen.
+    checkpoint/start (nur order="time"): Fortschritt sichern bzw. ab einem Checkpoint fortsetzen, siehe export_station_csv.
+    ende (nur order="time"): erhält den Modellzustand am Ende der Reihe (siehe iter_basis_blocks).
+    """
+    if write_index and order != "station":
+        raise ValueError("Ein Index ist nur bei Sortierung nach Messstelle möglich.")
+    if (append or checkpoint is not None or start is not None) and order != "time":
+        raise ValueError("Anhängen und Fortsetzen sind nur bei Sortierung nach Zeitpunkt möglich.")
+    index_filename = long_csv_index_filename(filename)
+    zeilen = 0
+    roh_bytes = 0
+    index = {}
+    if start is not None:
+        # Alles hinter dem gesicherten Offset stammt aus der Zeit nach dem Checkpoint
+        os.truncate(filename, start['offset'])
+    fortsetzen = append or start is not None
+    append_offset = os.path.getsize(filename) if fortsetzen else None
+    position = job.get('von', 0) if start is None else start['zeile']
+    if profil is None:
+        profil = PhaseProfile()
+
+    try:
+        with open_csv_output(filename, compression, compression_level, fortsetzen) as csvfile:
+            kopf = ('GWMST Name;Datum/Zeit;Messwert' + CSV_LINE_END).encode('utf-8')
+            if not fortsetzen:
+                csvfile.write(kopf)
+                roh_bytes += len(kopf)
+
+            if order == "station":
+                name_felder = {}
+                for messstelle_id, zeitpunkte, messwerte in iter_value_blocks(job, messstellen_ids, CSV_OFFSET_FAKTOR,
+                                                                              chunk_rows, control, profil):
+                    if messstelle_id not in name_felder:
+                        name_felder[messstelle_id] = csv_field(messstelle_id)
+                        index[messstelle_id] = {'offset': roh_bytes, 'bytes': 0, 'zeilen': 0}
+                    with profil.phase('formatierung'):
+                        datumstexte = format_timestamps(zeitpunkte)
+                        werte = format_messwerte(messwerte)
+                    geschrieben = write_csv_block(csvfile, name_felder[messstelle_id], datumstexte, werte, profil)
+                    index[messstelle_id]['bytes'] += geschrieben
+                    index[messstelle_id]['zeilen'] += len(zeitpunkte)
+                    roh_bytes += geschrieben
+                    zeilen += len(zeitpunkte)
+                    if on_block is not None:
+                        on_block(len(zeitpunkte))
+            else:
+                # Zeilenvorlage für einen Zeitpunkt: alle Messstellen nacheinander
+                vorlage = ''.join(csv_field(m).replace('%', '%%') + ';%s;%s' + CSV_LINE_END for m in messstellen_ids)
+                for zeitpunkte, messwerte in iter_time_blocks(job, messstellen_ids, CSV_OFFSET_FAKTOR,
+                                                             chunk_rows, control, profil, checkpoint, start, ende):
+                    with profil.phase('formatierung'):
+                        # Jeder Zeitstempel wird einmal formatiert und für alle Messstellen wiederholt
+                        datumstexte = np.repeat(format_timestamps(zeitpunkte), len(messstellen_ids)).tolist()
+                        werte = format_messwerte(messwerte.ravel())
+                        felder = tuple(itertools.chain.from_iterable(zip(datumstexte, werte)))
+                        daten = ((vorlage * len(zeitpunkte)) % felder).encode('utf-8')
+                    with profil.phase('schreiben'):
+                        csvfile.write(daten)
+                    roh_bytes += len(daten)
+                    zeilen += messwerte.size
+                    position += len(zeitpunkte)
+                    if checkpoint is not None and not compression:
+                        checkpoint.block(None, position, csvfile, filename)
+                    if on_block is not None:
+                        on_block(messwerte.size)
+    except JobCancelled:
+        _discard_csv_output(filename, _cancel_offset(filename, append_offset if append else None, start, checkpoint))
+        raise
+
+    if write_index:
+        with open(index_filename, 'w', encoding='utf-8') as f:
+            json.dump({
+                'datei': filename,
+                'kompression': compression,
+                'kopfzeile_bytes': len(kopf),
+                'messstellen': index,
+            }, f, ensure_ascii=False, indent=1)
+
+    datei_bytes = os.path.getsize(filename) - (append_offset or 0)
+    profil.bytes += datei_bytes
+    return zeilen, roh_bytes, datei_bytes
+
+
+# Zustandsdatei der CSV-Ausgabe: daraus setzt eine Verlängerung bis zu einem späteren Enddatum fort
+OUTPUT_STATE_FILE = 'wasserstände_zustand.json'
+OUTPUT_STATE_VERSION = 1
+# CSV-Aufbauten, an deren Dateien spätere Zeitpunkte angehängt werden können
+APPENDABLE_CSV_LAYOUTS = ("per_station", "long_by_time")
+
+
+def csv_output_files(messstellen_ids, csv_layout="per_station", compression=None):
+    """Dateinamen der CSV-Ausgabe eines Jobs"""
+    if csv_layout == "per_station":
+        return [csv_filename(messstelle_id, compression) for messstelle_id in messstellen_ids]
+    return [long_csv_filename(compression)]
+
+
+def _output_state_run(job, messstellen_ids, csv_layout, compression):
+    # Angaben, die beim Verlängern gleich bleiben müssen (Enddatum und Anzahl ändern sich)
+    meta = _value_store_meta(job, messstellen_ids)
+    lauf = {schluessel: meta[schluessel] for schluessel in
+            ('start_date', 'interval_hours', 'time_axis', 'formel_params', 'messstellen', 'korrelation')}
+    return dict(lauf, csv_layout=csv_layout, kompression=compression)
+
+
+def output_state(job, messstellen_ids, csv_layout="per_station", compression=None, modell=None):
+    """
+    Zustand am Ende der CSV-Ausgabe eines Jobs: Laufangaben, Ende (Datum und Anzahl Zeitpunkte)
+    und Modellzustand. modell kommt aus dem Modellstrom, der die Ausgabe erzeugt hat (siehe
+    iter_basis_blocks); nur ohne Angabe wird er mit job_model_state eigens berechnet.
+    Die Zufallsströme der Messstellen brauchen keinen eigenen Eintrag, ihre Position ergibt sich
+    aus der Anzahl Zeitpunkte.
+    """
+    return {
+        'version': OUTPUT_STATE_VERSION,
+        'lauf': _output_state_run(job, messstellen_ids, csv_layout, compression),
+        'end_date': job['end_date'].isoformat(),
+        'anzahl': job['anzahl'],
+        'modell': job_model_state(job) if modell is None else modell,
+    }
+
+
+def write_output_state(zustand, dateien, filename=OUTPUT_STATE_FILE):
+    """Zustand zusammen mit der aktuellen Größe jeder Ausgabedatei speichern"""
+    _write_json_replace(filename, dict(zustand, dateien={name: os.path.getsize(name) for name in dateien}))
+
+
+def load_output_state(job, messstellen_ids, csv_layout="per_station", compression=None, filename=OUTPUT_STATE_FILE):
+    """
+    Zustand der vorhandenen Ausgabe lesen, um sie bis job['end_date'] zu verlängern.
+    ValueError, wenn die Zustandsdatei fehlt, der Job nicht zur Ausgabe passt, das Enddatum nicht
+    später liegt oder eine Ausgabedatei seit dem letzten Lauf verändert wurde.
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            zustand = json.load(f)
+    except (OSError, ValueError):
+        raise ValueError(f"Keine lesbare Zustandsdatei {filename}, die Ausgabe kann nicht verlängert werden "
+                         f"(nur Ausgaben aus einem Lauf mit extendable bzw. --verlaengerbar)")
+    lauf = json.loads(json.dumps(_output_state_run(job, messstellen_ids, csv_layout, compression)))
+    if zustand.get('version') != OUTPUT_STATE_VERSION or zustand.get('lauf') != lauf:
+        raise ValueError("Vorhandene Ausgabe passt nicht zum Job (Startdatum, Intervall, Zeitachse, Formelparameter, "
+                         "Messstellen, Korrelation, CSV-Aufbau oder Kompression unterscheiden sich)")
+    if job['anzahl'] <= zustand['anzahl']:
+        ende = datetime.fromisoformat(zustand['end_date'])
+        raise ValueError(f"Enddatum muss nach dem Ende der vorhandenen Ausgabe liegen ({ende:%d.%m.%Y})")
+    for name, groesse in zustand['dateien'].items():
+        if not os.path.exists(name) or os.path.getsize(name) != groesse:
+            raise ValueError(f"{name} wurde seit dem letzten Lauf verändert, die Ausgabe kann nicht verlängert werden")
+    return zustand
+
+
+# Checkpoints langer CSV-Läufe: Zustandsdatei und Mindestabstand zwischen zwei Sicherungen (s)
+CHECKPOINT_FILE = 'wasserstände_checkpoint.json'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL_S = 30.0
+
+
+def _checkpoint_run(job, messstellen_ids, csv_layout, compression):
+    # Angaben, die beim Fortsetzen gleich bleiben müssen (anders als beim Verlängern auch das Ende)
+    return dict(_output_state_run(job, messstellen_ids, csv_layout, compression),
+                end_date=job['end_date'].isoformat(), anzahl=job['anzahl'])
+
+
+class CheckpointWriter:
+    """
+    Sichert während eines CSV-Laufs den Fortschritt in einer kleinen Zustandsdatei, damit ein durch
+    Absturz oder Neustart unterbrochener Lauf fortgesetzt werden kann (siehe load_checkpoint):
+    fertige Dateien mit ihrer Größe und die laufende Datei mit Messstelle, nächster Zeile,
+    Byte-Offset und Modellzustand. Die Zufallsströme der Messstellen springen beim Fortsetzen
+    über ihre Position (StationDraws), sie brauchen keinen eigenen Eintrag.
+    Gesichert wird höchstens alle intervall Sekunden, zum ersten Mal nach einem Intervall (kurze
+    Läufe schreiben keinen Checkpoint); vorher gehen die betroffenen Ausgabedateien per fsync auf die Platte. Komprimierte Dateien werden nur als Ganzes gesichert.
+    """
+    def __init__(self, grundlage, intervall=CHECKPOINT_INTERVAL_S, filename=CHECKPOINT_FILE, fertig=None):
+        self.grundlage = grundlage
+        self.intervall = intervall
+        self.filename = filename
+        self.fertig = dict(fertig or {})
+        self.laufend = None
+        # Von iter_basis_blocks gesetzt: Modellzustand, aus dem die nächsten Zeitpunkte weiterrechnen
+        self.modell = None
+        self.ungesichert = []
+        self.gesichert = time.monotonic()
+
+    def faellig(self):
+        return time.monotonic() - self.gesichert >= self.intervall
+
+    def block(self, messstelle, zeile, csvfile, filename):
+        """Nach einem geschriebenen Block (Zeilen bis zeile-1) bei Fälligkeit mit Offset sichern"""
+        if not self.faellig():
+            return
+        csvfile.flush()
+        os.fsync(csvfile.fileno())
+        self.laufend = {'messstelle': messstelle, 'datei': filename, 'zeile': zeile, 'offset': csvfile.tell(),
+                        'modell': self.modell}
+        self.sichern()
+
+    def datei_fertig(self, filename):
+        self.fertig[filename] = os.path.getsize(filename)
+        self.ungesichert.append(filename)
+        if self.laufend is not None and self.laufend['datei'] == filename:
+            self.laufend = None
+        if self.faellig():
+            self.sichern()
+
+    def sichern(self):
+        for name in self.ungesichert:
+            with open(name, 'rb') as f:
+                os.fsync(f.fileno())
+        self.ungesichert = []
+        _write_json_replace(self.filename, dict(self.grundlage, fertig=self.fertig, laufend=self.laufend), sync=True)
+        self.gesichert = time.monotonic()
+
+    def entfernen(self):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.filename)
+
+
+def load_checkpoint(job, messstellen_ids, csv_layout="per_station", compression=None, filename=CHECKPOINT_FILE):
+    """
+    Checkpoint eines unterbrochenen Laufs lesen. ValueError, wenn keiner vorliegt oder er nicht zum Job passt.
+    Fertige Dateien mit abweichender Größe und eine laufende Datei, die kürzer als der gesicherte
+    Offset ist, werden nicht übernommen, sondern neu erzeugt.
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        raise ValueError(f"Kein lesbarer Checkpoint {filename}, der Lauf kann nicht fortgesetzt werden")
+    lauf = json.loads(json.dumps(_checkpoint_run(job, messstellen_ids, csv_layout, compression)))
+    if checkpoint.get('version') != CHECKPOINT_VERSION or checkpoint.get('lauf') != lauf:
+        raise ValueError("Checkpoint passt nicht zum Job (Zeitraum, Intervall, Zeitachse, Formelparameter, "
+                         "Messstellen, Korrelation, CSV-Aufbau oder Kompression unterscheiden sich)")
+    checkpoint['fertig'] = {name: groesse for name, groesse in checkpoint['fertig'].items()
+                            if os.path.exists(name) and os.path.getsize(name) == groesse}
+    laufend = checkpoint['laufend']
+    if laufend is not None and (not os.path.exists(laufend['datei'])
+                                or os.path.getsize(laufend['datei']) < laufend['offset']):
+        checkpoint['laufend'] = None
+    return checkpoint
+
+
+# Excel-Sheetnamen aus dem Messstellennamen ableiten
+def excel_sheet_name(messstelle_id, idx, vergeben=None):
+    # vergeben: Menge der bereits benutzten Sheetnamen (klein geschrieben, Excel unterscheidet
+    #           nicht nach Groß-/Kleinschreibung); wird ergänzt, doppelte Namen erhalten _2, _3, ...
+    # Beschränken Sie den Sheetnamen auf 31 Zeichen, da Excel-Limits gelten.
+    sheet_name = messstelle_id[:31] if len(messstelle_id) > 31 else messstelle_id
+    # Entfernen Sie ungültige Zeichen für Sheetnamen, falls vorhanden (Excel-Limitierungen beachten)
+    sheet_name = "".join([c for c in sheet_name if c.isalnum() or c in (' ', '_', '-')])
+     # Stellen Sie sicher, dass der Name nicht leer ist oder mit bestimmten Zeichen beginnt/endet
+    if not sheet_name or sheet_name[0] in ("'", "=") or any(char in sheet_name for char in ':\\/?*[]'):
+         sheet_name = f"Messstelle_{idx+1}" # Fallback Name
+    if vergeben is not None:
+        basis = sheet_name
+        nummer = 1
+        while sheet_name.lower() in vergeben:
+            nummer += 1
+            endung = f"_{nummer}"
+            sheet_name = basis[:31 - len(endung)] + endung
+        vergeben.add(sheet_name.lower())
+    return sheet_name
+
+
+# Fortschrittstext für den Fortschrittsbereich
+def progress_text(values_created, total_values):
+    prozent = int((values_created / total_values) * 100) if total_values else 100
+    return f"{values_created:,}/{total_values:,} Werte generiert ({prozent}%)".replace(',', '.')
+
+
+class ProgressChannel:
+    """
+    Fortschritt zwischen Generator-Thread und Tk-Hauptschleife austauschen.
+    Der Worker veröffentlicht nur Zähler und die Abschlussmeldung; Tk-Widgets werden
+    ausschließlich im Hauptthread aktualisiert, der den Kanal periodisch abfragt.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values_created = 0
+        self.total_values = 0
+        self.message = None
+        self.finished = False
+        self.failed = False
+
+    def start(self, total_values):
+        with self._lock:
+            self.values_created = 0
+            self.total_values = total_values
+            self.message = None
+            self.finished = False
+            self.failed = False
+
+    def add(self, zeilen):
+        with self._lock:
+            self.values_created += zeilen
+
+    def finish(self, message, failed=False):
+        # failed=True kennzeichnet Fehler (z.B. für den Rückgabewert der Kommandozeile)
+        with self._lock:
+            self.message = message
+            self.finished = True
+            self.failed = failed
+
+    def snapshot(self):
+        with self._lock:
+            return self.values_created, self.total_values, self.message, self.finished
+
+
+# Excel-Seriennummern (Tage seit 30.12.1899) wie xlsxwriter sie für datetime-Werte schreibt
+EXCEL_EPOCH = np.datetime64('1899-12-30', 'us')
+EXCEL_DATETIME_FORMAT = 'DD/MM/YYYY HH:MM'
+
+
+def excel_serial(zeitpunkte):
+    delta = np.asarray(zeitpunkte, dtype='datetime64[us]') - EXCEL_EPOCH
+    tage, rest = np.divmod(delta.astype(np.int64), 86_400_000_000)
+    sekunden, mikro = np.divmod(rest, 1_000_000)
+    return tage + (sekunden.astype(float) + mikro.astype(float) / 1e6) / (60 * 60 * 24)
+
+
+# Excel-Export direkt mit xlsxwriter im constant_memory-Modus
+def export_excel_constant_memory(job, messstellen_ids, filename, chunk_rows=CHUNK_ROWS, on_block=None, control=None,
+                                 profil=None):
+    """
+    Schreibt jede Zeile direkt in die Arbeitsmappe, sobald ihr Block erzeugt ist.
+    Im constant_memory-Modus hält xlsxwriter nur die aktuelle Zeile im Speicher,
+    daher werden die Sheets nacheinander und zeilenweise in Reihenfolge gefüllt.
+    """
+    import xlsxwriter
+    if profil is None:
+        profil = PhaseProfile()
+    workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+    geschlossen = False
+    try:
+        date_format = workbook.add_format({'num_format': EXCEL_DATETIME_FORMAT})
+        sheet_namen = set()
+        worksheet = None
+        aktuelle_messstelle = None
+        idx = -1
+        row = 0
+
+        for messstelle_id, zeitpunkte, messwerte in iter_value_blocks(job, messstellen_ids,
+                                                                      EXCEL_OFFSET_FAKTOR, chunk_rows, control, profil):
+            if messstelle_id != aktuelle_messstelle:
+                aktuelle_messstelle = messstelle_id
+                idx += 1
+                row = 0
+                worksheet = workbook.add_worksheet(excel_sheet_name(messstelle_id, idx, sheet_namen))
+
+                # Spaltenbreiten anpassen
+                worksheet.set_column(1, 1, 20)  # Datum/Uhrzeit-Spalte
+                worksheet.set_column(2, 2, 12)  # Messwert-Spalte
+
+            with profil.phase('formatierung'):
+                seriennummern = excel_serial(zeitpunkte).tolist()
+                gerundet = np.round(messwerte, 2).tolist()
+            with profil.phase('excel'):
+                for serial, messwert in zip(seriennummern, gerundet):
+                    worksheet.write_string(row, 0, messstelle_id)
+                    worksheet.write_number(row, 1, serial, date_format)
+                    worksheet.write_number(row, 2, messwert)
+                    row += 1
+
+            if on_block is not None:
+                on_block(len(zeitpunkte))
+
+        # Beim Schließen werden die Sheets aus den Zwischendateien in die xlsx-Datei gepackt
+        with profil.phase('schreiben'):
+            workbook.close()
+        geschlossen = True
+    finally:
+        if not geschlossen:
+            # Abbruch oder Fehler: Zwischendateien freigeben, unvollständige Arbeitsmappe nicht liegen lassen
+            with contextlib.suppress(Exception):
+                workbook.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(filename)
+    profil.bytes += os.path.getsize(filename)
+
+
+# Spaltenformate: Parquet (komprimiert, für Analysewerkzeuge) und Arrow IPC (direkt per Memory-Map lesbar)
+COLUMNAR_FORMATS = ("parquet", "arrow")
+COLUMNAR_DEFAULT_COMPRESSION = {"parquet": "snappy", "arrow": None}
+
+
+def columnar_filename(output_format):
+    return f'wasserstände_alle_messstellen.{output_format}'
+
+
+# Alle Messstellen als typisierte Spalten in eine Parquet- oder Arrow-Datei schreiben
+def export_columnar(job, messstellen_ids, filename, output_format="parquet", compression=None,
+                    chunk_rows=CHUNK_ROWS, on_block=None, control=None, profil=None):
+    """
+    Schreibt die Blöcke des Generators ohne Textformatierung als Spalten:
+    Messstelle dictionary-kodiert, Zeitpunkt als timestamp[s], Messwert als float64.
+    Jeder Block wird eine eigene Row Group (Parquet) bzw. ein eigener Record Batch (Arrow).
+    Arrow-Dateien ohne Kompression lassen sich mit pyarrow.memory_map ohne Kopie lesen.
+    Parquet kennt keine Sekundeneinheit, dort wird der Zeitpunkt als timestamp[ms] gespeichert.
+    """
+    import pyarrow as pa
+
+    if compression == 'none':
+        compression = None
+    if profil is None:
+        profil = PhaseProfile()
+    schema = pa.schema([
+        ('GWMST Name', pa.dictionary(pa.int32(), pa.string())),
+        ('Datum/Zeit', pa.timestamp('s')),
+        ('Messwert', pa.float64()),
+    ])
+    # Ein gemeinsames Wörterbuch für alle Blöcke, die Messstelle wird nur als Index gespeichert
+    woerterbuch = pa.array(messstellen_ids, type=pa.string())
+    indizes = {messstelle_id: idx for idx, messstelle_id in enumerate(messstellen_ids)}
+
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(filename, schema, compression=compression or 'none')
+        schreibe = writer.write_table
+    else:
+        import pyarrow.ipc as ipc
+        writer = ipc.new_file(filename, schema, options=ipc.IpcWriteOptions(compression=compression))
+        schreibe = writer.write_batch
+
+    geschlossen = False
+    try:
+        for messstelle_id, zeitpunkte, messwerte in iter_value_blocks(job, messstellen_ids,
+                                                                      CSV_OFFSET_FAKTOR, chunk_rows, control, profil):
+            n = len(zeitpunkte)
+            with profil.phase('formatierung'):
+                spalten = [
+                    pa.DictionaryArray.from_arrays(np.full(n, indizes[messstelle_id], dtype=np.int32), woerterbuch),
+                    pa.array(np.asarray(zeitpunkte, dtype='datetime64[s]'), type=pa.timestamp('s')),
+                    pa.array(np.round(messwerte, 2), type=pa.float64()),
+                ]
+            with profil.phase('schreiben'):
+                if output_format == "parquet":
+                    schreibe(pa.Table.from_arrays(spalten, schema=schema), row_group_size=n)
+                else:
+                    schreibe(pa.RecordBatch.from_arrays(spalten, schema=schema))
+            if on_block is not None:
+                on_block(n)
+
+        with profil.phase('schreiben'):
+            writer.close()
+        geschlossen = True
+    finally:
+        if not geschlossen:
+            # Abbruch oder Fehler: Writer freigeben, unvollständige Datei nicht liegen lassen
+            with contextlib.suppress(Exception):
+                writer.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(filename)
+    profil.bytes += os.path.getsize(filename)
+
+
+# Parameter-Sweep: viele Varianten einer Messstelle als Ensemble in einer Array-Rechnung
+SWEEP_MODES = ("grid", "random")
+SWEEP_PERCENTILES = (5, 25, 50, 75, 95)
+SWEEP_STREAM = 3
+ENSEMBLE_BASENAME = 'wasserstände_ensemble'
+
+
+def sweep_rng(job_seed):
+    """Zufallsstrom für das Ziehen der Parameter im Modus "random" """
+    return np.random.default_rng(np.random.SeedSequence(job_seed, spawn_key=(SWEEP_STREAM,)))
+
+
+def _sweep_werte(name, angabe, modus, anzahl, rng):
+    # Werte eines Feldes: Liste, Bereich {"von", "bis", "anzahl"} oder Verteilung (nur random)
+    if isinstance(angabe, (list, tuple)):
+        werte = np.asarray(angabe, dtype=float)
+        return werte if modus == "grid" else rng.choice(werte, size=anzahl)
+    if not isinstance(angabe, dict):
+        raise ValueError(f"Ungültige Sweep-Angabe für {name}: {angabe!r}")
+    if 'von' in angabe:
+        werte = np.linspace(float(angabe['von']), float(angabe['bis']), int(angabe.get('anzahl', 5)))
+        return werte if modus == "grid" else rng.choice(werte, size=anzahl)
+    if modus == "grid":
+        raise ValueError(f"Im Modus grid sind für {name} nur Listen oder Bereiche möglich")
+    verteilung = angabe.get('verteilung', "uniform")
+    if verteilung == "uniform":
+        return rng.uniform(float(angabe['min']), float(angabe['max']), size=anzahl)
+    if verteilung == "normal":
+        return rng.normal(float(angabe['mittel']), float(angabe['std']), size=anzahl)
+    raise ValueError(f"Unbekannte Verteilung für {name}: {verteilung}")
+
+
+def sweep_members(formel_params, spezifikation):
+    """
+    Ensemble-Mitglieder aus einer Sweep-Angabe (Abschnitt "sweep" der Jobdatei):
+    grid:   {"modus": "grid", "parameter": {"A": [0.3, 0.5, 0.8], "Dd": {"von": 60, "bis": 180, "anzahl": 5}}}
+            ergibt alle Kombinationen (kartesisches Produkt).
+    random: {"modus": "random", "anzahl": 200, "parameter": {"A": {"verteilung": "uniform", "min": 0.2, "max": 0.8},
+            "T": {"verteilung": "normal", "mittel": 365, "std": 10}, "seed": [1, 2, 3]}}
+            zieht anzahl Mitglieder aus dem Sweep-Strom des Job-Seeds; Listen und Bereiche werden zufällig ausgewählt.
+    Gibt ein Dict Feldname -> Array (Mitglieder,) nur der variierten Felder zurück.
+    """
+    modus = spezifikation.get('modus', "grid")
+    if modus not in SWEEP_MODES:
+        raise ValueError(f"Unbekannter Sweep-Modus: {modus}")
+    parameter = spezifikation.get('parameter') or {}
+    if not parameter:
+        raise ValueError("Der Sweep enthält keine Parameter")
+    felder = vars(formel_params)
+    unbekannt = [name for name in parameter if name not in felder]
+    if unbekannt:
+        raise ValueError(f"Unbekannte Formelparameter im Sweep: {', '.join(unbekannt)}")
+
+    anzahl = int(spezifikation.get('anzahl', 100))
+    if modus == "random" and anzahl < 1:
+        raise ValueError("Die Anzahl der Mitglieder muss mindestens 1 sein")
+    rng = sweep_rng(formel_params.seed)
+    werte = {name: _sweep_werte(name, angabe, modus, anzahl, rng) for name, angabe in parameter.items()}
+
+    if modus == "grid":
+        gitter = np.meshgrid(*werte.values(), indexing='ij')
+        werte = {name: achse.ravel() for name, achse in zip(werte, gitter)}
+    if 'seed' in werte:
+        werte['seed'] = np.round(werte['seed']).astype(np.int64)
+    return werte
+
+
+def ensemble_time_axis(job, von, bis):
+    """Zeitpunkte der Modellschritte von..bis-1 (Tage ab dem Starttag oder Messzeitpunkte)"""
+    if job['time_axis'] == "interval":
+        return build_time_axis(job['start_date'], job['end_date'], job['interval_hours'], von, bis)
+    return np.datetime64(job['start_date'].date(), 'us') + np.arange(von, bis) * np.timedelta64(1, 'D')
+
+
+def ensemble_filenames(basisname, output_format):
+    endung = 'csv' if output_format == "csv" else output_format
+    return {teil: f'{basisname}_{teil}.{endung}' for teil in ("mitglieder", "werte", "baender")}
+
+
+def _zahl_text(wert):
+    # Parameterwerte mit Dezimalkomma wie die Messwerte; kürzeste Darstellung, die den Wert exakt wiedergibt
+    if isinstance(wert, (int, np.integer)):
+        return str(int(wert))
+    return repr(float(wert)).replace('.', ',')
+
+
+# Ensemble berechnen und als beschriftete Tabellen mit Perzentilbändern schreiben
+def export_ensemble(job, mitglieder, basisname=ENSEMBLE_BASENAME, output_format="csv", percentiles=SWEEP_PERCENTILES,
+                    chunk_rows=CHUNK_ROWS, on_block=None, control=None, profil=None):
+    """
+    Schreibt drei Tabellen:
+    _mitglieder: Mitglied und Werte der variierten Parameter (die Beschriftung der Spalten in _werte),
+    _werte:      Datum/Zeit und eine Spalte M1..Mn je Mitglied (Modellwerte im Modellraster),
+    _baender:    Datum/Zeit, Perzentile P5..P95 und Mittelwert über alle Mitglieder je Zeitschritt.
+    Alle Mitglieder eines Blocks entstehen in einer gemeinsamen Array-Rechnung (job_model_stream mit
+    Parameterfeldern); der Speicherbedarf hängt von chunk_rows ab, nicht von der Länge der Reihe.
+    Jedes Mitglied entspricht dem Einzellauf mit seinen Parametern, bei mehr als 64 Mitgliedern im
+    Rahmen der Gleitkommagenauigkeit (siehe GWSeriesStream).
+    Bei Parquet/Arrow enthalten die Metadaten der Wertetabelle zusätzlich die Parametertabelle als JSON.
+    """
+    if profil is None:
+        profil = PhaseProfile()
+    anzahl_mitglieder = len(next(iter(mitglieder.values())))
+    namen = [f"M{k + 1}" for k in range(anzahl_mitglieder)]
+    band_namen = [f"P{p:g}" for p in percentiles] + ["Mittelwert"]
+    dateien = ensemble_filenames(basisname, output_format)
+    model = job_model_stream(job, mitglieder)
+    schritte = model_length(job)
+    zeilen_pro_block = max(1, chunk_rows // anzahl_mitglieder)
+
+    # Parametertabelle
+    felder = list(mitglieder)
+    if output_format == "csv":
+        with open(dateien['mitglieder'], 'wb') as f:
+            kopf = ';'.join(['Mitglied'] + felder) + CSV_LINE_END
+            zeilen = [';'.join([name] + [_zahl_text(mitglieder[feld][k]) for feld in felder]) + CSV_LINE_END
+                      for k, name in enumerate(namen)]
+            f.write((kopf + ''.join(zeilen)).encode('utf-8'))
+    tabelle = {'Mitglied': namen, **{feld: mitglieder[feld].tolist() for feld in felder}}
+
+    if output_format == "csv":
+        werte_datei = open(dateien['werte'], 'wb')
+        band_datei = open(dateien['baender'], 'wb')
+        werte_datei.write((';'.join(['Datum/Zeit'] + namen) + CSV_LINE_END).encode('utf-8'))
+        band_datei.write((';'.join(['Datum/Zeit'] + band_namen) + CSV_LINE_END).encode('utf-8'))
+    else:
+        import pyarrow as pa
+        werte_schema = pa.schema([('Datum/Zeit', pa.timestamp('s'))] + [(name, pa.float64()) for name in namen],
+                                 metadata={'watergen_mitglieder': json.dumps(tabelle, ensure_ascii=False)})
+        band_schema = pa.schema([('Datum/Zeit', pa.timestamp('s'))] + [(name, pa.float64()) for name in band_namen])
+        parameter_tabelle = pa.table(tabelle)
+        if output_format == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(parameter_tabelle, dateien['mitglieder'])
+            werte_datei = pq.ParquetWriter(dateien['werte'], werte_schema)
+            band_datei = pq.ParquetWriter(dateien['baender'], band_schema)
+        else:
+            import pyarrow.ipc as ipc
+            with ipc.new_file(dateien['mitglieder'], parameter_tabelle.schema) as writer:
+                writer.write_table(parameter_tabelle)
+            werte_datei = ipc.new_file(dateien['werte'], werte_schema)
+            band_datei = ipc.new_file(dateien['baender'], band_schema)
+
+    def schreibe_tabelle(datei, zeitpunkte, matrix, schema):
+        if output_format == "csv":
+            with profil.phase('formatierung'):
+                vorlage = '%s' + ';%s' * matrix.shape[1] + CSV_LINE_END
+                felder = np.empty((len(zeitpunkte), matrix.shape[1] + 1), dtype=object)
+                felder[:, 0] = format_timestamps(zeitpunkte)
+                felder[:, 1:] = np.asarray(format_messwerte(matrix.ravel()), dtype=object).reshape(matrix.shape)
+                daten = ((vorlage * len(zeitpunkte)) % tuple(felder.ravel().tolist())).encode('utf-8')
+            with profil.phase('schreiben'):
+                datei.write(daten)
+        else:
+            with profil.phase('formatierung'):
+                spalten = [pa.array(np.asarray(zeitpunkte, dtype='datetime64[s]'), type=pa.timestamp('s'))]
+                spalten += [pa.array(spalte, type=pa.float64()) for spalte in np.round(matrix, 2).T]
+                tabelle_block = pa.Table.from_arrays(spalten, schema=schema)
+            with profil.phase('schreiben'):
+                if output_format == "parquet":
+                    datei.write_table(tabelle_block, row_group_size=len(zeitpunkte))
+                else:
+                    datei.write_table(tabelle_block)
+
+    try:
+        for von in range(0, schritte, zeilen_pro_block):
+            if control is not None:
+                control.checkpoint()
+            bis = min(von + zeilen_pro_block, schritte)
+            with profil.phase('zeilen'):
+                zeitpunkte = ensemble_time_axis(job, von, bis)
+            with profil.phase('modell'):
+                matrix = model.values(von, bis)
+                baender = np.column_stack([np.percentile(matrix, percentiles, axis=1).T, matrix.mean(axis=1)])
+            schreibe_tabelle(werte_datei, zeitpunkte, matrix, None if output_format == "csv" else werte_schema)
+            schreibe_tabelle(band_datei, zeitpunkte, baender, None if output_format == "csv" else band_schema)
+            profil.zeilen += matrix.size
+            if on_block is not None:
+                on_block(matrix.size)
+    except JobCancelled:
+        werte_datei.close()
+        band_datei.close()
+        for datei in dateien.values():
+            if os.path.exists(datei):
+                os.remove(datei)
+        raise
+    with profil.phase('schreiben'):
+        werte_datei.close()
+        band_datei.close()
+    profil.bytes += sum(os.path.getsize(datei) for datei in dateien.values() if os.path.exists(datei))
+    return anzahl_mitglieder
+
+
+def create_ensemble_files(output_format, start_date, end_date, interval_hours, formel_params, sweep, channel,
+                          time_axis="daily", chunk_rows=CHUNK_ROWS, control=None, percentiles=SWEEP_PERCENTILES,
+                          profile_log=PROFILE_LOG):
+    # Gegenstück zu create_csv_files für Parameter-Sweeps einer Messstelle
+    # sweep: Sweep-Angabe (siehe sweep_members); output_format: "csv", "parquet" oder "arrow"
+    if output_format != "csv" and output_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Ensembles lassen sich nicht als {output_format} schreiben (csv, parquet oder arrow)")
+    mitglieder = sweep_members(formel_params, sweep)
+    job = prepare_job(start_date, end_date, interval_hours, formel_params, time_axis)
+    anzahl_mitglieder = len(next(iter(mitglieder.values())))
+    total_values = model_length(job) * anzahl_mitglieder
+    channel.start(total_values)
+    start_zeit = time.perf_counter()
+    profil = PhaseProfile()
+    try:
+        export_ensemble(job, mitglieder, ENSEMBLE_BASENAME, output_format, percentiles, chunk_rows,
+                        on_block=channel.add, control=control, profil=profil)
+    except JobCancelled:
+        values_created = channel.snapshot()[0]
+        channel.finish(f"Abgebrochen nach {values_created:,}/{total_values:,} Werten – unvollständige Dateien entfernt".replace(',', '.'))
+        return
+
+    dauer = time.perf_counter() - start_zeit
+    zeilen_pro_s = total_values / dauer if dauer > 0 else 0
+    message = (f"{progress_text(total_values, total_values)} – {anzahl_mitglieder:,} Mitglieder – "
+               f"{zeilen_pro_s:,.0f} Zeilen/s").replace(',', '.')
+    message += f" – {format_bytes(profil.bytes)} geschrieben"
+    if profil.summary():
+        message += "\n" + profil.summary()
+    if profile_log:
+        try:
+            write_profile_log(profil.report(dauer, f"Ensemble {output_format}, {anzahl_mitglieder} Mitglieder"),
+                              profile_log)
+        except OSError as e:
+            print(f"Profil-Log Error: {e}")
+    channel.finish(message)
+
+
+def create_csv_files(output_format, start_date, end_date, messstellen_ids, interval_hours, formel_params, channel, time_axis="daily", workers=1, chunk_rows=CHUNK_ROWS, excel_mode="constant_memory", control=None, compression=None, compression_level=None, csv_layout="per_station", csv_index=False, profile_log=PROFILE_LOG, profile_dump=None, value_store=None, correlation=None, extend=False, checkpoint_interval=0, resume=False, extendable=False, temp_dir=None):
+    # output_format: "csv", "excel", "parquet" oder "arrow"
+    # time_axis="daily": Tagesreihe berechnen und pro Messzeitpunkt nachschlagen
+    # time_axis="interval": Modell direkt im Messintervall berechnen (ohne Treppenstufen)
+    # workers > 1: CSV-Export der Messstellen auf mehrere Prozesse verteilen
+    # chunk_rows: Zeilen pro Block; Speicherbedarf hängt davon ab, nicht von Zeitspanne oder Messstellenanzahl
+    # excel_mode="constant_memory": Zeilen direkt in die Arbeitsmappe; "pandas": bisheriger DataFrame-Weg
+    # channel: ProgressChannel, über den der Fortschritt an die Oberfläche gemeldet wird
+    # control: JobControl zum Abbrechen/Pausieren, geprüft an Blockgrenzen
+    # compression: Kompression für Parquet/Arrow (z.B. "snappy", "zstd", "lz4"); None = Standard des Formats
+    #              bei CSV "gzip" oder "zstd" (Kompression während des Schreibens), None = unkomprimiert
+    # compression_level: Kompressionsstufe für CSV; None = Standard (gzip 6, zstd 3)
+    # csv_layout="per_station": eine Datei je Messstelle; "long_by_station"/"long_by_time": eine Datei
+    #            im Langformat, nach Messstelle gruppiert bzw. nach Zeitpunkt verschränkt
+    # csv_index: bei "long_by_station" Index-Datei mit Byte-Offsets je Messstelle schreiben
+    # profile_log: Logdatei für den Profilbericht (Zeit und Durchsatz je Phase); None = kein Log
+    # profile_dump: Dateiname für einen cProfile-Mitschnitt des Laufs; None = kein Mitschnitt.
+    #               Erfasst nur den aufrufenden Thread, nicht die Worker-Prozesse bei workers > 1.
+    # value_store: Verzeichnis für den Wertespeicher (Memory-Map, siehe ValueStore); die Exporter lesen
+    #              daraus. Ein abgebrochener Lauf setzt beim erneuten Start fort, ein Export in ein
+    #              anderes Format nutzt die gespeicherten Werte. None = direkt erzeugen wie bisher.
+    # correlation: Korrelationsmatrix der Messstellen (n x n, z.B. aus distance_correlation); jede Messstelle
+    #              erhält eine eigene Ganglinie mit räumlich korrelierten Störungen. None = gemeinsame Ganglinie.
+    # Die Ausgabe je Messstelle (CSV per_station/long_by_station, Excel, Parquet, Arrow) läuft Messstelle für
+    # Messstelle über die ganze Zeitachse. Bei mehreren Messstellen ohne value_store wird die Basis deshalb
+    # einmal berechnet und in einem temporären Verzeichnis zwischengespeichert (8 Byte je Zeitpunkt, mit
+    # correlation je Messstelle und Zeitpunkt); CSV long_by_time rechnet im Zeittakt und braucht ihn nicht.
+    # temp_dir: Verzeichnis, in dem dieser Zwischenspeicher angelegt wird; None = System-Temp.
+    # extend: vorhandene CSV-Ausgabe (per_station oder long_by_time) bis end_date verlängern. Nur die neuen
+    #         Zeitpunkte werden erzeugt und angehängt, ab dem in OUTPUT_STATE_FILE gesicherten Modellzustand;
+    #         das Ergebnis entspricht einem Lauf über den ganzen Zeitraum. Die Verlängerung schreibt die
+    #         Zustandsdatei neu, sodass weiter verlängert werden kann.
+    # checkpoint_interval: CSV-Ausgabe per_station/long_by_time sichert höchstens so oft (s) ihren Fortschritt
+    #                      in CHECKPOINT_FILE (siehe CheckpointWriter), den ersten nach einem Intervall, z.B.
+    #                      CHECKPOINT_INTERVAL_S; None oder 0 = keine Checkpoints (Standard), ein Abbruch entfernt
+    #                      dann unvollständige Dateien. Nach erfolgreichem Lauf wird die Datei entfernt.
+    # resume: nach Absturz oder Neustart mit denselben Angaben ab dem letzten Checkpoint fortsetzen;
+    #         die Ausgabe ist identisch mit der eines ununterbrochenen Laufs. Eine unterbrochene
+    #         Verlängerung wird als Verlängerung fortgesetzt, extend muss dafür nicht angegeben werden.
+    # extendable: CSV-Ausgabe per_station/long_by_time mit Zustandsdatei OUTPUT_STATE_FILE abschließen,
+    #             damit sie später mit extend verlängert werden kann. Ohne Angabe entsteht keine Zustandsdatei.
+    temp_store = None
+    if ((correlation is not None or len(messstellen_ids) > 1) and not value_store
+            and not (output_format == "csv" and csv_layout == "long_by_time")):
+        # Modellreihe (und Störungsfeld) entstehen im Zeittakt für alle Messstellen; für den Export je
+        # Messstelle werden die Basisreihen in einem temporären Wertespeicher abgelegt statt je Messstelle
+        # neu berechnet
+        if temp_dir:
+            os.makedirs(temp_dir, exist_ok=True)
+        temp_store = value_store = tempfile.mkdtemp(prefix='watergen_', dir=temp_dir)
+    profiler = None
+    if profile_dump:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        _create_output_files(output_format, start_date, end_date, messstellen_ids, interval_hours, formel_params, channel,
+                             time_axis, workers, chunk_rows, excel_mode, control, compression, compression_level,
+                             csv_layout, csv_index, profile_log, value_store, correlation, extend,
+                             checkpoint_interval, resume, extendable, temp_store is not None)
+    except JobCancelled as abbruch:
+        values_created, total_values = channel.snapshot()[:2]
+        if extend:
+            entfernt = "angehängte Zeilen entfernt"
+        elif abbruch.gekuerzt:
+            entfernt = f"{abbruch.gekuerzt} auf den letzten Checkpoint gekürzt"
+        else:
+            entfernt = "unvollständige Dateien entfernt"
+        if abbruch.checkpoint:
+            entfernt += f" – Fortsetzen ab {abbruch.checkpoint} möglich"
+        channel.finish(f"Abgebrochen nach {values_created:,}/{total_values:,} Werten – {entfernt}".replace(',', '.'))
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_dump)
+        if temp_store is not None:
+            shutil.rmtree(temp_store, ignore_errors=True)
+
+
+def _create_output_files(output_format, start_date, end_date, messstellen_ids, interval_hours, formel_params, channel,
+                         time_axis, workers, chunk_rows, excel_mode, control, compression=None, compression_level=None,
+                         csv_layout="per_station", csv_index=False, profile_log=PROFILE_LOG, value_store=None,
+                         correlation=None, extend=False, checkpoint_interval=0, resume=False,
+                         extendable=False, nur_basis=False):
+    if correlation is not None and np.shape(correlation) != (len(messstellen_ids), len(messstellen_ids)):
+        raise ValueError(f"Korrelationsmatrix muss {len(messstellen_ids)} x {len(messstellen_ids)} groß sein "
+                         f"(eine Zeile und Spalte je Messstelle)")
+    job = prepare_job(start_date, end_date, interval_hours, formel_params, time_axis, correlation)
+    if output_format == "csv" and compression == 'none':
+        compression = None
+    vorher = None
+    fortsetzung = None
+    if resume:
+        if output_format != "csv" or csv_layout not in APPENDABLE_CSV_LAYOUTS:
+            raise ValueError("Fortsetzen ist nur bei CSV-Ausgabe je Messstelle oder im Aufbau long_by_time möglich")
+        fortsetzung = load_checkpoint(job, messstellen_ids, csv_layout, compression)
+        job['von'] = fortsetzung['von']
+        job['modell_zustand'] = fortsetzung['modell_start']
+        extendable = extendable or fortsetzung.get('verlaengerbar', False)
+        if fortsetzung['basis_dateien'] is not None:
+            # Unterbrochene Verlängerung: Dateigrößen vor der Verlängerung wie aus der Zustandsdatei
+            vorher = {'dateien': fortsetzung['basis_dateien']}
+            extend = True
+    elif extend:
+        if output_format != "csv" or csv_layout not in APPENDABLE_CSV_LAYOUTS:
+            raise ValueError("Verlängern ist nur bei CSV-Ausgabe je Messstelle oder im Aufbau long_by_time möglich")
+        vorher = load_output_state(job, messstellen_ids, csv_layout, compression)
+        job['von'] = vorher['anzahl']
+        job['modell_zustand'] = vorher['modell']
+    total_values = (job['anzahl'] - job['von']) * len(messstellen_ids)
+    channel.start(total_values)
+    # Werte, die ein fortgesetzter Lauf aus dem Checkpoint übernimmt
+    uebernommen = 0
+    if fortsetzung is not None:
+        werte_je_zeile = 1 if csv_layout == "per_station" else len(messstellen_ids)
+        uebernommen = len(fortsetzung['fertig']) * (job['anzahl'] - job['von'])
+        if fortsetzung['laufend'] is not None:
+            uebernommen += (fortsetzung['laufend']['zeile'] - job['von']) * werte_je_zeile
+        channel.add(uebernommen)
+    start_zeit = time.perf_counter()
+    profil = PhaseProfile()
+    # Job für die Zustandsdatei, solange die Korrelationsmatrix noch enthalten ist (siehe Wertespeicher);
+    # den Modellzustand am Ende meldet der Export in ende
+    zustand_job = None
+    ende = None
+    checkpoint = None
+    if output_format == "csv" and csv_layout in APPENDABLE_CSV_LAYOUTS:
+        if extendable or extend:
+            zustand_job = dict(job)
+            ende = {}
+        if checkpoint_interval:
+            checkpoint = CheckpointWriter({
+                'version': CHECKPOINT_VERSION,
+                'lauf': _checkpoint_run(job, messstellen_ids, csv_layout, compression),
+                'von': job['von'],
+                'modell_start': job['modell_zustand'],
+                'basis_dateien': None if vorher is None else vorher['dateien'],
+                'verlaengerbar': zustand_job is not None,
+            }, checkpoint_interval, fertig=None if fortsetzung is None else fortsetzung['fertig'])
+            if fortsetzung is not None:
+                checkpoint.laufend = fortsetzung['laufend']
+            else:
+                # Der erste Checkpoint entsteht erst nach einem Intervall; einen veralteten nicht stehen lassen
+                checkpoint.entfernen()
+    store = None
+    if value_store:
+        store = job['werte_speicher'] = open_value_store(value_store, job, messstellen_ids, control, profil, nur_basis)
+        gespeichert_vorher = store.stored_values()
+        # Die Basisreihen liegen im Speicher, die Matrix muss nicht an Worker-Prozesse übertragen werden
+        job['korrelation'] = None
+    # Nur der CSV-Export je Messstelle verteilt die Arbeit auf mehrere Prozesse
+    parallel = False
+
+    def finish_progress(zusatz=None):
+        # Abschlussmeldung mit Durchsatz zum Vergleich der Exportwege, darunter die Phasenanteile
+        dauer = time.perf_counter() - start_zeit
+        zeilen_pro_s = (total_values - uebernommen) / dauer if dauer > 0 else 0
+        message = f"{progress_text(total_values, total_values)} – {zeilen_pro_s:,.0f} Zeilen/s".replace(',', '.')
+        if zusatz:
+            message += f" – {zusatz}"
+        if fortsetzung is not None:
+            werte_text = f"{uebernommen:,}".replace(',', '.')
+            message += f" – fortgesetzt ab Checkpoint ({werte_text} Werte übernommen)"
+        if store is not None:
+            store.flush()
+        if store is not None and gespeichert_vorher:
+            wiederverwendet = f"{gespeichert_vorher:,}".replace(',', '.')
+            message += f" – Wertespeicher: {wiederverwendet} Werte wiederverwendet"
+        if profil.summary():
+            message += "\n" + profil.summary()
+        if profile_log:
+            prozesse = min(workers, len(messstellen_ids)) if parallel else 1
+            titel = f"{output_format}, {len(messstellen_ids)} Messstellen, {interval_hours:g} h, Prozesse: {prozesse}"
+            try:
+                write_profile_log(profil.report(dauer, titel, prozesse), profile_log)
+            except OSError as e:
+                # Der Bericht ist nur Zusatzinformation, die erzeugten Dateien bleiben gültig
+                print(f"Profil-Log Error: {e}")
+        channel.finish(message)
+
+    update_progress = channel.add
+
+    if output_format in COLUMNAR_FORMATS:
+        if compression is None:
+            compression = COLUMNAR_DEFAULT_COMPRESSION[output_format]
+        try:
+            export_columnar(job, messstellen_ids, columnar_filename(output_format), output_format, compression,
+                            chunk_rows, on_block=update_progress, control=control, profil=profil)
+            finish_progress()
+        except JobCancelled:
+            raise
+        except Exception as e:
+            channel.finish(f"Fehler beim {output_format.capitalize()}-Export: {str(e)}", failed=True)
+            print(f"Columnar Export Error: {e}") # Zusätzliche Debug-Ausgabe
+    elif output_format == "excel" and excel_mode == "constant_memory":
+        try:
+            export_excel_constant_memory(job, messstellen_ids, 'wasserstände_alle_messstellen.xlsx',
+                                         chunk_rows, on_block=update_progress, control=control, profil=profil)
+            finish_progress()
+        except JobCancelled:
+            raise
+        except Exception as e:
+            channel.finish(f"Fehler beim Excel-Export: {str(e)}", failed=True)
+            print(f"Excel Export Error: {e}") # Zusätzliche Debug-Ausgabe
+    elif output_format == "excel":
+        # pandas nur für diesen Exportweg laden (beim ersten Aufruf, danach aus sys.modules)
+        import pandas as pd
+        try:
+            # Excel-Datei erstellen
+            with pd.ExcelWriter('wasserstände_alle_messstellen.xlsx',
+                            engine='xlsxwriter',
+                            datetime_format=EXCEL_DATETIME_FORMAT) as writer:
+
+                startrow = {}
+                sheet_names = {}
+                vergeben = set()
+                for messstelle_id, zeitpunkte, messwerte in iter_value_blocks(job, messstellen_ids,
+                                                                              EXCEL_OFFSET_FAKTOR, chunk_rows, control,
+                                                                              profil):
+                    if messstelle_id not in sheet_names:
+                        sheet_names[messstelle_id] = excel_sheet_name(messstelle_id, len(sheet_names), vergeben)
+                    sheet_name = sheet_names[messstelle_id]
+
+                    with profil.phase('excel'):
+                        # DataFrame nur für den aktuellen Block erstellen
+                        df = pd.DataFrame({
+                            'GWMST Name': messstelle_id,
+                            'Datum/Uhrzeit': zeitpunkte,
+                            'Messwert': np.round(messwerte, 2),
+                        })
+                        # Block unter die bereits geschriebenen Zeilen des Sheets anhängen
+                        df.to_excel(writer, sheet_name=sheet_name, index=False, header=False,
+                                    startrow=startrow.get(sheet_name, 0))
+
+                    if sheet_name not in startrow:
+                        # Formatierung anpassen
+                        worksheet = writer.sheets[sheet_name]
+
+                        # Spaltenbreiten anpassen
+                        worksheet.set_column(1, 1, 20)  # Datum/Uhrzeit-Spalte
+                        worksheet.set_column(2, 2, 12)  # Messwert-Spalte
+
+                    startrow[sheet_name] = startrow.get(sheet_name, 0) + len(df)
+                    update_progress(len(df))
+
+                # Beim Verlassen des with-Blocks wird die Arbeitsmappe geschrieben
+                schreiben_beginn = time.perf_counter()
+            profil.sekunden['schreiben'] += time.perf_counter() - schreiben_beginn
+            profil.bytes += os.path.getsize('wasserstände_alle_messstellen.xlsx')
+
+            finish_progress()
+        except JobCancelled:
+            # Unvollständige Arbeitsmappe nicht liegen lassen
+            if os.path.exists('wasserstände_alle_messstellen.xlsx'):
+                os.remove('wasserstände_alle_messstellen.xlsx')
+            raise
+        except Exception as e:
+            if os.path.exists('wasserstände_alle_messstellen.xlsx'):
+                os.remove('wasserstände_alle_messstellen.xlsx')
+            channel.finish(f"Fehler beim Excel-Export: {str(e)}", failed=True)
+            print(f"Excel Export Error: {e}") # Zusätzliche Debug-Ausgabe
+    else:
+        # CSV-Export
+        if compression is not None and compression not in CSV_COMPRESSION:
+            raise ValueError(f"Unbekannte CSV-Kompression: {compression}")
+        if csv_layout not in CSV_LAYOUTS:
+            raise ValueError(f"Unbekannter CSV-Aufbau: {csv_layout}")
+        groessen = [0, 0]
+
+        def station_fertig(ergebnis, zeilen_melden):
+            zeilen, roh_bytes, datei_bytes = ergebnis
+            if zeilen_melden:
+                update_progress(zeilen)
+            groessen[0] += roh_bytes
+            groessen[1] += datei_bytes
+
+        # Worker-Prozesse sichern keine Checkpoints, fertige Dateien meldet der Hauptprozess
+        datei_von = {}
+
+        def worker_fertig(future):
+            # Worker-Prozesse liefern ihr Profil und den Modellzustand am Ende mit dem Ergebnis zurück
+            ergebnis, worker_profil, worker_ende = future.result()
+            profil.merge(worker_profil)
+            if ende is not None:
+                ende.update(worker_ende)
+            station_fertig(ergebnis, True)
+            if checkpoint is not None:
+                checkpoint.datei_fertig(datei_von[future])
+
+        # Beim Fortsetzen: übernommene Dateien überspringen, die laufende ab ihrem Offset fortsetzen
+        fertig = {} if fortsetzung is None else fortsetzung['fertig']
+        laufend = None if fortsetzung is None else fortsetzung['laufend']
+
+        def start_von(filename):
+            return laufend if laufend is not None and laufend['datei'] == filename else None
+
+        if fortsetzung is not None and vorher is not None:
+            # Unterbrochene Verlängerung: begonnene, aber nicht gesicherte Dateien auf die frühere Größe kürzen
+            for name, groesse in vorher['dateien'].items():
+                if name not in fertig and start_von(name) is None:
+                    os.truncate(name, groesse)
+
+        parallel = csv_layout == "per_station" and workers > 1 and len(messstellen_ids) > 1
+        try:
+            if csv_layout != "per_station":
+                # Eine Datei für alle Messstellen, seriell geschrieben
+                order = "station" if csv_layout == "long_by_station" else "time"
+                filename = long_csv_filename(compression)
+                station_fertig(export_long_csv(job, messstellen_ids, filename, order, chunk_rows,
+                                               on_block=update_progress, control=control, compression=compression,
+                                               compression_level=compression_level, write_index=csv_index,
+                                               profil=profil, append=extend, checkpoint=checkpoint,
+                                               start=start_von(filename), ende=ende),
+                               False)
+            elif parallel:
+                # Messstellen auf einen Prozesspool verteilen, jeder Prozess schreibt eigene Dateien.
+                # Es sind höchstens so viele Messstellen in Arbeit wie Prozesse. Abbruch und Pause
+                # werden beim Warten an die Worker gespiegelt und greifen dort an jeder Blockgrenze.
+                max_workers = min(workers, len(messstellen_ids))
+                worker_control = ProcessJobControl()
+
+                def abwarten(in_arbeit, alle):
+                    # Auf Worker warten und dabei den Zustand des JobControl weitergeben
+                    while in_arbeit:
+                        worker_control.spiegeln(control)
+                        erledigt, in_arbeit = wait(in_arbeit, timeout=CONTROL_POLL_S,
+                                                   return_when=FIRST_COMPLETED)
+                        for future in erledigt:
+                            worker_fertig(future)
+                        if erledigt and not alle:
+                            break
+                    return in_arbeit
+
+                with ProcessPoolExecutor(max_workers=max_workers, initializer=_worker_init,
+                                         initargs=(worker_control,)) as executor:
+                    try:
+                        in_arbeit = set()
+                        for idx, messstelle_id in enumerate(messstellen_ids):
+                            filename = csv_filename(messstelle_id, compression)
+                            if filename in fertig:
+                                continue
+                            if len(in_arbeit) >= max_workers:
+                                in_arbeit = abwarten(in_arbeit, False)
+                            if control is not None:
+                                worker_control.spiegeln(control)
+                                control.checkpoint()
+                            future = executor.submit(_export_station_csv_profiled, job, idx, messstelle_id,
+                                                     chunk_rows, None,
+                                                     compression=compression, compression_level=compression_level,
+                                                     append=extend, start=start_von(filename))
+                            datei_von[future] = filename
+                            in_arbeit.add(future)
+                        abwarten(in_arbeit, True)
+                    except BaseException:
+                        # Noch laufende Worker anhalten, bevor der Pool auf sie wartet
+                        worker_control.cancel()
+                        raise
+                # Ein Abbruch nach dem letzten Block eines Workers soll den Lauf trotzdem scheitern lassen
+                if control is not None:
+                    control.checkpoint()
+            else:
+                for idx, messstelle_id in enumerate(messstellen_ids):
+                    filename = csv_filename(messstelle_id, compression)
+                    if filename in fertig:
+                        continue
+                    station_fertig(export_station_csv(job, idx, messstelle_id, chunk_rows,
+                                                      on_block=update_progress, control=control,
+                                                      compression=compression, compression_level=compression_level,
+                                                      profil=profil, append=extend, checkpoint=checkpoint,
+                                                      start=start_von(filename), ende=ende),
+                                   False)
+                    if checkpoint is not None:
+                        checkpoint.datei_fertig(filename)
+        except JobCancelled as abbruch:
+            if vorher is not None:
+                # Auch bereits fertig verlängerte Dateien zurücksetzen, damit die Zustandsdatei gültig bleibt
+                for name, groesse in vorher['dateien'].items():
+                    os.truncate(name, groesse)
+            elif checkpoint is not None and os.path.exists(checkpoint.filename):
+                # Ein frischer Lauf entfernt alte Checkpoints, die Datei stammt also aus diesem oder dem
+                # fortgesetzten Lauf; mit laufend wurde dessen Datei gekürzt (siehe _cancel_offset)
+                abbruch.checkpoint = checkpoint.filename
+                if checkpoint.laufend is not None:
+                    abbruch.gekuerzt = checkpoint.laufend['datei']
+            raise
+
+        if zustand_job is not None:
+            try:
+                zustand = output_state(zustand_job, messstellen_ids, csv_layout, compression, ende.get('modell'))
+                write_output_state(zustand, csv_output_files(messstellen_ids, csv_layout, compression))
+            except OSError as e:
+                print(f"Zustandsdatei Error: {e}")
+        if checkpoint is not None:
+            checkpoint.entfernen()
+        finish_progress(csv_size_text(groessen[0], groessen[1], compression))
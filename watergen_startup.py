@@ -0,0 +1,77 @@
+# Startdiagnose für WaterGen: Importzeiten im Stil von "python -X importtime" und
+# Zeitpunkte der Startphasen (Ladescreen sichtbar, Hauptfenster bereit) protokollieren.
+# Aktivierung: python WaterGen.py --startdiagnose (oder WaterGen.exe --startdiagnose)
+import builtins
+import importlib.util
+import sys
+import time
+
+STARTDIAGNOSE_FLAG = "--startdiagnose"
+STARTDIAGNOSE_LOG = "watergen_startdiagnose.log"
+
+_start = time.perf_counter()
+_ausgabe = None
+_original_import = builtins.__import__
+# Pro laufendem Import die kumulierte Zeit der darin geladenen Untermodule
+_stapel = []
+
+
+def startdiagnose_aktiv():
+    return _ausgabe is not None
+
+
+def _schreibe(zeile):
+    print(zeile, file=_ausgabe, flush=True)
+
+
+def _absoluter_name(name, globals, level):
+    if level == 0:
+        return name
+    paket = (globals or {}).get('__package__') or ''
+    try:
+        return importlib.util.resolve_name('.' * level + name, paket)
+    except (ImportError, ValueError):
+        return name
+
+
+def _zeit_import(name, globals=None, locals=None, fromlist=(), level=0):
+    modulname = _absoluter_name(name, globals, level)
+    if modulname in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    _stapel.append(0.0)
+    beginn = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        kumuliert = time.perf_counter() - beginn
+        kinder = _stapel.pop()
+        if _stapel:
+            _stapel[-1] += kumuliert
+        eigen = kumuliert - kinder
+        _schreibe(f"import time: {eigen * 1e6:>9.0f} | {kumuliert * 1e6:>10.0f} | {'  ' * len(_stapel)}{modulname}")
+
+
+def import_zeiten_aufzeichnen():
+    """
+    Alle folgenden Importe (auch später nachgeladene wie matplotlib oder pandas) mit
+    Eigen- und Gesamtzeit in Mikrosekunden ausgeben. Ohne Konsole (Exe) in eine Logdatei.
+    """
+    global _ausgabe
+    if _ausgabe is not None:
+        return
+    _ausgabe = sys.stderr if sys.stderr is not None else open(STARTDIAGNOSE_LOG, 'w', encoding='utf-8')
+    _schreibe("import time: self [us] | cumulative | imported package")
+    builtins.__import__ = _zeit_import
+
+
+def startphase(name):
+    """Zeitpunkt einer Startphase seit Beginn der Diagnose ausgeben (nur bei aktiver Startdiagnose)"""
+    if _ausgabe is not None:
+        _schreibe(f"Startdiagnose: {name} nach {(time.perf_counter() - _start) * 1000:.0f} ms")
+
+
+def diagnose(text):
+    """Weitere Diagnosemeldung (z.B. Cache-Statistik), nur bei aktiver Startdiagnose"""
+    if _ausgabe is not None:
+        _schreibe(f"Startdiagnose: {text}")